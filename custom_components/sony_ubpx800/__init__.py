@@ -9,33 +9,90 @@ from homeassistant.config_entries import ConfigEntry
 from homeassistant.const import Platform
 from homeassistant.core import HomeAssistant
 from homeassistant.exceptions import ConfigEntryAuthFailed, ConfigEntryNotReady
-from .device import SonyDevice, AuthenticationResult
+from homeassistant.helpers import config_validation as cv
+from homeassistant.helpers.typing import ConfigType
+import voluptuous as vol
+from homeassistant.helpers.importlib import async_import_module
 from .sony_config import SonyConfigData
 
 from .const import DOMAIN, CONF_HOST, CONF_APP_PORT, CONF_IRCC_PORT, CONF_DMR_PORT, SONY_COORDINATOR, \
-    SONY_API, DEFAULT_DEVICE_NAME
+    SONY_API, DEFAULT_DEVICE_NAME, CONF_ENABLE_METRICS, DEFAULT_ENABLE_METRICS, CONF_VOLUME_WINDOW, \
+    DEFAULT_VOLUME_WINDOW, CONF_HOLD_RATE, DEFAULT_HOLD_RATE, CONF_MACROS, AuthenticationResult
 from .coordinator import SonyCoordinator
+from .macro import parse_macro_text, validate_macro
 
 _LOGGER: logging.Logger = logging.getLogger(__package__)
 
 PLATFORMS: list[Platform] = [
     Platform.MEDIA_PLAYER,
     Platform.REMOTE,
-    Platform.BUTTON
+    Platform.BUTTON,
+    Platform.SENSOR,
+    Platform.BINARY_SENSOR
 ]
 
-async def async_setup_entry(hass: HomeAssistant, entry: ConfigEntry) -> bool:
-    """Set up Sony UBP-X800 from a config entry."""
 
+def _macro(value):
+    try:
+        return validate_macro(value)
+    except ValueError as ex:
+        raise vol.Invalid(str(ex)) from ex
+
+
+# Macros shared by all players can be defined in configuration.yaml
+CONFIG_SCHEMA = vol.Schema({
+    vol.Optional(DOMAIN): vol.Schema({
+        vol.Optional(CONF_MACROS, default={}): {cv.string: _macro},
+    }),
+}, extra=vol.ALLOW_EXTRA)
+
+
+async def async_setup(hass: HomeAssistant, config: ConfigType) -> bool:
+    """Keep the macros from configuration.yaml for the config entries."""
+    hass.data.setdefault(DOMAIN, {})[CONF_MACROS] = \
+        config.get(DOMAIN, {}).get(CONF_MACROS, {})
+    websocket = await async_import_module(hass, f"{__name__}.websocket_api")
+    websocket.async_register_websocket_api(hass)
+    return True
+
+
+def _connection_options(entry: ConfigEntry) -> tuple[str, int, int, int]:
+    """Return host, app, DMR and IRCC port of an entry."""
     # Use .get() to check options first, falling back to entry.data 
     # This ensures the 'Configure' wheel changes actually take effect.
-    host = entry.options.get(CONF_HOST, entry.data.get(CONF_HOST))
-    app_port = entry.options.get(CONF_APP_PORT, entry.data.get(CONF_APP_PORT))
-    dmr_port = entry.options.get(CONF_DMR_PORT, entry.data.get(CONF_DMR_PORT))
-    ircc_port = entry.options.get(CONF_IRCC_PORT, entry.data.get(CONF_IRCC_PORT))
+    return (
+        entry.options.get(CONF_HOST, entry.data.get(CONF_HOST)),
+        entry.options.get(CONF_APP_PORT, entry.data.get(CONF_APP_PORT)),
+        entry.options.get(CONF_DMR_PORT, entry.data.get(CONF_DMR_PORT)),
+        entry.options.get(CONF_IRCC_PORT, entry.data.get(CONF_IRCC_PORT)),
+    )
+
+
+def _apply_options(hass: HomeAssistant, entry: ConfigEntry, coordinator: SonyCoordinator) -> None:
+    """Apply the options which take effect without talking to the device."""
+    coordinator.api.metrics.enabled = entry.options.get(CONF_ENABLE_METRICS, DEFAULT_ENABLE_METRICS)
+    coordinator.volume_writer.window = \
+        entry.options.get(CONF_VOLUME_WINDOW, DEFAULT_VOLUME_WINDOW) / 1000
+    coordinator.hold_rate = entry.options.get(CONF_HOLD_RATE, DEFAULT_HOLD_RATE)
+    macros = dict(hass.data.get(DOMAIN, {}).get(CONF_MACROS, {}))
+    try:
+        # Macros from the options take precedence over those in configuration.yaml
+        macros.update(parse_macro_text(entry.options.get(CONF_MACROS)))
+    except ValueError as ex:
+        _LOGGER.error("Ignoring the macros in the options: %s", ex)
+    coordinator.set_macros(macros)
+
+
+async def async_setup_entry(hass: HomeAssistant, entry: ConfigEntry) -> bool:
+    """Set up Sony UBP-X800 from a config entry."""
+    host, app_port, dmr_port, ircc_port = _connection_options(entry)
+
+    # The device module pulls in requests, import it off the event loop
+    # and only once an entry is actually set up.
+    device_module = await async_import_module(hass, f"{__name__}.device")
 
     try:
-        sony_device = SonyDevice(
+        sony_device = device_module.SonyDevice(
             host, 
             DEFAULT_DEVICE_NAME,
             psk=None, 
@@ -58,6 +115,7 @@ async def async_setup_entry(hass: HomeAssistant, entry: ConfigEntry) -> bool:
         raise ConfigEntryNotReady(ex) from ex
 
     coordinator = SonyCoordinator(hass, sony_device)
+    _apply_options(hass, entry, coordinator)
     
     # Store both the coordinator and the API for easy access
     hass.data.setdefault(DOMAIN, {})[entry.entry_id] = {
@@ -68,11 +126,16 @@ async def async_setup_entry(hass: HomeAssistant, entry: ConfigEntry) -> bool:
     # Silence the noisy library logging
     logging.getLogger("sonyapilib").setLevel(logging.CRITICAL)
 
-    await coordinator.async_config_entry_first_refresh()
+    if await coordinator.device_data.async_restore():
+        # Entities start from the last known state, the player is read in the background
+        entry.async_create_background_task(
+            hass, coordinator.async_refresh(), "sony_ubpx800 first refresh")
+    else:
+        await coordinator.async_config_entry_first_refresh()
     await hass.config_entries.async_forward_entry_setups(entry, PLATFORMS)
     
     # This line ensures that when you click 'Save' in the configuration,
-    # the 'update_listener' below is called to reload the integration.
+    # the 'update_listener' below is called to apply the new options.
     entry.async_on_unload(entry.add_update_listener(update_listener))
 
     return True
@@ -87,7 +150,11 @@ async def async_unload_entry(hass: HomeAssistant, entry: ConfigEntry) -> bool:
         if entry.entry_id in hass.data[DOMAIN]:
             # We remove the entry. The Python garbage collector will 
             # take care of the coordinator and device objects.
-            hass.data[DOMAIN].pop(entry.entry_id)
+            entry_data = hass.data[DOMAIN].pop(entry.entry_id)
+            if (key_channel := entry_data[SONY_COORDINATOR].key_channel) is not None:
+                key_channel.release()
+            # Pooled connections and refresh threads are not garbage collected
+            await hass.async_add_executor_job(entry_data[SONY_COORDINATOR].api.close)
 
     return unload_ok
 
@@ -97,6 +164,7 @@ async def async_remove_entry(hass: HomeAssistant, entry: ConfigEntry) -> None:
     # Use the built-in async_remove method to delete the file from .storage
     try:
         await store.async_remove()
+        await Store(hass, 1, "bluray_state.json").async_remove()
     except Exception as err:
         # Log error if deletion fails (e.g., file already gone)
         hass.components.persistent_notification.create(
@@ -104,5 +172,17 @@ async def async_remove_entry(hass: HomeAssistant, entry: ConfigEntry) -> None:
         )
 
 async def update_listener(hass: HomeAssistant, entry: ConfigEntry):
-    """Update Listener."""
-    await hass.config_entries.async_reload(entry.entry_id)
+    """Apply changed options to the running entry without reloading it.
+
+    Entities and the command table are kept, a changed host or port only
+    moves the known urls and reads the resources at the new address again.
+    """
+    coordinator: SonyCoordinator = hass.data[DOMAIN][entry.entry_id][SONY_COORDINATOR]
+    _apply_options(hass, entry, coordinator)
+    revalidated = await hass.async_add_executor_job(
+        coordinator.api.reconfigure, *_connection_options(entry))
+    if not revalidated:
+        return
+    _LOGGER.debug("Address of %s changed, read again: %s", coordinator.api.nickname, revalidated)
+    await coordinator.device_data.save_device(update=False)
+    await coordinator.async_request_refresh()
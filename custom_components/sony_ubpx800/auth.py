@@ -0,0 +1,81 @@
+"""Re-authentication after the device rejected a request.
+
+The registration with the player can expire, after which every request
+is answered with 401 or 403. The first request to see that registers
+again, requests failing at the same time wait for it and retry with the
+new credentials instead of registering once each.
+"""
+import threading
+import time
+
+# Status codes answered for expired credentials
+AUTH_ERRORS = (401, 403)
+# Seconds after a failed re-authentication during which no new one is tried
+REAUTH_BACKOFF = 30
+
+
+class AuthManager:
+    """Single flight re-authentication with counters for diagnostics."""
+
+    def __init__(self, authenticate):
+        """Initialize with authenticate, a callable returning whether it succeeded."""
+        self._authenticate = authenticate
+        self._lock = threading.Lock()
+        # Incremented with every successful re-authentication
+        self.generation = 0
+        self.reauths = 0
+        self.failures = 0
+        self.retries = 0
+        self.total_time = 0.0
+        self.last_reauth = None
+        self._failed_at = None
+
+    def reauthenticate(self, generation):
+        """Re-authenticate after a request sent at generation was rejected.
+
+        Returns whether the request should be retried, which is also the
+        case when another thread re-authenticated in the meantime. Within
+        REAUTH_BACKOFF of a failed re-authentication, or of one whose retried
+        request was rejected as well, nothing is tried.
+        """
+        with self._lock:
+            if self.generation != generation:
+                self.retries += 1
+                return True
+            if self._failed_at is not None and time.monotonic() - self._failed_at < REAUTH_BACKOFF:
+                return False
+            started = time.monotonic()
+            success = self._authenticate()
+            elapsed = time.monotonic() - started
+            self.reauths += 1
+            self.total_time += elapsed
+            self.last_reauth = time.time()
+            if not success:
+                self.failures += 1
+                self._failed_at = started
+                return False
+            self._failed_at = None
+            self.generation += 1
+            self.retries += 1
+            return True
+
+    def retry_rejected(self):
+        """Record that a request retried with new credentials was rejected again.
+
+        Registering again evidently does not help, so requests are not
+        retried for REAUTH_BACKOFF, instead of registering once per request.
+        """
+        with self._lock:
+            self.failures += 1
+            self._failed_at = time.monotonic()
+
+    def as_dict(self):
+        """Return a json serializable summary."""
+        return {
+            "reauths": self.reauths,
+            "failures": self.failures,
+            "retries": self.retries,
+            "total_ms": round(self.total_time * 1000, 1),
+            "mean_ms": round(self.total_time * 1000 / self.reauths, 1) if self.reauths else None,
+            "last_reauth": self.last_reauth,
+        }
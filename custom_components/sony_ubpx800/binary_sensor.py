@@ -0,0 +1,121 @@
+"""
+Binary sensors for the Sony UBP-X800.
+
+Derived from the getStatus document read by every refresh, so they cost
+no extra request, and only write their state when it changed.
+"""
+from __future__ import annotations
+
+import logging
+from collections.abc import Callable
+from dataclasses import dataclass
+
+from homeassistant.components.binary_sensor import (
+    BinarySensorEntity,
+    BinarySensorEntityDescription,
+)
+from homeassistant.config_entries import ConfigEntry
+from homeassistant.core import HomeAssistant, callback
+from homeassistant.helpers.device_registry import DeviceInfo
+from homeassistant.helpers.entity_platform import AddEntitiesCallback
+from homeassistant.helpers.update_coordinator import CoordinatorEntity
+
+from . import SonyCoordinator
+from .const import DOMAIN, SONY_COORDINATOR
+from .status import ACTIVITY_VIEWING, PlayerStatus
+
+_LOGGER = logging.getLogger(__name__)
+
+
+@dataclass(frozen=True, kw_only=True)
+class SonyStatusBinarySensorDescription(BinarySensorEntityDescription):
+    """Describe a binary sensor derived from the getStatus document."""
+
+    is_on_fn: Callable[[PlayerStatus], bool]
+
+
+STATUS_BINARY_SENSORS: tuple[SonyStatusBinarySensorDescription, ...] = (
+    SonyStatusBinarySensorDescription(
+        key="disc_loaded",
+        name="Disc loaded",
+        icon="mdi:disc",
+        is_on_fn=lambda status: status.disc_loaded,
+    ),
+    SonyStatusBinarySensorDescription(
+        key="viewing",
+        name="Viewing",
+        icon="mdi:television-play",
+        is_on_fn=lambda status: status.activity == ACTIVITY_VIEWING,
+    ),
+)
+
+
+async def async_setup_entry(
+        hass: HomeAssistant,
+        config_entry: ConfigEntry,
+        async_add_entities: AddEntitiesCallback,
+) -> None:
+    """Use to setup entity."""
+    _LOGGER.debug("Sony async_add_entities binary_sensor")
+    coordinator = hass.data[DOMAIN][config_entry.entry_id][SONY_COORDINATOR]
+    async_add_entities(
+        [SonyStatusBinarySensorEntity(coordinator, description)
+         for description in STATUS_BINARY_SENSORS]
+    )
+
+
+class SonyStatusBinarySensorEntity(CoordinatorEntity[SonyCoordinator], BinarySensorEntity):
+    """Binary sensor exposing a flag of the player status."""
+
+    entity_description: SonyStatusBinarySensorDescription
+
+    _attr_has_entity_name = True
+
+    def __init__(self, coordinator, description: SonyStatusBinarySensorDescription):
+        """Initialize the binary sensor."""
+        super().__init__(coordinator)
+        self.coordinator = coordinator
+        self.entity_description = description
+
+        clean_mac = coordinator.api.mac.replace("-", "").replace(":", "")
+        self._attr_unique_id = f"{clean_mac}_{description.key}"
+        self._written = None
+        self.update()
+
+    async def async_added_to_hass(self) -> None:
+        """Remember the state written when the entity was added."""
+        await super().async_added_to_hass()
+        self._written = (self.available, self._attr_is_on)
+
+    @property
+    def device_info(self) -> DeviceInfo:
+        """Return the device info."""
+        return DeviceInfo(
+            identifiers={
+                # Mac address is unique identifiers within a specific domain
+                (DOMAIN, self.coordinator.api.mac)
+            },
+            name=self.coordinator.api.nickname,
+            manufacturer="Sony",
+            model="UBP-X800"
+        )
+
+    @property
+    def available(self) -> bool:
+        """Only report values while the player answers getStatus."""
+        return super().available and self.coordinator.data.get("player_status") is not None
+
+    def update(self):
+        """Read the flag from the status of the last refresh."""
+        player_status = self.coordinator.data.get("player_status")
+        self._attr_is_on = (
+            self.entity_description.is_on_fn(player_status) if player_status is not None else None)
+
+    @callback
+    def _handle_coordinator_update(self) -> None:
+        """Write the state only when the flag or availability changed."""
+        self.update()
+        written = (self.available, self._attr_is_on)
+        if written != self._written:
+            self._written = written
+            self.async_write_ha_state()
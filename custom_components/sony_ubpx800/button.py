@@ -106,11 +106,8 @@ class SonyButtonEntity(CoordinatorEntity[SonyCoordinator], ButtonEntity):
         self._state_map = {
             "Stop": STATE_IDLE,
             "Play": STATE_PLAYING,
-            "Pause": STATE_PLAYING,
-            "Next": STATE_PLAYING,
-            "Prev": STATE_PLAYING,
-            "Advance": STATE_PLAYING,
-            "Replay": STATE_PLAYING,
+            # Keys moving within the title leave the state as it is
+            "Pause": lambda: self.coordinator.device_data.paused_state(),
             "Home": STATE_IDLE      
         }
 
@@ -151,7 +148,7 @@ class SonyButtonEntity(CoordinatorEntity[SonyCoordinator], ButtonEntity):
             )
         elif (state := self._state_map.get(self._command)) is not None:
             await self.coordinator.device_data.async_check_device_status(
-                state,
+                state() if callable(state) else state,
                 self.coordinator.api.send_command, self._command
             ) 
         else:
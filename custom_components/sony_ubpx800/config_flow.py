@@ -11,8 +11,8 @@ from homeassistant.const import CONF_HOST
 from homeassistant.core import callback
 from homeassistant.data_entry_flow import FlowResult
 from homeassistant.exceptions import HomeAssistantError
+from homeassistant.helpers.selector import TextSelector, TextSelectorConfig
 
-from .device import SonyDevice, AuthenticationResult
 from .const import (
     DOMAIN, 
     CONF_APP_PORT, 
@@ -21,9 +21,18 @@ from .const import (
     DEFAULT_DMR_PORT, 
     CONF_IRCC_PORT, 
     DEFAULT_IRCC_PORT, 
+    CONF_ENABLE_METRICS,
+    DEFAULT_ENABLE_METRICS,
+    CONF_VOLUME_WINDOW,
+    DEFAULT_VOLUME_WINDOW,
+    CONF_HOLD_RATE,
+    DEFAULT_HOLD_RATE,
+    CONF_MACROS,
     CONF_PIN, 
-    DEFAULT_DEVICE_NAME
+    DEFAULT_DEVICE_NAME,
+    AuthenticationResult
 )
+from .macro import parse_macro_text
 
 _LOGGER = logging.getLogger(__name__)
 
@@ -43,6 +52,9 @@ STEP_PIN_DATA_SCHEMA = vol.Schema({
 
 def validate_input(user_input: dict[str, Any]) -> dict[str, Any]:
     """Validate the user input allows us to connect."""
+    # Runs in the executor, keep the device module and requests off the import path
+    from .device import SonyDevice  # pylint: disable=import-outside-toplevel
+
     pin = user_input.get(CONF_PIN)
     _LOGGER.debug("Sony device user input %s", user_input)
     
@@ -137,13 +149,21 @@ class SonyDeviceOptionsFlowHandler(OptionsFlow):
 
     async def async_step_init(self, user_input: dict[str, Any] | None = None) -> FlowResult:
         """Manage the options settings."""
+        errors: dict[str, str] = {}
         if user_input is not None:
-            # This creates an entry in entry.options
-            return self.async_create_entry(title="", data=user_input)
+            try:
+                parse_macro_text(user_input.get(CONF_MACROS))
+            except ValueError as ex:
+                _LOGGER.debug("Invalid macros: %s", ex)
+                errors[CONF_MACROS] = "invalid_macros"
+            else:
+                # This creates an entry in entry.options
+                return self.async_create_entry(title="", data=user_input)
 
         # Pre-populate the form with current settings
         return self.async_show_form(
             step_id="init",
+            errors=errors,
             data_schema=vol.Schema({
                 vol.Required(
                     CONF_HOST, 
@@ -161,6 +181,22 @@ class SonyDeviceOptionsFlowHandler(OptionsFlow):
                     CONF_IRCC_PORT, 
                     default=self.config_entry.options.get(CONF_IRCC_PORT, self.config_entry.data.get(CONF_IRCC_PORT))
                 ): int,
+                vol.Optional(
+                    CONF_ENABLE_METRICS,
+                    default=self.config_entry.options.get(CONF_ENABLE_METRICS, DEFAULT_ENABLE_METRICS)
+                ): bool,
+                vol.Optional(
+                    CONF_VOLUME_WINDOW,
+                    default=self.config_entry.options.get(CONF_VOLUME_WINDOW, DEFAULT_VOLUME_WINDOW)
+                ): vol.All(vol.Coerce(int), vol.Range(min=0, max=5000)),
+                vol.Optional(
+                    CONF_HOLD_RATE,
+                    default=self.config_entry.options.get(CONF_HOLD_RATE, DEFAULT_HOLD_RATE)
+                ): vol.All(vol.Coerce(float), vol.Range(min=1, max=50)),
+                vol.Optional(
+                    CONF_MACROS,
+                    default=self.config_entry.options.get(CONF_MACROS, "")
+                ): TextSelector(TextSelectorConfig(multiline=True)),
             }),
         )
 
@@ -1,9 +1,12 @@
 """Constants for the Sony integration."""
 from datetime import timedelta
+from enum import Enum
 
 DOMAIN = "sony_ubpx800"
 
 DEVICE_SCAN_INTERVAL = timedelta(seconds=60)
+# Age after which the stored app list is read again from the device
+APP_LIST_TTL = timedelta(hours=12)
 SONY_COORDINATOR = "sony_coordinator"
 SONY_API = "sony_api"
 DEFAULT_DEVICE_NAME = "Sony UBP-X800"
@@ -13,7 +16,27 @@ CONF_PIN = "pin"
 CONF_APP_PORT = 'app_port'
 CONF_DMR_PORT = 'dmr_port'
 CONF_IRCC_PORT = 'ircc_port'
+CONF_ENABLE_METRICS = 'enable_metrics'
+CONF_VOLUME_WINDOW = 'volume_window'
+CONF_HOLD_RATE = 'hold_rate'
+CONF_MACROS = 'macros'
 
 DEFAULT_APP_PORT = 50202
 DEFAULT_DMR_PORT = 52323
-DEFAULT_IRCC_PORT = 50001
\ No newline at end of file
+DEFAULT_IRCC_PORT = 50001
+DEFAULT_ENABLE_METRICS = False
+# Minimum time in milliseconds between two SetVolume requests
+DEFAULT_VOLUME_WINDOW = 250
+# Key presses per second sent while a remote key is held
+DEFAULT_HOLD_RATE = 10
+
+SERVICE_RUN_MACRO = "run_macro"
+ATTR_MACRO = "macro"
+
+
+class AuthenticationResult(Enum):
+    """Store the result of the authentication process."""
+
+    SUCCESS = 0
+    ERROR = 1
+    PIN_NEEDED = 2
@@ -3,22 +3,61 @@ from __future__ import annotations
 
 import asyncio
 import logging
-from typing import Any
-from urllib.error import HTTPError
+import time
+from collections import deque
+from typing import TYPE_CHECKING, Any
 
-import requests
 from homeassistant.const import STATE_OFF, STATE_ON, STATE_PLAYING, STATE_PAUSED, STATE_IDLE
-from homeassistant.core import HomeAssistant
+from homeassistant.core import HomeAssistant, callback
 from homeassistant.exceptions import ConfigEntryAuthFailed
 from homeassistant.helpers.update_coordinator import DataUpdateCoordinator, UpdateFailed
 from homeassistant.helpers.storage import Store
-from .device import SonyDevice, HttpMethod
+from homeassistant.util import dt as dt_util
 from .sony_config import SonyConfigData
 
-from .const import DEVICE_SCAN_INTERVAL, DOMAIN
+if TYPE_CHECKING:
+    from .device import SonyDevice
+
+from .const import APP_LIST_TTL, DEVICE_SCAN_INTERVAL, DOMAIN, DEFAULT_VOLUME_WINDOW, \
+    DEFAULT_HOLD_RATE
+from .didl import MediaMetadata
+from .macro import Macro, compile_macro
+from .soap import format_time, parse_time
+from .status import PlayerStatus
+from .volume import VolumeWriter
 
 _LOGGER = logging.getLogger(__name__)
 
+# Number of refresh durations kept for diagnostics
+REFRESH_HISTORY = 20
+# Relative change of the learned key gap after which the profile is stored
+KEY_GAP_SAVE_CHANGE = 0.2
+# Seconds the last known state is kept in memory before it is written,
+# Home Assistant writes it on shutdown as well
+SNAPSHOT_SAVE_DELAY = 60
+# Seconds after an acknowledged command before its expected state is checked
+RECONCILE_DELAY = 2.0
+# Booting or shutting down takes the player much longer
+POWER_RECONCILE_DELAY = 20.0
+# Seconds after a seek before the position is read to confirm it
+SEEK_CONFIRM_DELAY = 1.0
+
+
+def _map_status(status: str) -> str:
+    """Map a device status to a Home Assistant state."""
+    match status:
+        case "PLAYING":
+            return STATE_PLAYING
+        case "PAUSED_PLAYBACK":
+            return STATE_PAUSED
+        case "OFF":
+            return STATE_OFF
+        case "IDLE":
+            return STATE_IDLE
+        case _:
+            return STATE_ON
+
+
 class SonyCoordinator(DataUpdateCoordinator[dict[str, Any]]):
     """Data update coordinator for an Sony device."""
     # List of events to subscribe to the websocket
@@ -36,71 +75,308 @@ class SonyCoordinator(DataUpdateCoordinator[dict[str, Any]]):
         self.api: SonyDevice = sony_device
         self.device_data = SonyDeviceData(self)
         self.data = {}
+        # (start timestamp, duration in seconds, succeeded) of recent refreshes
+        self.refresh_history: deque[tuple[float, float, bool]] = deque(maxlen=REFRESH_HISTORY)
+        self.failure_streak = 0
+        self.volume_writer = VolumeWriter(
+            hass, self._set_volume, DEFAULT_VOLUME_WINDOW / 1000)
+        # Key presses per second while a remote key is held
+        self.hold_rate: float = DEFAULT_HOLD_RATE
+        # Key down and key up events of remote cards, see websocket_api
+        self.key_channel: Any = None
+        # Macro name -> steps as configured, compiled on first use
+        self.macro_specs: dict[str, list[str]] = {}
+        self._macros: dict[str, Macro] = {}
+        # Command table the macros were compiled against
+        self._macro_commands: dict | None = None
+
+    def set_macros(self, macro_specs: dict[str, list[str]]) -> None:
+        """Replace the configured macros."""
+        self.macro_specs = dict(macro_specs)
+        self._macros.clear()
+
+    def get_macro(self, name: str) -> Macro:
+        """Return the compiled macro, raises KeyError or ValueError."""
+        if self._macro_commands is not self.api.commands:
+            # init_device replaced the device
+            self._macros.clear()
+            self._macro_commands = self.api.commands
+        if (macro := self._macros.get(name)) is None:
+            if not self.api.commands:
+                raise ValueError("The command list has not been read from the device yet")
+            macro = compile_macro(name, self.macro_specs[name], self.api.commands)
+            self._macros[name] = macro
+        return macro
+
+    def _set_volume(self, volume: int) -> bool:
+        # Resolved on every call, init_device may replace the device object
+        return self.api.set_volume(volume)
 
     async def _async_update_data(self) -> dict[str, Any]:
         """Get the latest data from the Sony device."""
         _LOGGER.debug("Sony device coordinator update")
+        started_at = time.time()
+        started = time.perf_counter()
         try:
             await self.device_data.update_state()
             self.data = {
                 "state": self.device_data.state,
-                "position_info": self.device_data.position_info
+                "position_info": self.device_data.position_info,
+                "media_info": self.device_data.media_info,
+                "volume": self.device_data.volume,
+                "player_status": self.device_data.player_status,
+                "media_metadata": self.device_data.media_metadata,
+                # Restored data is stale until the first refresh
+                "stale": False,
+                # Expected after a command, not yet confirmed by the device
+                "provisional": self.device_data.provisional_state is not None,
+                "updated_at": dt_util.utcnow(),
             }
-            return self.data
         except Exception as ex:
-            _LOGGER.error("Sony device coordinator error during update", ex)
+            self.refresh_history.append((started_at, time.perf_counter() - started, False))
+            self.failure_streak += 1
+            _LOGGER.error("Sony device coordinator error during update: %s", ex)
             raise UpdateFailed(
                 f"Error communicating with Sony device API {ex}"
             ) from ex
+        self.refresh_history.append((started_at, time.perf_counter() - started, True))
+        self.failure_streak = 0
+        self.device_data.async_save_snapshot()
+        return self.data
 
 
 class SonyDeviceData:
     def __init__(self, coordinator: SonyCoordinator):
         self.coordinator = coordinator
         self.store = Store[SonyConfigData](self.coordinator.hass, 1, "bluray.json")
+        # Last known state, seeds the coordinator after a restart
+        self.snapshot_store = Store[dict[str, Any]](self.coordinator.hass, 1, "bluray_state.json")
         self.state = STATE_OFF
         self.position_info: dict | None = None
-        self._task_running = False
-        self._lock = asyncio.Lock()
+        self.media_info = None
+        self.volume: int | None = None
+        # Decoded getStatus document of the last refresh, None while off
+        self.player_status: PlayerStatus | None = None
+        self.media_metadata: MediaMetadata | None = None
+        # State expected after a command until the reconcile probe checked it
+        self.provisional_state: str | None = None
+        self._reconcile_task: asyncio.Task | None = None
+        self._seek_task: asyncio.Task | None = None
+        self._apps_task: asyncio.Task | None = None
+        self._saved_key_gap: float | None = None
+        # Set while the profile restored at startup was not read again
+        self._profile_outdated = False
         self._init = False
         
-    async def save_device(self):
-        """Save the device to disk."""
+    async def save_device(self, update: bool = True):
+        """Save the device to disk, with update it is read from the device first."""
         sony_device = self.coordinator.api
-        data = await self.coordinator.hass.async_add_executor_job(sony_device.save_to_json)
+        data = await self.coordinator.hass.async_add_executor_job(sony_device.save_to_json, update)
         await self.store.async_save(data)
+        self._saved_key_gap = sony_device.pacer.gap
+
+    async def async_save_key_gap(self) -> None:
+        """Store the profile when the learned key gap moved noticeably."""
+        gap = self.coordinator.api.pacer.gap
+        if self._saved_key_gap and abs(gap - self._saved_key_gap) < self._saved_key_gap * KEY_GAP_SAVE_CHANGE:
+            return
+        await self.save_device(update=False)
           
-    async def retrieve_device(self):
+    async def async_restore(self) -> bool:
+        """Restore the stored device profile and last known state.
+
+        Nothing is read from the device. The coordinator data is marked
+        stale until the first refresh confirms or corrects it, which also
+        reads the profile again when the player is on. Returns False when
+        either was never stored.
+        """
+        snapshot = await self.snapshot_store.async_load()
+        if not snapshot or (sony_device := await self.retrieve_device(refresh=False)) is None:
+            return False
+        self._use_device(sony_device)
+        self._profile_outdated = True
+        self.state = snapshot["state"]
+        self.position_info = snapshot.get("position_info")
+        self.volume = snapshot.get("volume")
+        self.coordinator.data = {
+            "state": self.state,
+            "position_info": self.position_info,
+            "media_info": None,
+            "volume": self.volume,
+            "stale": True,
+            "updated_at": dt_util.parse_datetime(snapshot["updated_at"]),
+        }
+        _LOGGER.debug("Restored %s state from %s", self.state, snapshot["updated_at"])
+        return True
+
+    @callback
+    def async_save_snapshot(self) -> None:
+        """Schedule writing the last known state."""
+        self.snapshot_store.async_delay_save(self._snapshot_data, SNAPSHOT_SAVE_DELAY)
+
+    @callback
+    def _snapshot_data(self) -> dict[str, Any]:
+        data = self.coordinator.data
+        return {
+            "state": data["state"],
+            "position_info": data["position_info"],
+            "volume": data["volume"],
+            "updated_at": data["updated_at"].isoformat(),
+        }
+
+    async def retrieve_device(self, refresh: bool = True):
         data = await self.store.async_load()
+        self.coordinator.api.metrics.record_cache("device_profile", data is not None)
         if data is not None:
-            return await self.coordinator.hass.async_add_executor_job(SonyDevice.load_from_json, data)
+            return await self.coordinator.hass.async_add_executor_job(
+                type(self.coordinator.api).load_from_json, data, refresh)
         return data
     
+    def async_schedule_app_refresh(self) -> None:
+        """Read the app list in the background once it is older than APP_LIST_TTL."""
+        if self._apps_task is not None and not self._apps_task.done():
+            return
+        expired = self.coordinator.api.apps_expired(APP_LIST_TTL.total_seconds())
+        self.coordinator.api.metrics.record_cache("app_list", not expired)
+        if not expired:
+            return
+        self._apps_task = self.coordinator.hass.async_create_background_task(
+            self._async_refresh_apps(), "sony_ubpx800 app list")
+
+    async def _async_refresh_apps(self) -> None:
+        try:
+            changed = await self.coordinator.hass.async_add_executor_job(
+                self.coordinator.api.update_apps)
+        except Exception as ex:  # pylint: disable=broad-except
+            _LOGGER.debug("Failed to refresh the app list: %s", ex)
+            return
+        if changed:
+            await self.save_device(update=False)
+            self.coordinator.async_update_listeners()
+
     async def async_check_device_status(self, state, func, *args):
-        async with self._lock:
-            if self._task_running:
-                return
-            else:
-                self._task_running = True
-        await self.coordinator.hass.async_add_executor_job(func, *args)
-        for _  in range(10):
-            await self.coordinator.async_request_refresh()
-            if self.state == state:
-                async with self._lock:
-                    self._task_running = False
-                return
-            await asyncio.sleep(3)
-        async with self._lock:
-            self._task_running = False
+        """Run a command and show the state it is expected to lead to right away.
+
+        Once the device acknowledged the command the expected state is
+        published as provisional. A single status probe after
+        RECONCILE_DELAY confirms it, or rolls it back to what the device
+        reports. A newer command replaces the pending probe.
+        """
+        if await self.coordinator.hass.async_add_executor_job(func, *args) is False:
+            _LOGGER.debug("Command %s%s was not acknowledged", getattr(func, "__name__", func), args)
+            return
+        previous = self.state
+        if self._reconcile_task is not None and not self._reconcile_task.done():
+            self._reconcile_task.cancel()
+        self._set_state(state, provisional=True)
+        delay = POWER_RECONCILE_DELAY if STATE_OFF in (state, previous) else RECONCILE_DELAY
+        self._reconcile_task = self.coordinator.hass.async_create_background_task(
+            self._async_reconcile(state, previous, delay), "sony_ubpx800 reconcile")
+
+    def paused_state(self) -> str:
+        """Return the state the Pause key leads to, it resumes a paused disc."""
+        return STATE_PLAYING if self.state == STATE_PAUSED else STATE_PAUSED
+
+    async def _async_reconcile(self, expected: str, previous: str, delay: float) -> None:
+        await asyncio.sleep(delay)
+        try:
+            # Read like refresh reads the state, getStatus only exists on the X800
+            status = await self.coordinator.hass.async_add_executor_job(
+                self.coordinator.api.get_playing_status)
+        except Exception as ex:  # pylint: disable=broad-except
+            _LOGGER.debug("Status probe failed: %s", ex)
+            status = None
+        actual = previous if status is None else _map_status(status)
+        if actual == STATE_PLAYING and expected == STATE_PAUSED:
+            # The X800 reports a paused disc as viewing as well
+            actual = STATE_PAUSED
+        if actual != expected:
+            _LOGGER.debug("Expected %s after the command, the device reports %s", expected, actual)
+        self._set_state(actual, provisional=False)
+
+    @callback
+    def _set_state(self, state: str, provisional: bool) -> None:
+        """Publish a state without reading the device."""
+        self.state = state
+        self.provisional_state = state if provisional else None
+        self.coordinator.async_set_updated_data({
+            **(self.coordinator.data or {}),
+            "state": state,
+            "provisional": provisional,
+        })
+
+    async def async_seek(self, position: float) -> None:
+        """Seek and show the new position right away.
+
+        The position is confirmed by a single position read after
+        SEEK_CONFIRM_DELAY, or put back when nothing could be sent.
+        """
+        previous = self.position_info
+        current = self._current_position()
+        self._set_position(position)
+        result = await self.coordinator.hass.async_add_executor_job(
+            self.coordinator.api.seek, position, current)
+        _LOGGER.debug("Seek to %s: %s", position, result)
+        if result.method is None:
+            self.position_info = previous
+            self._set_position(None)
+            return
+        if result.position is not None and result.position != position:
+            # Keys only get close to the requested position
+            self._set_position(result.position)
+        if self._seek_task is not None and not self._seek_task.done():
+            self._seek_task.cancel()
+        self._seek_task = self.coordinator.hass.async_create_background_task(
+            self._async_confirm_position(), "sony_ubpx800 confirm seek")
+
+    def _current_position(self) -> float | None:
+        """Return the position in seconds, advanced since the last read while playing."""
+        if self.position_info is None \
+                or (position := parse_time(self.position_info.get("position"))) is None:
+            return None
+        data = self.coordinator.data or {}
+        updated_at = data.get("updated_at")
+        # A restored position is from before the restart, not worth advancing
+        if self.state == STATE_PLAYING and updated_at is not None and not data.get("stale"):
+            position += (dt_util.utcnow() - updated_at).total_seconds()
+        return position
+
+    async def _async_confirm_position(self) -> None:
+        await asyncio.sleep(SEEK_CONFIRM_DELAY)
+        position_info = await self.coordinator.hass.async_add_executor_job(
+            self.coordinator.api.get_position)
+        if position_info is None:
+            return
+        self.position_info = {
+            "duration": position_info.track_duration,
+            "position": position_info.rel_time,
+        }
+        self._set_position(None)
+
+    @callback
+    def _set_position(self, position: float | None) -> None:
+        """Publish position seconds, or the position info as it is with None."""
+        if position is not None:
+            self.position_info = {
+                **(self.position_info or {}),
+                "position": format_time(position),
+            }
+        self.coordinator.async_set_updated_data({
+            **(self.coordinator.data or {}),
+            "position_info": self.position_info,
+            "updated_at": dt_util.utcnow(),
+        })
 
     async def init_device(self):
         """If not previously registered, initialize the device by reading necessary resources."""
         if (sony_device := await self.retrieve_device()) is not None:
-            self.coordinator.api = sony_device
-            self._init = True
+            self._use_device(sony_device)
             return
         sony_device = self.coordinator.api
-        
+        # Already loaded together with the device module during setup
+        import requests  # pylint: disable=import-outside-toplevel
+        from .device import HttpMethod  # pylint: disable=import-outside-toplevel
+
         try:
             response = await self.coordinator.hass.async_add_executor_job(sony_device._send_http,sony_device.dmr_url, HttpMethod.GET)
         except requests.exceptions.ConnectionError:
@@ -121,6 +397,21 @@ class SonyDeviceData:
         except Exception as ex:  # pylint: disable=broad-except
             _LOGGER.error("Failed to get device information: %s, wait next call", str(ex))
 
+    def _use_device(self, sony_device: SonyDevice) -> None:
+        """Replace the device of the coordinator with one restored from the store."""
+        # Keep collecting into the metrics configured for this entry
+        sony_device.metrics = self.coordinator.api.metrics
+        self.coordinator.api.close()
+        self.coordinator.api = sony_device
+        self._saved_key_gap = sony_device.pacer.gap
+        self._init = True
+
+    def _position_moved(self, position_info) -> bool:
+        """Return whether the position differs from the one read before."""
+        if position_info is None or self.position_info is None:
+            return False
+        return position_info.rel_time != self.position_info.get("position")
+
     async def update_state(self) -> None:
         """Update device info."""
         if not self._init:
@@ -128,33 +419,45 @@ class SonyDeviceData:
             if not self._init:
                 return
 
-        # Retrieve the latest data.
         try:
-            playback_info = await self.coordinator.hass.async_add_executor_job(
-                self.coordinator.api.get_playing_status
+            if self._profile_outdated:
+                await self.coordinator.hass.async_add_executor_job(
+                    self.coordinator.api.update_profile)
+                self._profile_outdated = False
+            # Retrieve the latest data, status, position and media info are read
+            # concurrently and parts which fail keep their previous value.
+            snapshot = await self.coordinator.hass.async_add_executor_job(
+                self.coordinator.api.refresh
             )
-            match playback_info:
-                case "PLAYING":
-                    self.state = STATE_PLAYING
-                case "PAUSED_PLAYBACK":
-                    self.state = STATE_PAUSED
-                case "OFF":
-                    self.state = STATE_OFF
-                case "IDLE":
-                    self.state = STATE_IDLE
-                case _:
-                    self.state = STATE_ON
+            state = _map_status(snapshot.status)
+            if state == STATE_PLAYING and self.state == STATE_PAUSED \
+                    and not self._position_moved(snapshot.position_info):
+                # getStatus reports a paused disc as viewing, it is paused
+                # until the position moves again
+                state = STATE_PAUSED
+            # A refresh racing a command may still see the old state, the
+            # reconcile probe decides about a provisional one
+            self.state = self.provisional_state or state
+            self.player_status = snapshot.player_status
+            self.media_metadata = snapshot.media_metadata
             
             if self.state == STATE_OFF:
                 return
-            
-            position_info = await self.coordinator.hass.async_add_executor_job(
-                self.coordinator.api.get_position_info
-            )
-            if position_info is not None:
-                self.position_info = position_info
+
+            if (position_info := snapshot.position_info) is not None:
+                self.position_info = {
+                    "duration": position_info.track_duration,
+                    "position": position_info.rel_time,
+                }
+            self.media_info = snapshot.media_info
+            self.async_schedule_app_refresh()
+            await self.async_save_key_gap()
+            if snapshot.volume_info is not None:
+                self.volume = snapshot.volume_info.current_volume
 
                     
         except Exception as exception_instance:  # pylint: disable=broad-except
             _LOGGER.error("Sony device error", exception_instance)
             self.state = STATE_OFF
+            self.player_status = None
+            self.media_metadata = None
@@ -1,27 +1,67 @@
 """Sony Media player lib"""
 import base64
+import dataclasses
+import functools
 import json
 import logging
-import struct
-import xml.etree.ElementTree
+import sys
+import threading
+import time
+import weakref
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from dataclasses import dataclass
 from enum import Enum
+from types import MappingProxyType
 from urllib.parse import (
     urljoin,
     urlparse,
     quote,
 )
 
-import jsonpickle
 import requests
-import wakeonlan
-import xmltodict
-
-from . import ssdp
-from .xml_helper import find_in_xml
+from requests.adapters import HTTPAdapter
+from urllib3.exceptions import ConnectTimeoutError, NewConnectionError
+
+# jsonpickle, wakeonlan and ssdp are imported where they are
+# used so they are only loaded on the code paths which need them.
+from .auth import AUTH_ERRORS, AuthManager
+from .didl import MediaMetadata, MetadataCache
+from .const import AuthenticationResult
+from .ircc import IrccCategory, decode_category_info, ircc_code_table
+from .macro import WAIT_POLL, MacroResult, StepTiming
+from .metrics import DeviceMetrics, endpoint_name
+from .pacing import KeyPacer
+from .policy import (
+    COMMAND, DESCRIPTOR, LIVENESS, REGISTRATION, STATUS_READ, RequestPolicies
+)
+from .soap import (
+    MediaInfo, PositionInfo, SoapFault, TransportInfo, VolumeInfo, decode_soap_response,
+    format_time, parse_time
+)
+from .status import PlayerStatus, parse_status
+from .xml_helper import find_in_xml, iter_xml_elements, parse_xml
 
 _LOGGER = logging.getLogger(__name__)
 
 TIMEOUT = 5
+# Bytes read at a time when streaming action, command and app lists
+STREAM_CHUNK_SIZE = 4096
+# Deadline in seconds for every request of a batched refresh
+REFRESH_TIMEOUT = 3
+# Presses per second while a key is held
+HOLD_RATE = 10
+# Consecutive failed presses after which a hold is given up
+HOLD_MAX_FAILURES = 3
+# Seconds the Advance and Replay keys move playback forward and back
+ADVANCE_SECS = 15
+REPLAY_SECS = 10
+# Most keys sent in place of a Seek the player rejects
+MAX_SEEK_KEYS = 20
+# Seconds a read status is trusted to decide whether Home is needed before
+# an app launch
+STATUS_MAX_AGE = 10
+# Connections kept open per host, enough for the requests of one refresh
+POOL_SIZE = 4
 URN_UPNP_DEVICE = "{urn:schemas-upnp-org:device-1-0}"
 URN_SONY_AV = "{urn:schemas-sony-com:av}"
 URN_SONY_IRCC = "urn:schemas-sony-com:serviceId:IRCC"
@@ -29,12 +69,12 @@ URN_SCALAR_WEB_API_DEVICE_INFO = "{urn:schemas-sony-com:av}"
 WEBAPI_SERVICETYPE = "av:X_ScalarWebAPI_ServiceType"
 
 
-class AuthenticationResult(Enum):
-    """Store the result of the authentication process."""
-
-    SUCCESS = 0
-    ERROR = 1
-    PIN_NEEDED = 2
+def _failed_before_sending(ex):
+    """Return whether a request failed before any of it was sent."""
+    if isinstance(ex, requests.exceptions.ConnectTimeout):
+        return True
+    reason = getattr(ex.args[0], "reason", None) if ex.args else None
+    return isinstance(reason, (NewConnectionError, ConnectTimeoutError))
 
 
 class HttpMethod(Enum):
@@ -44,91 +84,163 @@ class HttpMethod(Enum):
     POST = "post"
 
 
-class IrccCategory(Enum):
-    """Device categories used by IRCC."""
-
-    TV1 = 1
-    AUSYS3 = 80
-    TV1EEE = 119
-    TV1E = 164
-    AUSYS3E = 208
-    AUSYS3SE = 528
-    AUSYS3EE = 1552
-    DVD4 = 3578
-    DVD4E = 3834
-    BD1 = 7258
-
-
-IR_KEY_CODES = {
-    IrccCategory.BD1: (
-        ('Num1', 0),
-        ('Num2', 1),
-        ('Num3', 2),
-        ('Num4', 3),
-        ('Num5', 4),
-        ('Num6', 5),
-        ('Num7', 6),
-        ('Num8', 7),
-        ('Num9', 8),
-        ('Num0', 9),
-        ('Power', 21),
-        ('Eject', 22),
-        ('Stop', 24),
-        ('Pause', 25),
-        ('Play', 26),
-        ('Rewind', 27),
-        ('Forward', 28),
-        ('PopUpMenu', 41),
-        ('TopMenu', 44),
-        ('Up', 57),
-        ('Down', 58),
-        ('Left', 59),
-        ('Right', 60),
-        ('Confirm', 61),
-        ('Options', 63),
-        ('Display', 65),
-        ('Home', 66),
-        ('Return', 67),
-        ('Karaoke', 74),
-        ('Netflix', 75),
-        ('Mode3D', 77),
-        ('Next', 86),
-        ('Prev', 87),
-        ('Favorites', 94),
-        ('SubTitle', 99),
-        ('Audio', 100),
-        ('Angle', 101),
-        ('Blue', 102),
-        ('Red', 103),
-        ('Green', 104),
-        ('Yellow', 105),
-        ('Advance', 117),
-        ('Replay', 118),
-    )
-}
-
+# Weak referenceable so unused commands drop out of _INTERNED_COMMANDS
+@dataclass(frozen=True, slots=True, weakref_slot=True)
 class XmlApiObject:
-    # pylint: disable=too-few-public-methods
-    """Holds data for a device action or a command."""
-
-    def __init__(self, xml_data):
-        """Init xml object with given data"""
-        self.name = None
-        self.mode = None
-        self.url = None
-        self.type = None
-        self.value = None
-        self.mac = None
-        # must be named that way to match xml
-        # pylint: disable=invalid-name
-        self.id = None
+    # pylint: disable=too-many-instance-attributes
+    """Holds data for a device action or a command.
+
+    Instances are immutable so command tables can be shared between
+    devices, use replace() to derive a modified copy.
+    """
+
+    name: str | None = None
+    mode: int | None = None
+    url: str | None = None
+    type: str | None = None
+    value: str | None = None
+    mac: str | None = None
+    # must be named that way to match xml
+    # pylint: disable=invalid-name
+    id: str | None = None
+
+    @classmethod
+    def from_xml(cls, xml_data):
+        """Create an object from the attributes of an xml element or a dict."""
         if not xml_data:
-            return
+            return cls()
+        get = xml_data.get
+        mode = get("mode")
+        return _build_api_object(cls, (
+            get("name"),
+            int(mode) if mode else mode,
+            get("url"),
+            get("type"),
+            get("value"),
+            get("mac"),
+            get("id"),
+        ))
+
+    def replace(self, **changes):
+        """Return a copy with the given fields changed."""
+        return dataclasses.replace(self, **changes)
+
+    @classmethod
+    def command_table(cls, entries, command_type="ircc"):
+        """Build a {name: command} table from (name, value) pairs."""
+        command_type = sys.intern(command_type)
+        table = {}
+        for name, value in entries:
+            name = sys.intern(name)
+            table[name] = _build_api_object(
+                cls, (name, None, None, command_type, value, None, None))
+        return table
+
+
+# Slot descriptors in field order. Filling the slots directly instead of
+# going through the frozen dataclass __init__ more than halves the
+# construction time of long command lists.
+_API_OBJECT_SETTERS = tuple(
+    getattr(XmlApiObject, field.name).__set__
+    for field in dataclasses.fields(XmlApiObject)
+)
+
+
+def _build_api_object(cls, values):
+    """Create an XmlApiObject from a tuple of all field values."""
+    api_object = object.__new__(cls)
+    for setter, value in zip(_API_OBJECT_SETTERS, values):
+        setter(api_object, value)
+    return api_object
+
+
+# Commands parsed from devices, shared by every device sending the same
+# entry. An entry lives only as long as a device holds the command, so
+# command lists of removed or reconfigured devices do not pile up.
+_INTERNED_COMMANDS = weakref.WeakValueDictionary()
+
+
+def _intern_command(xml_data):
+    """Return the shared command object for the attributes of a command element."""
+    key = (xml_data.get("name"), xml_data.get("type"), xml_data.get("value"))
+    command = _INTERNED_COMMANDS.get(key)
+    if command is None:
+        command = XmlApiObject.from_xml(xml_data)
+        command = _INTERNED_COMMANDS.setdefault(key, command)
+    return command
+
+
+@functools.lru_cache(maxsize=None)
+def _builtin_command_table(encoded_category):
+    """Return the shared command table of an IRCC category, None if unknown."""
+    fmt, category_id = decode_category_info(encoded_category)
+    try:
+        category = IrccCategory(category_id)
+    except ValueError:
+        _LOGGER.warning("Unknown IRCC category identifier: %d", category_id)
+        return None
+
+    code_table = ircc_code_table(fmt, category)
+    if code_table is None:
+        _LOGGER.warning("No command list available for %s", category)
+        return None
+
+    return MappingProxyType(XmlApiObject.command_table(code_table.items()))
+
 
-        for attr in self.__dict__:
-            if attr == "mode" and xml_data.get(attr):
-                xml_data[attr] = int(xml_data[attr])
-            setattr(self, attr, xml_data.get(attr))
+@dataclass(frozen=True, slots=True)
+class DeviceSnapshot:
+    """State of the device as read by one batched refresh.
+
+    Parts which could not be read keep the value of the previous snapshot
+    and are listed in stale.
+    """
+
+    status: str = "OFF"
+    position_info: PositionInfo | None = None
+    media_info: MediaInfo | None = None
+    volume_info: VolumeInfo | None = None
+    # Decoded getStatus document, None while the player is off
+    player_status: PlayerStatus | None = None
+    # Title, track and class of the current track
+    media_metadata: MediaMetadata | None = None
+    stale: frozenset[str] = frozenset()
+    updated_at: float | None = None
+
+
+@dataclass(frozen=True, slots=True)
+class SeekResult:
+    """Outcome of a seek."""
+
+    # "seek" for the AVTransport action, "keys" for a burst of keys, None
+    # when nothing was sent
+    method: str | None
+    keys: tuple[str, ...] = ()
+    # Seconds into the title playback is expected at, None if unknown
+    position: float | None = None
+
+
+@dataclass(frozen=True, slots=True)
+class HoldResult:
+    """Outcome of holding a key."""
+
+    presses: int
+    errors: int
+    skipped: int
+    duration: float
+    # Seconds between the first and the last press
+    span: float
+
+    @property
+    def rate(self):
+        """Measured presses per second."""
+        return (self.presses - 1) / self.span if self.span else 0.0
+
+
+def _close_response(future):
+    """Release the connection of a request whose answer is not needed."""
+    if future.exception() is None:
+        future.result().close()
 
 
 class SonyDevice:
@@ -137,6 +249,26 @@ class SonyDevice:
     # pylint: disable=fixme
     """Contains all data for the device."""
 
+    # Time the app list was last read, devices stored before it was
+    # recorded pick up this class default
+    apps_updated_at = None
+    # Gap in seconds between keys learned by the pacer, stored with the profile
+    key_gap = None
+
+    # Attributes which only live for the lifetime of the process and
+    # must not end up in the json stored by save_to_json.
+    _RUNTIME_ATTRIBUTES = ("metrics", "snapshot", "_session", "_executor", "_runtime_lock",
+                           "_home_status", "pacer", "_command_lock", "auth", "_auth_cookie_jar",
+                           "policies", "_hedge_executor", "player_status",
+                           "metadata_cache", "_refresh_futures")
+    # Snapshot field -> method reading it, the status has to come first
+    _REFRESH_PARTS = {
+        "status": "get_playing_status",
+        "position_info": "get_position",
+        "media_info": "get_media_info",
+        "volume_info": "get_volume_info",
+    }
+
     def __init__(self, host, nickname, psk=None,
                  broadcast_address="255.255.255.255",
                  app_port=50202, dmr_port=52323, ircc_port=50001,
@@ -194,6 +326,158 @@ class SonyDevice:
         self.irccscpd_url = urljoin(self.ircc_base, "/IRCCSCPD.xml")
         self._ircc_categories = set()
         self._add_headers()
+        self._init_runtime()
+
+    def _init_runtime(self):
+        """Create the attributes which are not persisted."""
+        self.metrics = DeviceMetrics()
+        self.pacer = KeyPacer(self.key_gap)
+        self.auth = AuthManager(self._reauthenticate)
+        self.policies = RequestPolicies()
+        self._hedge_executor = None
+        # (auth cookie value, jar sending it to every path) of the last v4 app call
+        self._auth_cookie_jar = None
+        self.snapshot = DeviceSnapshot()
+        self._session = None
+        self._executor = None
+        # Part -> future of the last refresh, a part still running is not sent again
+        self._refresh_futures = {}
+        self._runtime_lock = threading.Lock()
+        # Held while keys are sent, a macro or a held key is not interleaved with other keys
+        self._command_lock = threading.RLock()
+        # (monotonic time, at home) of the last status read
+        self._home_status = None
+        # Last decoded getStatus document
+        self.player_status = None
+        self.metadata_cache = MetadataCache(
+            on_lookup=lambda hit: self.metrics.record_cache("media_metadata", hit))
+
+    def __getstate__(self):
+        """Exclude runtime only attributes from serialization."""
+        state = self.__dict__.copy()
+        for attribute in self._RUNTIME_ATTRIBUTES:
+            state.pop(attribute, None)
+        if "pacer" in self.__dict__:
+            state["key_gap"] = self.pacer.gap
+        return state
+
+    def __setstate__(self, state):
+        """Restore a serialized device and recreate runtime attributes."""
+        self.__dict__.update(state)
+        self._init_runtime()
+
+    @property
+    def session(self):
+        """Return the http session whose connections all requests share."""
+        if self._session is None:
+            with self._runtime_lock:
+                if self._session is None:
+                    session = requests.Session()
+                    session.mount("http://", HTTPAdapter(pool_maxsize=POOL_SIZE))
+                    self._session = session
+        return self._session
+
+    def close(self):
+        """Close pooled connections and stop the refresh and hedging threads."""
+        with self._runtime_lock:
+            session, self._session = self._session, None
+            executors = (self._executor, self._hedge_executor)
+            self._executor = self._hedge_executor = None
+        if session is not None:
+            session.close()
+        for executor in executors:
+            if executor is not None:
+                executor.shutdown(wait=False)
+
+    def _netlocs(self):
+        """Return resource -> host:port of the endpoints derived from the options."""
+        return {
+            "dmr": f"{self.host}:{self.dmr_port}",
+            "ircc": f"{self.host}:{self.ircc_port}",
+            "app": f"{self.host}:{self.app_port}",
+            "web_api": self.host,
+        }
+
+    def reconfigure(self, host, app_port, dmr_port, ircc_port):
+        # pylint: disable=too-many-arguments
+        """Point the device at a new host or ports, keeping what was read from it.
+
+        The urls of all known endpoints are moved to the new address, pooled
+        connections to addresses which changed are dropped and only the
+        resources whose address changed are read again. Returns resource ->
+        whether it could be read, empty when nothing changed.
+        """
+        previous = self._netlocs()
+        self.host = host
+        self.app_port = app_port
+        self.dmr_port = dmr_port
+        self.ircc_port = ircc_port
+        current = self._netlocs()
+        moved = {previous[name]: current[name] for name in current
+                 if previous[name] != current[name]}
+        if not moved:
+            return {}
+
+        def rebase(url):
+            if not url:
+                return url
+            parsed = urlparse(url)
+            if parsed.netloc not in moved:
+                return url
+            return parsed._replace(netloc=moved[parsed.netloc]).geturl()
+
+        self.dmr_base = f"http://{self.host}:{self.dmr_port}"
+        self.dmr_url = f"{self.dmr_base}/dmr.xml"
+        self.app_url = f"http://{self.host}:{self.app_port}"
+        self.ircc_base = f"http://{self.host}:{self.ircc_port}"
+        if self.ircc_port == self.dmr_port:
+            self.ircc_url = self.dmr_url
+        else:
+            self.ircc_url = urljoin(self.ircc_base, "/Ircc.xml")
+        self.irccscpd_url = urljoin(self.ircc_base, "/IRCCSCPD.xml")
+        for attribute in ("base_url", "control_url", "av_transport_url",
+                          "rendering_control_url", "actionlist_url"):
+            setattr(self, attribute, rebase(getattr(self, attribute)))
+        self.actions = {
+            name: action.replace(url=rebase(action.url)) for name, action in self.actions.items()
+        }
+        self._home_status = None
+        self._reset_connections(moved)
+
+        changed = [name for name in current if previous[name] != current[name]]
+        return {name: self._revalidate(name) for name in changed}
+
+    def _reset_connections(self, netlocs):
+        """Drop the pooled connections to the given host:port addresses."""
+        session = self._session
+        if session is None:
+            return
+        for adapter in session.adapters.values():
+            pools = adapter.poolmanager.pools
+            for key in pools.keys():
+                port = key.key_port or 80
+                if f"{key.key_host}:{port}" in netlocs or (port == 80 and key.key_host in netlocs):
+                    pools.pop(key, None)
+
+    def _revalidate(self, resource):
+        """Read a resource again after its address changed, return whether that worked."""
+        try:
+            if resource == "dmr":
+                response = self._send_http(
+                    self.dmr_url, method=HttpMethod.GET, raise_errors=True, log_errors=False)
+                self._parse_dmr(response.text)
+            elif resource == "ircc":
+                if self.api_version <= 3:
+                    self._parse_ircc()
+            elif resource == "app":
+                if self.pin and self.api_version < 4:
+                    self._update_applist()
+            elif self.api_version >= 4:
+                self._recreate_authentication()
+        except Exception as ex:  # pylint: disable=broad-except
+            _LOGGER.warning("Failed to read %s after the address changed: %s", resource, ex)
+            return False
+        return True
 
     def init_device(self):
         """Update this object with data from the device"""
@@ -210,6 +494,8 @@ class SonyDevice:
     @staticmethod
     def discover():
         """Discover all available devices."""
+        from . import ssdp  # pylint: disable=import-outside-toplevel
+
         discovery = ssdp.SSDPDiscovery()
         devices = []
         for device in discovery.discover(
@@ -221,19 +507,38 @@ class SonyDevice:
         return devices
 
     @staticmethod
-    def load_from_json(data):
-        """Load a device configuration from a stored json."""
+    def load_from_json(data, refresh=True):
+        """Load a device configuration from a stored json.
+
+        With refresh the configuration is read from the device again when
+        it is on, without it the json is only decoded.
+        """
+        import jsonpickle  # pylint: disable=import-outside-toplevel
+
         device = jsonpickle.decode(data)
-        # If device is ON make sure object is up to date
-        if device.get_power_status():
-            device.init_device()
+        # Devices stored before runtime attributes existed skip __setstate__
+        if "metrics" not in device.__dict__:
+            device._init_runtime()
+        if refresh:
+            device.update_profile()
         return device
 
-    def save_to_json(self):
-        """Save this device configuration into a json."""
+    def update_profile(self):
+        """Read the configuration from the device again when it is on."""
         # If device is ON make sure object is up to date
         if self.get_power_status():
             self.init_device()
+
+    def save_to_json(self, update=True):
+        """Save this device configuration into a json.
+
+        With update the configuration is read from the device first when
+        it is on.
+        """
+        import jsonpickle  # pylint: disable=import-outside-toplevel
+
+        if update:
+            self.update_profile()
         return jsonpickle.dumps(self)
 
     def _update_service_urls(self):
@@ -260,31 +565,46 @@ class SonyDevice:
         except Exception as ex:  # pylint: disable=broad-except
             _LOGGER.error("failed to get device information: %s", str(ex))
 
-    def _parse_action_list(self):
-        response = self._send_http(self.actionlist_url, method=HttpMethod.GET)
+    def _iter_xml(self, url, tag, **kwargs):
+        """Stream the document at url and yield its tag elements as they are parsed."""
+        response = self._send_http(url, method=HttpMethod.GET, stream=True, **kwargs)
         if not response:
             return
+        # The body is only read here, after _send_http handled its errors,
+        # a broken or truncated document ends the elements like a failed request
+        try:
+            yield from iter_xml_elements(response.iter_content(STREAM_CHUNK_SIZE), tag)
+        except requests.exceptions.RequestException as ex:
+            _LOGGER.error("Reading %s failed: %s", url, ex)
+        except SyntaxError as ex:
+            _LOGGER.error("Invalid document at %s: %s", url, ex)
+        finally:
+            response.close()
 
-        for element in find_in_xml(response.text, [("action", True)]):
-            action = XmlApiObject(element.attrib)
-            self.actions[action.name] = action
-
-            if action.mode is None:
-                action.mode = self.api_version
-            if action.url is None and action.name:
-                action.url = urljoin(self.actionlist_url, f"?action={action.name}")
+    def _parse_action_list(self):
+        for element in self._iter_xml(self.actionlist_url, "action"):
+            action = XmlApiObject.from_xml(element.attrib)
+
+            mode = action.mode
+            if mode is None:
+                mode = self.api_version
+            url = action.url
+            if url is None and action.name:
+                url = urljoin(self.actionlist_url, f"?action={action.name}")
                 separator = "&"
             else:
                 separator = "?"
 
             if action.name == "register":
                 # the authentication is based on the device id and the mac
-                action.url = \
-                    f"{action.url}{separator}name={quote(self.nickname)}"\
+                url = \
+                    f"{url}{separator}name={quote(self.nickname)}"\
                     f"&registrationType=initial&deviceId={quote(self.client_id)}"
-                self.api_version = action.mode
-                if action.mode == 3:
-                    action.url = action.url + "&wolSupport=true"
+                self.api_version = mode
+                if mode == 3:
+                    url = url + "&wolSupport=true"
+
+            self.actions[action.name] = action.replace(mode=mode, url=url)
 
     def _parse_ircc(self):
         response = self._send_http(
@@ -294,18 +614,19 @@ class SonyDevice:
 
         self._set_value('ircc_base', f"http://{self.host}:{self.ircc_port}")
 
-        self._parse_system_info(response.text, self.ircc_base,
+        xml_data = parse_xml(response.text)
+        self._parse_system_info(xml_data, self.ircc_base,
                                 upnp_device=upnp_device)
 
         # the action list contains everything the device supports
         self.actionlist_url = find_in_xml(
-            response.text,
+            xml_data,
             [upnp_device,
              f"{URN_SONY_AV}X_UNR_DeviceInfo",
              f"{URN_SONY_AV}X_CERS_ActionList_URL"]
         ).text
         services = find_in_xml(
-            response.text,
+            xml_data,
             [upnp_device,
              f"{URN_UPNP_DEVICE}serviceList",
              (f"{URN_UPNP_DEVICE}service", True)],
@@ -330,11 +651,11 @@ class SonyDevice:
             self.control_url = service_url + service_location
 
         categories = find_in_xml(
-            response.text,
+            xml_data,
             [upnp_device,
              f"{URN_SONY_AV}X_IRCC_DeviceInfo",
              f"{URN_SONY_AV}X_IRCC_CategoryList",
-             ("f{URN_SONY_AV}X_IRCC_Category", True)]
+             (f"{URN_SONY_AV}X_IRCC_Category", True)]
         )
 
         for category in categories:
@@ -345,35 +666,35 @@ class SonyDevice:
 
             self._ircc_categories.add(category_info.text)
 
-    def _parse_system_info(self, text, base_url, upnp_device=None):
+    def _parse_system_info(self, xml_data, base_url, upnp_device=None):
         upnp_device = upnp_device or f"{URN_UPNP_DEVICE}device"
 
         self._set_value('friendly_name', self._find_device_info(
-            text, "friendlyName",
+            xml_data, "friendlyName",
             upnp_device=upnp_device
         ))
         self._set_value('manufacturer', self._find_device_info(
-            text, "manufacturer",
+            xml_data, "manufacturer",
             upnp_device=upnp_device
         ))
         self._set_value('manufacturer_url', self._find_device_info(
-            text, "manufacturerURL",
+            xml_data, "manufacturerURL",
             upnp_device=upnp_device
         ))
         self._set_value('model_description', self._find_device_info(
-            text, "modelDescription",
+            xml_data, "modelDescription",
             upnp_device=upnp_device
         ))
         self._set_value('model_name', self._find_device_info(
-            text, "modelName",
+            xml_data, "modelName",
             upnp_device=upnp_device
         ))
         self._set_value('model_url', self._find_device_info(
-            text, "modelURL",
+            xml_data, "modelURL",
             upnp_device=upnp_device
         ))
         self._set_value('model_number', self._find_device_info(
-            text, "modelNumber",
+            xml_data, "modelNumber",
             upnp_device=upnp_device
         ))
 
@@ -381,7 +702,7 @@ class SonyDevice:
             return
 
         icons = find_in_xml(
-            text,
+            xml_data,
             [upnp_device,
              f"{URN_UPNP_DEVICE}iconList",
              (f"{URN_UPNP_DEVICE}icon", True),
@@ -390,11 +711,11 @@ class SonyDevice:
         self.icons = [f"{base_url}{icon.text}" for icon in icons]
 
     @staticmethod
-    def _find_device_info(text, info, upnp_device=None):
+    def _find_device_info(xml_data, info, upnp_device=None):
         upnp_device = upnp_device or f"{URN_UPNP_DEVICE}device"
 
         element = find_in_xml(
-            text,
+            xml_data,
             [upnp_device,
              f"{URN_UPNP_DEVICE}{info}"]
         )
@@ -404,7 +725,7 @@ class SonyDevice:
     def _parse_system_information_v4(self):
         url = urljoin(self.base_url, "system")
         json_data = self._create_api_json("getSystemSupportedFunction")
-        response = self._send_http(url, HttpMethod.POST, json=json_data)
+        response = self._send_http(url, HttpMethod.POST, json=json_data, policy=DESCRIPTOR)
         if not response:
             _LOGGER.debug("no response received, device might be off")
             return
@@ -416,27 +737,19 @@ class SonyDevice:
                     self.mac = option['value']
 
     def _parse_system_information(self):
-        response = self._send_http(
-            self._get_action(
-                "getSystemInformation").url, method=HttpMethod.GET)
-        if not response:
-            return
-
-        for element in find_in_xml(
-                response.text, [("supportFunction", "all"), ("function", True)]
-        ):
-            for function in element:
-                if function.attrib["name"] == "WOL":
-                    self.mac = function.find(
-                        "functionItem").attrib["value"]
+        url = self._get_action("getSystemInformation").url
+        for function in self._iter_xml(url, "function"):
+            if function.attrib["name"] == "WOL":
+                self.mac = function.find(
+                    "functionItem").attrib["value"]
 
     def _parse_dmr(self, data):
         self._set_value('dmr_base', f"http://{self.host}:{self.dmr_port}")
 
-        self._parse_system_info(data, self.dmr_base)
+        xml_data = parse_xml(data)
+        self._parse_system_info(xml_data, self.dmr_base)
 
         lirc_url = urlparse(self.ircc_url)
-        xml_data = xml.etree.ElementTree.fromstring(data)
 
         for device in find_in_xml(xml_data, [
                 (f"{URN_UPNP_DEVICE}device", True),
@@ -483,15 +796,11 @@ class SonyDevice:
                 if not self.base_url.endswith("/"):
                     self.base_url = f"{self.base_url}/"
 
-                action = XmlApiObject({})
-                action.url = urljoin(self.base_url, "accessControl")
-                action.mode = 4
-                self.actions["register"] = action
+                self.actions["register"] = XmlApiObject(
+                    url=urljoin(self.base_url, "accessControl"), mode=4)
 
-                action = XmlApiObject({})
-                action.url = urljoin(self.base_url, "system")
-                action.value = "getRemoteControllerInfo"
-                self.actions["getRemoteCommandList"] = action
+                self.actions["getRemoteCommandList"] = XmlApiObject(
+                    url=urljoin(self.base_url, "system"), value="getRemoteControllerInfo")
                 self.control_url = urljoin(self.base_url, "IRCC")
 
     def _update_commands(self):
@@ -510,7 +819,7 @@ class SonyDevice:
         json_data = self._create_api_json(action.value)
 
         response = self._send_http(
-            action.url, HttpMethod.POST, json=json_data, headers={}
+            action.url, HttpMethod.POST, json=json_data, headers={}, policy=DESCRIPTOR
         )
 
         if not response:
@@ -520,9 +829,9 @@ class SonyDevice:
         json_resp = response.json()
         if json_resp and not json_resp.get('error'):
             for command in json_resp.get('result')[1]:
-                api_object = XmlApiObject(command)
+                api_object = XmlApiObject.from_xml(command)
                 if api_object.name == "PowerOff":
-                    api_object.name = "Power"
+                    api_object = api_object.replace(name="Power")
                 self.commands[api_object.name] = api_object
         else:
             _LOGGER.error("JSON request error: %s",
@@ -537,59 +846,56 @@ class SonyDevice:
             return
 
         action = self.actions[action_name]
-        url = action.url
-        response = self._send_http(url, method=HttpMethod.GET)
-        if not response:
+        received = False
+        for command in self._iter_xml(action.url, "command"):
+            received = True
+            name = command.get("name")
+            self.commands[name] = _intern_command(command.attrib)
+        if not received:
             _LOGGER.debug(
                 "Failed to get response for command list, device might be off")
-            return
-
-        for command in find_in_xml(response.text, [("command", True)]):
-            name = command.get("name")
-            self.commands[name] = XmlApiObject(command.attrib)
 
     def _use_builtin_command_list(self):
         for encoded_str in self._ircc_categories:
-            fmt, category_id = struct.unpack(">HI", base64.b64decode(encoded_str))
-            try:
-                category = IrccCategory(category_id)
-            except ValueError:
-                _LOGGER.warning("Unknown IRCC category identifier: %d", category_id)
-                continue
-
-            code_list = IR_KEY_CODES.get(category)
-            if code_list is None:
-                _LOGGER.warning("No command list available for %s", category)
-                continue
-
-            for name, code in code_list:
-                value = base64.b64encode(struct.pack(">IIIB", fmt, category_id, code, 3))
-                data = XmlApiObject({
-                    "name": name,
-                    "type": "ircc",
-                    "value": value.decode("ascii"),
-                })
-                self.commands[name] = data
+            hits = _builtin_command_table.cache_info().hits
+            table = _builtin_command_table(encoded_str)
+            self.metrics.record_cache(
+                "builtin_command_table", _builtin_command_table.cache_info().hits > hits)
+            if table is not None:
+                self.commands.update(table)
 
     def _update_applist(self):
         """Update the list of apps which are supported by the device."""
         if self.api_version < 4:
             url = self.app_url + "/appslist"
-            response = self._send_http(url, method=HttpMethod.GET)
+            apps = self._iter_xml(url, "app")
         else:
             url = f'http://{self.host}/DIAL/sony/applist'
-            response = self._send_http(
-                url,
-                method=HttpMethod.GET,
-                cookies=self._recreate_auth_cookie())
-
-        if response:
-            for app in find_in_xml(response.text, [(".//app", True)]):
-                data = XmlApiObject({
-                    "name": app.find("name").text,
-                    "id": app.find("id").text,
-                })
-                self.apps[data.name] = data
+            apps = self._iter_xml(url, "app", auth_cookie=True)
+
+        # Swapped in at once so readers on other threads never see a partial list
+        app_list = {}
+        for app in apps:
+            data = XmlApiObject(
+                name=app.find("name").text,
+                id=app.find("id").text,
+            )
+            app_list[data.name] = data
+        if app_list or not self.apps:
+            self.apps = app_list
+            self.apps_updated_at = time.time()
+
+    def apps_expired(self, ttl):
+        """Return whether the app list is older than ttl seconds."""
+        return self.apps_updated_at is None or time.time() - self.apps_updated_at > ttl
+
+    def update_apps(self):
+        """Read the app list again, return whether it changed."""
+        if not self.pin:
+            return False
+        previous = self.apps
+        self._update_applist()
+        return self.apps != previous
 
     def _recreate_authentication(self):
         """Recreate auth authentication"""
@@ -633,36 +939,145 @@ class SonyDevice:
     # pylint: disable=R1710
     def _send_http(self, url, method, **kwargs):
         # pylint: disable=too-many-arguments
-        """Send request command via HTTP json to Sony Bravia."""
+        """Send request command via HTTP json to Sony Bravia.
+
+        A request rejected with 401 or 403 is sent once more after
+        registering again, unless retry_auth is False. With auth_cookie the
+        auth cookie is sent to any path instead of only below /sony.
+        Deadlines, retries and hedging follow policy, descriptors for GET
+        and commands for POST unless given. A timeout shortens both
+        deadlines of the policy.
+        """
         log_errors = kwargs.pop("log_errors", True)
         raise_errors = kwargs.pop("raise_errors", False)
         method = kwargs.pop("method", method.value)
+        endpoint = kwargs.pop("endpoint", None)
+        retry_auth = kwargs.pop("retry_auth", True)
+        auth_cookie = kwargs.pop("auth_cookie", False)
+        policy = kwargs.pop("policy", None) or (
+            DESCRIPTOR if method == HttpMethod.GET.value else COMMAND)
 
         params = {
-            "cookies": self.cookies,
-            "timeout": TIMEOUT,
+            "cookies": self._recreate_auth_cookie() if auth_cookie else self.cookies,
             "headers": self.headers
         }
         _LOGGER.debug(
             "Calling http url %s method %s", url, method)
         
         params.update(kwargs)
+        # A timeout is the deadline of the request, retries included
+        deadline = time.monotonic() + params["timeout"] if params.get("timeout") else None
+        params["timeout"] = policy.timeout(params.get("timeout"))
+        generation = self.auth.generation
+
+        # Instrumentation costs a single attribute check while disabled
+        metrics = self.metrics if self.metrics.enabled else None
+        if metrics:
+            endpoint = endpoint or endpoint_name(url)
+            started = metrics.now()
 
         try:
-            response = getattr(requests, method)(url, **params)
+            response = self._request(policy, method, url, params, deadline)
+            if response.status_code in AUTH_ERRORS and retry_auth \
+                    and self.auth.reauthenticate(generation):
+                _LOGGER.debug("Retrying %s after registering again", url)
+                response.close()
+                if "cookies" not in kwargs:
+                    params["cookies"] = \
+                        self._recreate_auth_cookie() if auth_cookie else self.cookies
+                response = self._request(policy, method, url, params, deadline)
+                if response.status_code in AUTH_ERRORS:
+                    self.auth.retry_rejected()
             response.raise_for_status()
         except requests.exceptions.RequestException as ex:
+            if metrics:
+                received = len(ex.response.content) if ex.response is not None else 0
+                metrics.record(endpoint, started, received, ex)
             if log_errors:
                 _LOGGER.error("HTTPError: %s", str(ex))
             if raise_errors:
                 raise
         else:
+            if metrics:
+                # Streamed bodies are read by the caller, use the announced size
+                received = int(response.headers.get("Content-Length") or 0) \
+                    if params.get("stream") else len(response.content)
+                metrics.record(endpoint, started, received)
             return response
 
-    def _post_soap_request(self, url, params, action, log_errors=True):
+    def _request(self, policy, method, url, params, deadline=None):
+        """Send a request, retrying connection errors and timeouts as the policy allows.
+
+        With a deadline, a monotonic time, no retry starts after it and the
+        timeouts of a retry are shortened to the time left.
+        """
+        retryable = (requests.exceptions.ConnectionError, requests.exceptions.Timeout) \
+            if policy.idempotent else requests.exceptions.ConnectionError
+        attempt = 0
+        while True:
+            started = time.monotonic()
+            try:
+                if policy.hedge and not params.get("stream"):
+                    response = self._hedged_request(policy, method, url, params)
+                else:
+                    response = self.session.request(method, url, **params)
+            except retryable as ex:
+                # A command may have reached the player when the connection
+                # broke afterwards, sending it again could repeat a key
+                if not (policy.idempotent or _failed_before_sending(ex)) \
+                        or attempt >= policy.retries:
+                    raise
+                delay = policy.backoff_delay(attempt + 1)
+                if deadline is not None:
+                    remaining = deadline - time.monotonic() - delay
+                    if remaining <= 0:
+                        raise
+                    params = {**params, "timeout": policy.timeout(remaining)}
+                if not self.policies.allow_retry(policy):
+                    raise
+                attempt += 1
+                _LOGGER.debug("Retrying %s after %s", url, type(ex).__name__)
+                time.sleep(delay)
+                continue
+            self.policies.record(policy, time.monotonic() - started)
+            return response
+
+    def _hedged_request(self, policy, method, url, params):
+        """Send a second request when the first is slower than the p95 of its policy."""
+        delay = self.policies.hedge_delay(policy)
+        if delay is None:
+            return self.session.request(method, url, **params)
+        if self._hedge_executor is None:
+            with self._runtime_lock:
+                if self._hedge_executor is None:
+                    self._hedge_executor = ThreadPoolExecutor(
+                        max_workers=POOL_SIZE * 2,
+                        thread_name_prefix=f"sony_ubpx800_hedge_{self.host}")
+        executor = self._hedge_executor
+        first = executor.submit(self.session.request, method, url, **params)
+        if wait([first], timeout=delay).done:
+            return first.result()
+        pending = {first, executor.submit(self.session.request, method, url, **params)}
+        error = None
+        while pending:
+            done, pending = wait(pending, return_when=FIRST_COMPLETED)
+            for future in done:
+                if future.exception() is not None:
+                    error = future.exception()
+                    continue
+                self.policies.record_hedge(policy, future is not first)
+                # The answer of the slower request is dropped once it arrives
+                for other in pending:
+                    other.add_done_callback(_close_response)
+                return future.result()
+        self.policies.record_hedge(policy, False)
+        raise error
+
+    def _send_soap(self, url, params, action, log_errors=True, timeout=TIMEOUT,
+                   raise_errors=False):
+        # pylint: disable=too-many-arguments
         headers = {
             "Content-Type": "text/xml",
-            "Connection": "Close",
             'SOAPACTION': f'"{action}"'
         }
 
@@ -673,12 +1088,31 @@ class SonyDevice:
                             {params}
                         </SOAP-ENV:Body>
                     </SOAP-ENV:Envelope>"""
-        response = self._send_http(
-            url, method=HttpMethod.POST, headers=headers, data=data, log_errors=log_errors)
+        name = action.rsplit("#", 1)[-1]
+        return self._send_http(
+            url, method=HttpMethod.POST, headers=headers, data=data, log_errors=log_errors,
+            raise_errors=raise_errors, timeout=timeout, endpoint=name,
+            policy=STATUS_READ if name.startswith("Get") else COMMAND)
+
+    def _post_soap_request(self, url, params, action, log_errors=True):
+        response = self._send_soap(url, params, action, log_errors=log_errors)
         if response:
             return response.content.decode("utf-8")
         return False
 
+    def _call_soap_action(self, url, params, action, result_type,
+                          log_errors=True, timeout=TIMEOUT):
+        # pylint: disable=too-many-arguments
+        """Post a SOAP action and return its decoded result, None on failure."""
+        response = self._send_soap(url, params, action, log_errors=log_errors, timeout=timeout)
+        if not response:
+            return None
+        try:
+            return decode_soap_response(response.content, result_type)
+        except (SoapFault, SyntaxError, ValueError) as ex:
+            _LOGGER.debug("Invalid %s response: %s", action.rsplit("#", 1)[-1], ex)
+            return None
+
     def _send_req_ircc(self, params):
         """Send an IRCC command via HTTP to Sony Bravia."""
         data = f"""<u:X_SendIRCC xmlns:u="urn:schemas-sony-com:service:IRCC:1">
@@ -686,17 +1120,23 @@ class SonyDevice:
                   </u:X_SendIRCC>"""
         action = "urn:schemas-sony-com:service:IRCC:1#X_SendIRCC"
 
+        started = time.monotonic()
         content = self._post_soap_request(
             url=self.control_url, params=data, action=action, log_errors=False)
+        self.pacer.record(started, time.monotonic() - started, bool(content))
         return content
 
     def _send_command(self, name):
+        """Send a key, return whether the device acknowledged it."""
         if not self.commands:
             self.init_device()
 
         if self.commands:
             if name in self.commands:
-                self._send_req_ircc(self.commands[name].value)
+                # Any key may leave the home screen
+                self._home_status = None
+                with self._command_lock:
+                    return bool(self._send_req_ircc(self.commands[name].value))
             else:
                 raise ValueError(f'Unknown command: {name}')
         else:
@@ -716,7 +1156,9 @@ class SonyDevice:
             self._send_http(
                 registration_action.url,
                 method=HttpMethod.GET,
-                raise_errors=True)
+                raise_errors=True,
+                retry_auth=False,
+                policy=REGISTRATION)
             # set the pin to something to make sure init_device is called
             self.pin = 9999
         except requests.exceptions.RequestException:
@@ -734,7 +1176,8 @@ class SonyDevice:
     def _register_v3(self, registration_action):
         try:
             self._send_http(registration_action.url,
-                            method=HttpMethod.GET, raise_errors=True)
+                            method=HttpMethod.GET, raise_errors=True, retry_auth=False,
+                            policy=REGISTRATION)
         except requests.exceptions.RequestException as ex:
             return self._handle_register_error(ex)
         return AuthenticationResult.SUCCESS
@@ -757,7 +1200,9 @@ class SonyDevice:
                                        headers=headers,
                                        auth=('', auth_pin),
                                        data=json.dumps(authorization),
-                                       raise_errors=True)
+                                       raise_errors=True,
+                                       retry_auth=False,
+                                       policy=REGISTRATION)
 
         except requests.exceptions.RequestException as ex:
             return self._handle_register_error(ex)
@@ -778,13 +1223,36 @@ class SonyDevice:
         """Recreate auth cookie for all urls
 
         Default cookie is for URL/sony.
-        For some commands we need it for the root path
+        For some commands we need it for the root path. The jar is only
+        built again once the device handed out a new auth cookie.
         """
+        auth = self.cookies.get("auth") if self.cookies is not None else None
+        cached = self._auth_cookie_jar
+        if cached is not None and cached[0] == auth:
+            return cached[1]
         # pylint: disable=abstract-class-instantiated
         cookies = requests.cookies.RequestsCookieJar()
-        cookies.set("auth", self.cookies.get("auth"))
+        cookies.set("auth", auth)
+        self._auth_cookie_jar = (auth, cookies)
         return cookies
 
+    def _reauthenticate(self):
+        """Register again after the device rejected a request.
+
+        Unlike register the device is not read again, only the credentials
+        are renewed. Returns whether that worked.
+        """
+        registration_action = self.actions.get("register")
+        if registration_action is None or registration_action.mode < 3 or not self.pin:
+            return False
+        self._recreate_authentication()
+        if registration_action.mode == 3:
+            result = self._register_v3(registration_action)
+        else:
+            result = self._register_v4(registration_action)
+        _LOGGER.debug("Registered again after an authentication error: %s", result)
+        return result is AuthenticationResult.SUCCESS
+
     def _set_value(self, attribute, value):
         if not hasattr(self, attribute):
             setattr(self, attribute, value)
@@ -837,28 +1305,59 @@ class SonyDevice:
 
     def wakeonlan(self, broadcast=None):
         """Start the device via wakeonlan."""
+        import wakeonlan  # pylint: disable=import-outside-toplevel
+
         broadcast = broadcast or self.broadcast_address
 
         if self.mac:
             wakeonlan.send_magic_packet(self.mac, ip_address=broadcast)
 
-    def get_status(self):
+    def _read_status(self, timeout=TIMEOUT):
+        """Return the decoded getStatus document, None if the device does not answer."""
         try:
             response = self._send_http(
                 self._get_action(
-                    "getStatus").url, method=HttpMethod.GET, raise_errors=True, log_errors=False)
-        except requests.exceptions.RequestException as ex:
+                    "getStatus").url, method=HttpMethod.GET, raise_errors=True, log_errors=False,
+                timeout=timeout, policy=LIVENESS)
+        except requests.exceptions.RequestException:
+            self.player_status = None
+            return None
+        try:
+            status = parse_status(response.content)
+        except ValueError as ex:
+            _LOGGER.debug("Unexpected getStatus answer: %s", ex)
+            status = PlayerStatus()
+        self.player_status = status
+        self._home_status = (time.monotonic(), status.at_home)
+        return status
+
+    def get_status(self, timeout=TIMEOUT):
+        status = self._read_status(timeout=timeout)
+        if status is None:
             return "OFF"
-        if "viewing" in response.text:
-            return "PLAYING"
-        return "IDLE"
+        return status.playback_status
+
+    def _at_home(self):
+        """Return whether the player is idle, neither playing a disc nor running an app.
 
-    def get_playing_status(self):
+        A status read by the last refresh is used while it is recent and no
+        key was sent since, otherwise the status is read again.
+        """
+        if "getStatus" not in self.actions:
+            return False
+        home_status = self._home_status
+        if home_status is None or time.monotonic() - home_status[0] > STATUS_MAX_AGE:
+            if self._read_status() is None:
+                return False
+            home_status = self._home_status
+        return home_status[1]
+
+    def get_playing_status(self, timeout=TIMEOUT):
         # The UBP-X800 always returns NO_MEDIA_PRESENT from GetTransportInfo call.
         # Use get_status() instead. If the XML contains a status element with "viewing" attribute
         # a disc is currently being played. Otherwise it will be idle (stopped)
         if self.model_name == "UBP-X800":
-            return self.get_status()            
+            return self.get_status(timeout=timeout)
         """Get the status of playback from the device"""
         data = """<m:GetTransportInfo xmlns:m="urn:schemas-upnp-org:service:AVTransport:1">
             <InstanceID>0</InstanceID>
@@ -866,12 +1365,12 @@ class SonyDevice:
 
         action = "urn:schemas-upnp-org:service:AVTransport:1#GetTransportInfo"
 
-        content = self._post_soap_request(
-            url=self.av_transport_url, params=data, action=action)
-        if not content:
+        transport_info = self._call_soap_action(
+            self.av_transport_url, data, action, TransportInfo, timeout=timeout)
+        if transport_info is None:
             return "OFF"
-        
-        return find_in_xml(content, [".//CurrentTransportState"]).text
+
+        return transport_info.transport_state
 
     def get_transport_info(self):
         """Get the status of playback from the device"""
@@ -881,30 +1380,180 @@ class SonyDevice:
 
         action = "urn:schemas-upnp-org:service:AVTransport:1#GetTransportInfo"
 
-        content = self._post_soap_request(
-            url=self.av_transport_url, params=data, action=action)
-        if not content:
-            return
-        return xmltodict.parse(content)
-    
-    def get_position_info(self):
-        """Get the elapsed and total time"""
+        return self._call_soap_action(
+            self.av_transport_url, data, action, TransportInfo)
+
+    def get_position(self, timeout=TIMEOUT):
+        """Get the position of the current track"""
         data = """<m:GetPositionInfo xmlns:m="urn:schemas-upnp-org:service:AVTransport:1">
             <InstanceID>0</InstanceID>
             </m:GetPositionInfo>"""
 
         action = "urn:schemas-upnp-org:service:AVTransport:1#GetPositionInfo"
 
-        content = self._post_soap_request(
-            url=self.av_transport_url, params=data, action=action, log_errors=False)
-        if not content:
+        return self._call_soap_action(
+            self.av_transport_url, data, action, PositionInfo,
+            log_errors=False, timeout=timeout)
+
+    def get_position_info(self):
+        """Get the elapsed and total time, with the metadata of the track"""
+        position_info = self.get_position()
+        if position_info is None:
             return
-        duration = find_in_xml(content, [".//TrackDuration"]).text
-        position = find_in_xml(content, [".//RelTime"]).text
-        return {"duration": duration, "position": position}
+        return {
+            "duration": position_info.track_duration,
+            "position": position_info.rel_time,
+            "track": position_info.track,
+            "track_uri": position_info.track_uri,
+            "metadata": self.metadata_cache.get(
+                position_info.track_uri, position_info.track_metadata),
+        }
 
-    def get_volume(self, channel=None, instance_id=0):
-        """Get device volume."""
+    def get_media_metadata(self, position_info, media_info):
+        """Return the metadata of the current track, None if the player sends none.
+
+        TrackMetaData of GetPositionInfo describes the track, the
+        CurrentURIMetaData of GetMediaInfo is used when it is missing. The
+        track number reported by GetPositionInfo fills in for one missing
+        from the metadata.
+        """
+        metadata = None
+        if position_info is not None:
+            metadata = self.metadata_cache.get(
+                position_info.track_uri, position_info.track_metadata)
+        if metadata is None and media_info is not None:
+            metadata = self.metadata_cache.get(
+                media_info.current_uri, media_info.current_uri_metadata)
+        # Track 0 means there is none
+        if position_info is not None and position_info.track \
+                and (metadata is None or metadata.track_number is None):
+            metadata = dataclasses.replace(
+                metadata or MediaMetadata(), track_number=position_info.track)
+        return metadata
+
+    def get_media_info(self, timeout=TIMEOUT):
+        """Get the loaded media of the device"""
+        data = """<m:GetMediaInfo xmlns:m="urn:schemas-upnp-org:service:AVTransport:1">
+            <InstanceID>0</InstanceID>
+            </m:GetMediaInfo>"""
+
+        action = "urn:schemas-upnp-org:service:AVTransport:1#GetMediaInfo"
+
+        return self._call_soap_action(
+            self.av_transport_url, data, action, MediaInfo,
+            log_errors=False, timeout=timeout)
+
+    def seek(self, position, current=None):
+        """Move playback to position seconds into the title.
+
+        The AVTransport Seek action with REL_TIME is tried first. When the
+        player rejects it and the current position is known, the jump is
+        made with a burst of at most MAX_SEEK_KEYS Advance or Replay keys
+        instead. Those only land near position, and a long jump stops short.
+        """
+        target = format_time(position)
+        data = f"""<m:Seek xmlns:m="urn:schemas-upnp-org:service:AVTransport:1">
+            <InstanceID>0</InstanceID>
+            <Unit>REL_TIME</Unit>
+            <Target>{target}</Target>
+            </m:Seek>"""
+
+        action = "urn:schemas-upnp-org:service:AVTransport:1#Seek"
+
+        try:
+            self._send_soap(
+                self.av_transport_url, data, action, log_errors=False, raise_errors=True)
+        except requests.exceptions.HTTPError as ex:
+            _LOGGER.debug("Seek to %s rejected: %s", target, ex)
+        except requests.exceptions.RequestException as ex:
+            _LOGGER.debug("Seek to %s failed: %s", target, ex)
+            return SeekResult(None)
+        else:
+            return SeekResult("seek", position=position)
+
+        if current is None:
+            return SeekResult(None)
+        keys, moved = self._seek_keys(position - current)
+        if not keys:
+            return SeekResult(None)
+        with self._command_lock:
+            for sent, key in enumerate(keys):
+                self.pacer.wait()
+                if not self._send_req_ircc(self.commands[key].value):
+                    return SeekResult("keys", keys[:sent])
+        return SeekResult("keys", keys, current + moved)
+
+    def _seek_keys(self, offset):
+        """Return the keys moving playback by about offset seconds, and by how much.
+
+        Only Advance and Replay are used, the chapter keys jump to chapter
+        boundaries which are not known. A jump of more than MAX_SEEK_KEYS
+        skips stops short.
+        """
+        skip, skip_secs = ("Advance", ADVANCE_SECS) if offset > 0 else ("Replay", -REPLAY_SECS)
+        if skip not in self.commands:
+            return (), 0
+        keys = (skip,) * min(round(offset / skip_secs), MAX_SEEK_KEYS)
+        return keys, len(keys) * skip_secs
+
+    def _refresh_executor(self):
+        if self._executor is None:
+            with self._runtime_lock:
+                if self._executor is None:
+                    self._executor = ThreadPoolExecutor(
+                        max_workers=len(self._REFRESH_PARTS),
+                        thread_name_prefix=f"sony_ubpx800_{self.host}")
+        return self._executor
+
+    def refresh(self, timeout=REFRESH_TIMEOUT):
+        """Read status, position, media info and volume in one go.
+
+        The requests are sent concurrently over the pooled session and each
+        has to finish within timeout seconds, retries included. A part which
+        fails or misses the deadline keeps its value from the previous
+        snapshot, and is not read again while its request is still running.
+        Returns the new DeviceSnapshot, which is also kept in self.snapshot.
+        """
+        previous = self.snapshot
+        executor = self._refresh_executor()
+        futures = {}
+        for part, method in self._REFRESH_PARTS.items():
+            running = self._refresh_futures.get(part)
+            if running is not None and not running.done():
+                _LOGGER.debug("Refresh of %s still running, keeping its value", part)
+                futures[part] = running
+            else:
+                futures[part] = executor.submit(getattr(self, method), timeout=timeout)
+        self._refresh_futures = futures
+        done, _ = wait(futures.values(), timeout=timeout)
+
+        values = {}
+        stale = set()
+        for part, future in futures.items():
+            value = None
+            if future in done:
+                try:
+                    value = future.result()
+                except Exception as ex:  # pylint: disable=broad-except
+                    _LOGGER.debug("Refresh of %s failed: %s", part, ex)
+            if value is None or (part != "status" and values["status"] == "OFF"):
+                value = getattr(previous, part)
+                stale.add(part)
+            values[part] = value
+
+        # Read along with the status, dropped with it when the player is off
+        if values["status"] == "OFF":
+            player_status = media_metadata = None
+        else:
+            player_status = self.player_status
+            media_metadata = self.get_media_metadata(values["position_info"], values["media_info"])
+        self.snapshot = DeviceSnapshot(
+            **values, player_status=player_status, media_metadata=media_metadata,
+            stale=frozenset(stale), updated_at=time.time())
+        return self.snapshot
+
+    def get_volume_info(self, channel=None, instance_id=0, timeout=TIMEOUT):
+        """Get device volume, None if it can not be read."""
         channel = channel or "Master"
 
         data = f"""<m:GetVolume xmlns:m="urn:schemas-upnp-org:service:RenderingControl:1">
@@ -914,13 +1563,18 @@ class SonyDevice:
 
         action = "urn:schemas-upnp-org:service:RenderingControl:1#GetVolume"
 
-        content = self._post_soap_request(
-            url=self.rendering_control_url, params=data, action=action)
+        return self._call_soap_action(
+            self.rendering_control_url, data, action, VolumeInfo,
+            log_errors=False, timeout=timeout)
 
-        if not content:
+    def get_volume(self, channel=None, instance_id=0):
+        """Get device volume."""
+        volume_info = self.get_volume_info(channel, instance_id)
+
+        if volume_info is None or volume_info.current_volume is None:
             return -1
 
-        return int(find_in_xml(content, [".//CurrentVolume"]).text)
+        return volume_info.current_volume
 
     def set_volume(self, volume, channel=None, instance_id=0):
         """Set device volume."""
@@ -948,7 +1602,7 @@ class SonyDevice:
             url = self.actionlist_url
             try:
                 self._send_http(url, HttpMethod.GET,
-                                log_errors=False, raise_errors=True)
+                                log_errors=False, raise_errors=True, policy=LIVENESS)
             except requests.exceptions.RequestException as ex:
                 _LOGGER.debug(ex)
                 return False
@@ -957,7 +1611,8 @@ class SonyDevice:
             resp = self._send_http(urljoin(self.base_url, "system"),
                                    HttpMethod.POST,
                                    json=self._create_api_json(
-                                       "getPowerStatus"))
+                                       "getPowerStatus"),
+                                   policy=LIVENESS)
             if not resp:
                 return False
             json_data = resp.json()
@@ -970,8 +1625,10 @@ class SonyDevice:
 
     def start_app(self, app_name):
         """Start an app by name"""
-        # sometimes device does not start app if already running one
-        self.home()
+        # sometimes device does not start app if already running one,
+        # asking for the status is quicker than going through the home screen
+        if not self._at_home():
+            self.home()
 
         if self.api_version < 4:
             url = f"{self.app_url}/apps/{self.apps[app_name].id}"
@@ -979,8 +1636,8 @@ class SonyDevice:
             self._send_http(url, HttpMethod.POST, data=data)
         else:
             url = f'http://{self.host}/DIAL/apps/{self.apps[app_name].id}'
-            self._send_http(url, HttpMethod.POST,
-                            cookies=self._recreate_auth_cookie())
+            self._send_http(url, HttpMethod.POST, auth_cookie=True)
+        self._home_status = (time.monotonic(), False)
 
     def power(self, power_on, broadcast=None):
         """Powers the device on or shuts it off."""
@@ -989,12 +1646,118 @@ class SonyDevice:
             # Try using the power on command incase the WOL doesn't work
             if not self.get_power_status():
                 # Try using the power on command incase the WOL doesn't work
-                self._send_command('Power')
-        else:
-            self._send_command('Power')
+                return self._send_command('Power')
+            return True
+        return self._send_command('Power')
             
     def send_command(self, command):
-        self._send_command(command)
+        return self._send_command(command)
+
+    def press_key(self, name):
+        """Send a key once, return whether it was acknowledged and the round trip in seconds."""
+        if not self.commands:
+            self.init_device()
+        if name not in self.commands:
+            raise ValueError(f'Unknown command: {name}')
+        with self._command_lock:
+            self._home_status = None
+            started = time.monotonic()
+            acknowledged = bool(self._send_req_ircc(self.commands[name].value))
+        return acknowledged, time.monotonic() - started
+
+    def hold_key(self, name, hold_secs, rate=HOLD_RATE, cancel=None):
+        # pylint: disable=too-many-arguments
+        """Repeat a key rate times per second until hold_secs pass or cancel is set.
+
+        Presses are scheduled against the start of the hold, so a slow
+        answer shortens the following wait instead of delaying every later
+        press. Slots missed entirely are skipped rather than sent in a
+        burst. All presses go over the same kept-alive connection.
+        """
+        if not self.commands:
+            self.init_device()
+        if name not in self.commands:
+            raise ValueError(f'Unknown command: {name}')
+        code = self.commands[name].value
+        cancel = cancel or threading.Event()
+        interval = 1 / rate
+        self._home_status = None
+
+        with self._command_lock:
+            started = time.monotonic()
+            presses = errors = skipped = failure_streak = 0
+            slot = 0
+            last_press = started
+            while not cancel.is_set():
+                last_press = time.monotonic()
+                if self._send_req_ircc(code):
+                    failure_streak = 0
+                else:
+                    errors += 1
+                    failure_streak += 1
+                    if failure_streak >= HOLD_MAX_FAILURES:
+                        _LOGGER.debug("Holding %s stopped after %d failed presses", name, errors)
+                        break
+                presses += 1
+                # Next slot which has not started yet
+                due = int((time.monotonic() - started) / interval) + 1
+                skipped += max(0, due - slot - 1)
+                slot = due
+                if slot * interval >= hold_secs:
+                    break
+                if cancel.wait(started + slot * interval - time.monotonic()):
+                    break
+        return HoldResult(
+            presses, errors, skipped, time.monotonic() - started, last_press - started)
+
+    def run_macro(self, macro, cancel=None):
+        """Run a compiled macro as one job, no other key is sent in between.
+
+        Keys are paced by the learned gap unless the step before them
+        carries a delay, which is slept instead. The run stops at the first key the device does not acknowledge and
+        at a wait step whose status is not reached in time.
+        """
+        cancel = cancel or threading.Event()
+        timings = []
+        completed = True
+        with self._command_lock:
+            self._home_status = None
+            started = time.monotonic()
+            delayed = False
+            for step in macro.steps:
+                if cancel.is_set():
+                    completed = False
+                    break
+                if step.code is not None and not delayed:
+                    self.pacer.wait()
+                step_started = time.monotonic()
+                if step.code is not None:
+                    ok = bool(self._send_req_ircc(step.code))
+                elif step.status is not None:
+                    ok = self._wait_for_status(step.status, step.timeout, cancel)
+                else:
+                    ok = True
+                timings.append(StepTiming(
+                    step.label, step_started - started, time.monotonic() - step_started, ok))
+                if not ok:
+                    completed = False
+                    break
+                if step.delay and cancel.wait(step.delay):
+                    completed = False
+                    break
+                delayed = step.delay is not None
+            self._home_status = None
+        return MacroResult(macro.name, tuple(timings), time.monotonic() - started, completed)
+
+    def _wait_for_status(self, status, timeout, cancel):
+        """Poll the status until it matches, False once timeout passed."""
+        deadline = time.monotonic() + timeout
+        while True:
+            if self.get_status(timeout=min(TIMEOUT, max(timeout, WAIT_POLL))) == status:
+                return True
+            remaining = deadline - time.monotonic()
+            if remaining <= 0 or cancel.wait(min(WAIT_POLL, remaining)):
+                return False
 
     def get_apps(self):
         """Get the apps from the stored dict."""
@@ -1003,207 +1766,207 @@ class SonyDevice:
     def volume_up(self):
         # pylint: disable=invalid-name
         """Send the command 'VolumeUp' to the connected device."""
-        self._send_command('VolumeUp')
+        return self._send_command('VolumeUp')
 
     def volume_down(self):
         # pylint: disable=invalid-name
         """Send the command 'VolumeDown' to the connected device."""
-        self._send_command('VolumeDown')
+        return self._send_command('VolumeDown')
 
     def mute(self):
         # pylint: disable=invalid-name
         """Send the command 'Mute' to the connected device."""
-        self._send_command('Mute')
+        return self._send_command('Mute')
 
     def up(self):
         # pylint: disable=invalid-name
         """Send the command 'up' to the connected device."""
-        self._send_command('Up')
+        return self._send_command('Up')
 
     def confirm(self):
         """Send the command 'confirm' to the connected device."""
-        self._send_command('Confirm')
+        return self._send_command('Confirm')
 
     def down(self):
         """Send the command 'down' to the connected device."""
-        self._send_command('Down')
+        return self._send_command('Down')
 
     def right(self):
         """Send the command 'right' to the connected device."""
-        self._send_command('Right')
+        return self._send_command('Right')
 
     def left(self):
         """Send the command 'left' to the connected device."""
-        self._send_command('Left')
+        return self._send_command('Left')
 
     def home(self):
         """Send the command 'home' to the connected device."""
-        self._send_command('Home')
+        return self._send_command('Home')
 
     def options(self):
         """Send the command 'options' to the connected device."""
-        self._send_command('Options')
+        return self._send_command('Options')
 
     def returns(self):
         """Send the command 'returns' to the connected device."""
-        self._send_command('Return')
+        return self._send_command('Return')
 
     def num1(self):
         """Send the command 'num1' to the connected device."""
-        self._send_command('Num1')
+        return self._send_command('Num1')
 
     def num2(self):
         """Send the command 'num2' to the connected device."""
-        self._send_command('Num2')
+        return self._send_command('Num2')
 
     def num3(self):
         """Send the command 'num3' to the connected device."""
-        self._send_command('Num3')
+        return self._send_command('Num3')
 
     def num4(self):
         """Send the command 'num4' to the connected device."""
-        self._send_command('Num4')
+        return self._send_command('Num4')
 
     def num5(self):
         """Send the command 'num5' to the connected device."""
-        self._send_command('Num5')
+        return self._send_command('Num5')
 
     def num6(self):
         """Send the command 'num6' to the connected device."""
-        self._send_command('Num6')
+        return self._send_command('Num6')
 
     def num7(self):
         """Send the command 'num7' to the connected device."""
-        self._send_command('Num7')
+        return self._send_command('Num7')
 
     def num8(self):
         """Send the command 'num8' to the connected device."""
-        self._send_command('Num8')
+        return self._send_command('Num8')
 
     def num9(self):
         """Send the command 'num9' to the connected device."""
-        self._send_command('Num9')
+        return self._send_command('Num9')
 
     def num0(self):
         """Send the command 'num0' to the connected device."""
-        self._send_command('Num0')
+        return self._send_command('Num0')
 
     def display(self):
         """Send the command 'display' to the connected device."""
-        self._send_command('Display')
+        return self._send_command('Display')
 
     def audio(self):
         """Send the command 'audio' to the connected device."""
-        self._send_command('Audio')
+        return self._send_command('Audio')
 
     def sub_title(self):
         """Send the command 'subTitle' to the connected device."""
-        self._send_command('SubTitle')
+        return self._send_command('SubTitle')
 
     def favorites(self):
         """Send the command 'favorites' to the connected device."""
-        self._send_command('Favorites')
+        return self._send_command('Favorites')
 
     def yellow(self):
         """Send the command 'yellow' to the connected device."""
-        self._send_command('Yellow')
+        return self._send_command('Yellow')
 
     def blue(self):
         """Send the command 'blue' to the connected device."""
-        self._send_command('Blue')
+        return self._send_command('Blue')
 
     def red(self):
         """Send the command 'red' to the connected device."""
-        self._send_command('Red')
+        return self._send_command('Red')
 
     def green(self):
         """Send the command 'green' to the connected device."""
-        self._send_command('Green')
+        return self._send_command('Green')
 
     def play(self):
         """Send the command 'play' to the connected device."""
-        self._send_command('Play')
+        return self._send_command('Play')
 
     def stop(self):
         """Send the command 'stop' to the connected device."""
-        self._send_command('Stop')
+        return self._send_command('Stop')
 
     def pause(self):
         """Send the command 'pause' to the connected device."""
-        self._send_command('Pause')
+        return self._send_command('Pause')
 
     def rewind(self):
         """Send the command 'rewind' to the connected device."""
-        self._send_command('Rewind')
+        return self._send_command('Rewind')
 
     def forward(self):
         """Send the command 'forward' to the connected device."""
-        self._send_command('Forward')
+        return self._send_command('Forward')
 
     def prev(self):
         """Send the command 'prev' to the connected device."""
-        self._send_command('Prev')
+        return self._send_command('Prev')
 
     def next(self):
         """Send the command 'next' to the connected device."""
-        self._send_command('Next')
+        return self._send_command('Next')
 
     def replay(self):
         """Send the command 'replay' to the connected device."""
-        self._send_command('Replay')
+        return self._send_command('Replay')
 
     def advance(self):
         """Send the command 'advance' to the connected device."""
-        self._send_command('Advance')
+        return self._send_command('Advance')
 
     def angle(self):
         """Send the command 'angle' to the connected device."""
-        self._send_command('Angle')
+        return self._send_command('Angle')
 
     def top_menu(self):
         """Send the command 'top_menu' to the connected device."""
-        self._send_command('TopMenu')
+        return self._send_command('TopMenu')
 
     def pop_up_menu(self):
         """Send the command 'pop_up_menu' to the connected device."""
-        self._send_command('PopUpMenu')
+        return self._send_command('PopUpMenu')
 
     def eject(self):
         """Send the command 'eject' to the connected device."""
-        self._send_command('Eject')
+        return self._send_command('Eject')
 
     def karaoke(self):
         """Send the command 'karaoke' to the connected device."""
-        self._send_command('Karaoke')
+        return self._send_command('Karaoke')
 
     def netflix(self):
         """Send the command 'netflix' to the connected device."""
-        self._send_command('Netflix')
+        return self._send_command('Netflix')
 
     def mode_3d(self):
         """Send the command 'mode_3d' to the connected device."""
-        self._send_command('Mode3D')
+        return self._send_command('Mode3D')
 
     def zoom_in(self):
         """Send the command 'zoom_in' to the connected device."""
-        self._send_command('ZoomIn')
+        return self._send_command('ZoomIn')
 
     def zoom_out(self):
         """Send the command 'zoom_out' to the connected device."""
-        self._send_command('ZoomOut')
+        return self._send_command('ZoomOut')
 
     def browser_back(self):
         """Send the command 'browser_back' to the connected device."""
-        self._send_command('BrowserBack')
+        return self._send_command('BrowserBack')
 
     def browser_forward(self):
         """Send the command 'browser_forward' to the connected device."""
-        self._send_command('BrowserForward')
+        return self._send_command('BrowserForward')
 
     def browser_bookmark_list(self):
         """Send the command 'browser_bookmarkList' to the connected device."""
-        self._send_command('BrowserBookmarkList')
+        return self._send_command('BrowserBookmarkList')
 
     def list(self):
         """Send the command 'list' to the connected device."""
-        self._send_command('List')
\ No newline at end of file
+        return self._send_command('List')
\ No newline at end of file
@@ -0,0 +1,96 @@
+"""Diagnostics support for the Sony UBP-X800.
+
+Everything is read from memory so a diagnostics download never waits on
+a player which is switched off or unreachable.
+"""
+from __future__ import annotations
+
+from typing import Any
+
+from homeassistant.components.diagnostics import async_redact_data
+from homeassistant.config_entries import ConfigEntry
+from homeassistant.core import HomeAssistant
+
+from .const import DOMAIN, SONY_COORDINATOR, CONF_PIN
+
+TO_REDACT = {
+    CONF_PIN,
+    "cookies",
+    "psk",
+    "Authorization",
+    "X-Auth-PSK",
+}
+
+PROFILE_ATTRIBUTES = (
+    "host",
+    "nickname",
+    "client_id",
+    "friendly_name",
+    "manufacturer",
+    "model_name",
+    "model_number",
+    "api_version",
+    "dmr_url",
+    "ircc_url",
+    "actionlist_url",
+    "control_url",
+    "av_transport_url",
+    "rendering_control_url",
+    "app_url",
+    "base_url",
+    "pin",
+    "psk",
+    "cookies",
+    "headers",
+)
+
+
+def _device_profile(sony_device) -> dict[str, Any]:
+    """Return the stored profile of the device."""
+    profile = {
+        attribute: getattr(sony_device, attribute, None)
+        for attribute in PROFILE_ATTRIBUTES
+    }
+    profile["headers"] = dict(profile["headers"] or {})
+    profile["commands"] = len(sony_device.commands)
+    profile["actions"] = len(sony_device.actions)
+    profile["apps"] = len(sony_device.apps)
+    return profile
+
+
+async def async_get_config_entry_diagnostics(
+        hass: HomeAssistant, entry: ConfigEntry
+) -> dict[str, Any]:
+    """Return diagnostics for a config entry."""
+    coordinator = hass.data[DOMAIN][entry.entry_id][SONY_COORDINATOR]
+    sony_device = coordinator.api
+    metrics = sony_device.metrics
+    return {
+        "entry": async_redact_data(
+            {"data": dict(entry.data), "options": dict(entry.options)}, TO_REDACT
+        ),
+        "device": async_redact_data(_device_profile(sony_device), TO_REDACT),
+        "coordinator": {
+            "state": coordinator.device_data.state,
+            "player_status": (
+                player_status.as_dict()
+                if (player_status := coordinator.device_data.player_status) is not None else None
+            ),
+            "initialized": coordinator.device_data._init,  # pylint: disable=protected-access
+            "last_update_success": coordinator.last_update_success,
+            "failure_streak": coordinator.failure_streak,
+            "volume_requests": coordinator.volume_writer.requests,
+            "volume_writes": coordinator.volume_writer.writes,
+            "refreshes": [
+                {"time": started_at, "duration_ms": round(duration * 1000, 2), "success": success}
+                for started_at, duration, success in coordinator.refresh_history
+            ],
+        },
+        "key_pacing": sony_device.pacer.as_dict(),
+        "authentication": sony_device.auth.as_dict(),
+        "request_policies": sony_device.policies.as_dict(),
+        "requests": {
+            "totals": metrics.totals(),
+            **metrics.as_dict(),
+        },
+    }
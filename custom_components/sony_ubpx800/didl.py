@@ -0,0 +1,122 @@
+"""Decoding of DIDL-Lite media metadata.
+
+GetPositionInfo and GetMediaInfo describe the current track with a
+DIDL-Lite document in TrackMetaData and CurrentURIMetaData. The player
+sends the same document on every poll, so decoded metadata is kept in a
+small LRU cache keyed by the track URI and a document is only parsed again
+when it changed.
+"""
+from __future__ import annotations
+
+import logging
+import threading
+from collections import OrderedDict
+from dataclasses import dataclass
+
+from .xml_helper import local_name, parse_xml
+
+_LOGGER = logging.getLogger(__name__)
+
+URN_DIDL = "{urn:schemas-upnp-org:metadata-1-0/DIDL-Lite/}"
+URN_DC = "{http://purl.org/dc/elements/1.1/}"
+URN_UPNP = "{urn:schemas-upnp-org:metadata-1-0/upnp/}"
+# Tracks whose metadata is kept
+METADATA_CACHE_SIZE = 32
+# Placeholders sent instead of a document
+_NO_METADATA = ("", "NOT_IMPLEMENTED")
+
+
+@dataclass(frozen=True, slots=True)
+class MediaMetadata:
+    """The fields of a DIDL-Lite item shown for the current track."""
+
+    title: str | None = None
+    track_number: int | None = None
+    # upnp:class, such as object.item.videoItem.movie
+    upnp_class: str | None = None
+    artist: str | None = None
+    album: str | None = None
+
+
+def _to_int(value):
+    try:
+        return int(value)
+    except (TypeError, ValueError):
+        return None
+
+
+def parse_didl(content):
+    """Decode the first item or container of a DIDL-Lite document.
+
+    Returns None for empty placeholders, raises ValueError for documents
+    which can not be parsed.
+    """
+    if content is None or content.strip() in _NO_METADATA:
+        return None
+    try:
+        root = parse_xml(content)
+    except SyntaxError as ex:  # The ParseError of ElementTree and lxml
+        raise ValueError(f"Invalid DIDL-Lite document: {ex}") from None
+    if local_name(root.tag) != "DIDL-Lite":
+        raise ValueError(f"Expected DIDL-Lite, got {local_name(root.tag)}")
+    item = root.find(f"{URN_DIDL}item")
+    if item is None:
+        item = root.find(f"{URN_DIDL}container")
+    if item is None:
+        return None
+    return MediaMetadata(
+        title=item.findtext(f"{URN_DC}title"),
+        track_number=_to_int(item.findtext(f"{URN_UPNP}originalTrackNumber")),
+        upnp_class=item.findtext(f"{URN_UPNP}class"),
+        artist=item.findtext(f"{URN_UPNP}artist") or item.findtext(f"{URN_DC}creator"),
+        album=item.findtext(f"{URN_UPNP}album"),
+    )
+
+
+class MetadataCache:
+    """Bounded LRU cache of decoded metadata keyed by track URI.
+
+    An entry also holds the document it was decoded from, so metadata
+    changing under the same URI, like the chapter of a disc, is decoded
+    again instead of served stale.
+    """
+
+    def __init__(self, maxsize=METADATA_CACHE_SIZE, on_lookup=None):
+        """Initialize, on_lookup is called with whether a lookup was a hit."""
+        self._maxsize = maxsize
+        self._on_lookup = on_lookup
+        self._entries = OrderedDict()
+        # Position and media info are decoded by concurrent refresh threads
+        self._lock = threading.Lock()
+
+    def get(self, uri, content):
+        """Return the metadata of the track at uri described by content."""
+        if content is None or content.strip() in _NO_METADATA:
+            return None
+        with self._lock:
+            entry = self._entries.get(uri)
+            hit = entry is not None and entry[0] == content
+            if hit:
+                self._entries.move_to_end(uri)
+        if self._on_lookup is not None:
+            self._on_lookup(hit)
+        if hit:
+            return entry[1]
+        try:
+            metadata = parse_didl(content)
+        except ValueError as ex:
+            _LOGGER.debug("Ignoring metadata of %s: %s", uri, ex)
+            metadata = None
+        with self._lock:
+            self._entries[uri] = (content, metadata)
+            self._entries.move_to_end(uri)
+            while len(self._entries) > self._maxsize:
+                self._entries.popitem(last=False)
+        return metadata
+
+    def __len__(self):
+        return len(self._entries)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
@@ -0,0 +1,135 @@
+"""IRCC key codes of the supported Sony devices.
+
+This module has no dependencies outside the standard library so it can
+also be loaded on its own, e.g. by the device emulator in tools/.
+"""
+import base64
+import struct
+import threading
+from enum import Enum
+from types import MappingProxyType
+
+# The trailing byte of every IRCC code sent by the supported devices
+IRCC_CODE_SUFFIX = 3
+# Code formats announced in X_CategoryInfo by the supported devices
+IRCC_FORMATS = (3,)
+
+
+class IrccCategory(Enum):
+    """Device categories used by IRCC."""
+
+    TV1 = 1
+    AUSYS3 = 80
+    TV1EEE = 119
+    TV1E = 164
+    AUSYS3E = 208
+    AUSYS3SE = 528
+    AUSYS3EE = 1552
+    DVD4 = 3578
+    DVD4E = 3834
+    BD1 = 7258
+
+
+IR_KEY_CODES = {
+    IrccCategory.BD1: (
+        ('Num1', 0),
+        ('Num2', 1),
+        ('Num3', 2),
+        ('Num4', 3),
+        ('Num5', 4),
+        ('Num6', 5),
+        ('Num7', 6),
+        ('Num8', 7),
+        ('Num9', 8),
+        ('Num0', 9),
+        ('Power', 21),
+        ('Eject', 22),
+        ('Stop', 24),
+        ('Pause', 25),
+        ('Play', 26),
+        ('Rewind', 27),
+        ('Forward', 28),
+        ('PopUpMenu', 41),
+        ('TopMenu', 44),
+        ('Up', 57),
+        ('Down', 58),
+        ('Left', 59),
+        ('Right', 60),
+        ('Confirm', 61),
+        ('Options', 63),
+        ('Display', 65),
+        ('Home', 66),
+        ('Return', 67),
+        ('Karaoke', 74),
+        ('Netflix', 75),
+        ('Mode3D', 77),
+        ('Next', 86),
+        ('Prev', 87),
+        ('Favorites', 94),
+        ('SubTitle', 99),
+        ('Audio', 100),
+        ('Angle', 101),
+        ('Blue', 102),
+        ('Red', 103),
+        ('Green', 104),
+        ('Yellow', 105),
+        ('Advance', 117),
+        ('Replay', 118),
+    )
+}
+
+
+def encode_ircc_code(fmt, category_id, code):
+    """Return the base64 IRCC payload for a key code of a category."""
+    value = struct.pack(">IIIB", fmt, category_id, code, IRCC_CODE_SUFFIX)
+    return base64.b64encode(value).decode("ascii")
+
+
+def decode_ircc_code(value):
+    """Return (format, category id, key code) of a base64 IRCC payload."""
+    fmt, category_id, code, _ = struct.unpack(">IIIB", base64.b64decode(value))
+    return fmt, category_id, code
+
+
+def decode_category_info(value):
+    """Return (format, category id) of a base64 X_CategoryInfo value."""
+    return struct.unpack(">HI", base64.b64decode(value))
+
+
+def _build_code_table(fmt, category):
+    """Return a read-only mapping of key name to IRCC payload."""
+    return MappingProxyType({
+        name: encode_ircc_code(fmt, category.value, code)
+        for name, code in IR_KEY_CODES[category]
+    })
+
+
+# Payloads of every known category and format, generated once on import
+IRCC_CODE_TABLES = MappingProxyType({
+    (fmt, category): _build_code_table(fmt, category)
+    for category in IR_KEY_CODES
+    for fmt in IRCC_FORMATS
+})
+
+# Tables of formats not listed in IRCC_FORMATS, filled on first use
+_EXTRA_CODE_TABLES = {}
+_EXTRA_CODE_TABLES_LOCK = threading.Lock()
+
+
+def ircc_code_table(fmt, category):
+    """Return the key name to payload mapping of a category and format.
+
+    Tables outside IRCC_CODE_TABLES are computed on the first request and
+    kept for the lifetime of the process. Returns None for categories
+    without known key codes.
+    """
+    table = IRCC_CODE_TABLES.get((fmt, category))
+    if table is not None:
+        return table
+    if category not in IR_KEY_CODES:
+        return None
+    with _EXTRA_CODE_TABLES_LOCK:
+        table = _EXTRA_CODE_TABLES.get((fmt, category))
+        if table is None:
+            table = _EXTRA_CODE_TABLES[(fmt, category)] = _build_code_table(fmt, category)
+    return table
@@ -0,0 +1,181 @@
+"""Named key sequences for the Sony UBP-X800.
+
+A macro is written as a list of steps, or as one string with the steps
+separated by commas:
+
+    Home, Down*2, Confirm, delay 1.5, wait PLAYING 20
+
+``Key`` sends a remote key and ``Key*N`` sends it N times. Keys are paced
+by the gap learned for the device unless a ``delay SECONDS`` step precedes
+them.
+``wait STATUS [TIMEOUT]`` blocks until the player reports PLAYING, IDLE or
+OFF. Macros are compiled once into the IRCC codes to send, so running one
+does not look anything up.
+"""
+from __future__ import annotations
+
+from dataclasses import dataclass
+
+# Seconds a wait step gives the player to reach the status
+WAIT_TIMEOUT = 10.0
+# Seconds between two status reads of a wait step
+WAIT_POLL = 0.5
+MAX_REPEATS = 50
+MAX_DELAY = 30.0
+WAIT_STATUSES = ("PLAYING", "IDLE", "OFF")
+
+
+@dataclass(frozen=True, slots=True)
+class MacroStep:
+    """A single compiled step, either a key or a wait for a status."""
+
+    label: str
+    code: str | None = None
+    # Seconds to sleep after the step instead of pacing the next key
+    delay: float | None = None
+    status: str | None = None
+    timeout: float = WAIT_TIMEOUT
+
+
+@dataclass(frozen=True, slots=True)
+class Macro:
+    """A compiled macro."""
+
+    name: str
+    steps: tuple[MacroStep, ...]
+
+
+@dataclass(frozen=True, slots=True)
+class StepTiming:
+    """Outcome of one step of a macro run."""
+
+    label: str
+    # Seconds from the start of the run until the step started
+    offset: float
+    elapsed: float
+    ok: bool
+
+
+@dataclass(frozen=True, slots=True)
+class MacroResult:
+    """Outcome of running a macro, steps after a failed one are not run."""
+
+    name: str
+    steps: tuple[StepTiming, ...]
+    duration: float
+    completed: bool
+
+    def as_dict(self):
+        """Return a json serializable summary."""
+        return {
+            "macro": self.name,
+            "completed": self.completed,
+            "duration_ms": round(self.duration * 1000, 1),
+            "steps": [
+                {
+                    "step": step.label,
+                    "offset_ms": round(step.offset * 1000, 1),
+                    "elapsed_ms": round(step.elapsed * 1000, 1),
+                    "ok": step.ok,
+                }
+                for step in self.steps
+            ],
+        }
+
+
+def split_steps(spec):
+    """Return the step strings of a macro given as a string or a list."""
+    if isinstance(spec, str):
+        spec = spec.split(",")
+    return [step.strip() for step in spec if step and step.strip()]
+
+
+def _number(text, step, maximum):
+    try:
+        value = float(text)
+    except ValueError:
+        raise ValueError(f"Invalid number in macro step '{step}'") from None
+    if not 0 <= value <= maximum:
+        raise ValueError(f"Macro step '{step}' is out of range")
+    return value
+
+
+def _parse_step(step):
+    """Parse one step into (kind, key or status, number)."""
+    words = step.split()
+    keyword = words[0].lower()
+    if keyword == "delay":
+        if len(words) != 2:
+            raise ValueError(f"Expected 'delay SECONDS', got '{step}'")
+        return "delay", None, _number(words[1], step, MAX_DELAY)
+    if keyword == "wait":
+        if len(words) not in (2, 3) or words[1].upper() not in WAIT_STATUSES:
+            raise ValueError(f"Expected 'wait PLAYING|IDLE|OFF [SECONDS]', got '{step}'")
+        timeout = _number(words[2], step, MAX_DELAY * 4) if len(words) == 3 else WAIT_TIMEOUT
+        return "wait", words[1].upper(), timeout
+    if len(words) != 1:
+        raise ValueError(f"Invalid macro step '{step}'")
+    key, _, repeats = step.partition("*")
+    if not repeats:
+        return "key", key, 1
+    try:
+        count = int(repeats)
+    except ValueError:
+        raise ValueError(f"Invalid repeat count in macro step '{step}'") from None
+    if not 1 <= count <= MAX_REPEATS:
+        raise ValueError(f"Macro step '{step}' is out of range")
+    return "key", key, count
+
+
+def validate_macro(spec):
+    """Check the syntax of a macro, raises ValueError on the first bad step."""
+    steps = split_steps(spec)
+    if not steps:
+        raise ValueError("A macro needs at least one step")
+    for step in steps:
+        _parse_step(step)
+    return steps
+
+
+def compile_macro(name, spec, commands):
+    """Compile a macro against the command table of the device.
+
+    commands maps key names to objects holding the IRCC code in value.
+    Raises ValueError for syntax errors and keys the device does not know.
+    """
+    compiled = []
+    for step in validate_macro(spec):
+        kind, argument, number = _parse_step(step)
+        if kind == "delay":
+            if compiled and compiled[-1].code is not None and compiled[-1].delay is None:
+                # Sleep after the previous key instead of pacing the next one
+                previous = compiled.pop()
+                compiled.append(MacroStep(previous.label, previous.code, number))
+            else:
+                compiled.append(MacroStep(step, delay=number))
+        elif kind == "wait":
+            compiled.append(MacroStep(step, status=argument, timeout=number))
+        else:
+            if argument not in commands:
+                raise ValueError(f"Unknown command '{argument}' in macro '{name}'")
+            key = MacroStep(argument, commands[argument].value)
+            compiled.extend([key] * number)
+    return Macro(name, tuple(compiled))
+
+
+def parse_macro_text(text):
+    """Parse macros written one per line as 'name: step, step, ...'."""
+    macros = {}
+    for line_number, line in enumerate((text or "").splitlines(), 1):
+        line = line.strip()
+        if not line or line.startswith("#"):
+            continue
+        name, separator, spec = line.partition(":")
+        name = name.strip()
+        if not separator or not name:
+            raise ValueError(f"Line {line_number}: expected 'name: step, step, ...'")
+        try:
+            macros[name] = validate_macro(spec)
+        except ValueError as ex:
+            raise ValueError(f"Line {line_number}: {ex}") from None
+    return macros
@@ -9,12 +9,14 @@ import asyncio
 from homeassistant.components.media_player import MediaPlayerEntity, ENTITY_ID_FORMAT
 from homeassistant.components.media_player.const import (
     MediaPlayerEntityFeature,
-    MediaPlayerState
+    MediaPlayerState,
+    MediaType
 )
 from homeassistant.config_entries import ConfigEntry
 from homeassistant.core import HomeAssistant, callback
 from homeassistant.helpers.device_registry import DeviceInfo
 from homeassistant.helpers.entity_platform import AddEntitiesCallback
+from homeassistant.helpers.restore_state import RestoreEntity
 from homeassistant.helpers.update_coordinator import CoordinatorEntity
 from homeassistant.util import dt as dt_util
 
@@ -30,9 +32,32 @@ SUPPORT_SONY = (
     MediaPlayerEntityFeature.TURN_ON |
     MediaPlayerEntityFeature.TURN_OFF |
     MediaPlayerEntityFeature.PREVIOUS_TRACK |
-    MediaPlayerEntityFeature.NEXT_TRACK
+    MediaPlayerEntityFeature.NEXT_TRACK |
+    MediaPlayerEntityFeature.VOLUME_SET |
+    MediaPlayerEntityFeature.VOLUME_STEP |
+    MediaPlayerEntityFeature.SELECT_SOURCE |
+    MediaPlayerEntityFeature.SEEK
 )
 
+# Prefix of the DIDL-Lite upnp:class -> media content type, first match wins
+UPNP_CLASS_MEDIA_TYPES = (
+    ("object.item.videoItem.movie", MediaType.MOVIE),
+    ("object.item.videoItem.videoBroadcast", MediaType.TVSHOW),
+    ("object.item.videoItem", MediaType.VIDEO),
+    ("object.item.audioItem.musicTrack", MediaType.MUSIC),
+    ("object.item.audioItem", MediaType.MUSIC),
+    ("object.item.imageItem", MediaType.IMAGE),
+)
+
+
+def _media_type(upnp_class):
+    """Return the media content type of a upnp:class, None if unknown."""
+    if upnp_class:
+        for prefix, media_type in UPNP_CLASS_MEDIA_TYPES:
+            if upnp_class.startswith(prefix):
+                return media_type
+    return None
+
 async def async_setup_entry(
         hass: HomeAssistant,
         config_entry: ConfigEntry,
@@ -46,7 +71,7 @@ async def async_setup_entry(
     )
 
 
-class SonyMediaPlayerEntity(CoordinatorEntity[SonyCoordinator], MediaPlayerEntity):
+class SonyMediaPlayerEntity(CoordinatorEntity[SonyCoordinator], MediaPlayerEntity, RestoreEntity):
     # pylint: disable=too-many-instance-attributes
     """Representation of a Sony mediaplayer."""
 
@@ -87,11 +112,66 @@ class SonyMediaPlayerEntity(CoordinatorEntity[SonyCoordinator], MediaPlayerEntit
         """Update player info."""
         _LOGGER.debug("Sony media player update %s", self.coordinator.data)
         self._attr_state = self.coordinator.data.get("state", MediaPlayerState.OFF)
+        # Apps are served from the stored list, refreshed in the background
+        self._attr_source_list = self.coordinator.api.get_apps()
+        if self._attr_state in (MediaPlayerState.OFF, MediaPlayerState.PLAYING):
+            self._attr_source = None
         if (position_info := self.coordinator.data.get("position_info")) is not None:
             if "duration" in position_info and "position" in position_info:
                 self._attr_media_duration = self._time_to_seconds(position_info["duration"])
                 self._attr_media_position = self._time_to_seconds(position_info["position"])
-                self._attr_media_position_updated_at = dt_util.utcnow()
+                if self.coordinator.data.get("stale"):
+                    # A restored position was read before the restart, the
+                    # frontend would advance it over the whole downtime
+                    self._attr_media_position_updated_at = None
+                else:
+                    self._attr_media_position_updated_at = \
+                        self.coordinator.data.get("updated_at") or dt_util.utcnow()
+        # Decoded once per track, the coordinator data holds the cached object
+        metadata = self.coordinator.data.get("media_metadata")
+        self._attr_media_title = metadata.title if metadata else None
+        self._attr_media_track = metadata.track_number if metadata else None
+        self._attr_media_artist = metadata.artist if metadata else None
+        self._attr_media_album_name = metadata.album if metadata else None
+        self._attr_media_content_type = _media_type(metadata.upnp_class) if metadata else None
+        # Keep the requested level while a write is outstanding so the
+        # slider does not jump back to the value of an older poll
+        if (volume := self.coordinator.data.get("volume")) is not None \
+                and not self.coordinator.volume_writer.pending:
+            self._attr_volume_level = volume / 100
+
+    @property
+    def extra_state_attributes(self):
+        """Flag a state restored after a restart or expected after a command.
+
+        Both are kept until the player confirmed them.
+        """
+        if self.coordinator.data.get("stale"):
+            return {"stale": True, "last_refresh": self.coordinator.data["updated_at"]}
+        if self.coordinator.data.get("provisional"):
+            return {"provisional": True}
+        return None
+
+    async def async_added_to_hass(self) -> None:
+        """Restore the last state while the coordinator holds no live data."""
+        await super().async_added_to_hass()
+        if "state" in self.coordinator.data and not self.coordinator.data.get("stale"):
+            return
+        if (last_state := await self.async_get_last_state()) is None \
+                or last_state.state not in tuple(MediaPlayerState):
+            return
+        # The coordinator may have restored an older snapshot
+        updated_at = self.coordinator.data.get("updated_at")
+        if updated_at is not None and last_state.last_updated <= updated_at:
+            return
+        attributes = last_state.attributes
+        self._attr_state = MediaPlayerState(last_state.state)
+        self._attr_media_duration = attributes.get("media_duration")
+        # Without the time it was read, the position is not advanced over the downtime
+        self._attr_media_position = attributes.get("media_position")
+        if (volume_level := attributes.get("volume_level")) is not None:
+            self._attr_volume_level = volume_level
+        _LOGGER.debug("Restored media player state %s", self._attr_state)
 
     def _time_to_seconds(self, time_str):
         # API returns duration/position as "HH:MM:SS" string
@@ -112,6 +192,22 @@ class SonyMediaPlayerEntity(CoordinatorEntity[SonyCoordinator], MediaPlayerEntit
             self.coordinator.api.power, False
         )
 
+    async def async_set_volume_level(self, volume: float) -> None:
+        """Set the volume level, range 0..1.
+
+        Volume up/down steps end up here as well, relative to the level set
+        last, so a burst of steps results in a single SetVolume.
+        """
+        self._attr_volume_level = volume
+        self.coordinator.volume_writer.request(round(volume * 100))
+        self.async_write_ha_state()
+
+    async def async_select_source(self, source: str) -> None:
+        """Start the app named source."""
+        await self.hass.async_add_executor_job(self.coordinator.api.start_app, source)
+        self._attr_source = source
+        self.async_write_ha_state()
+
     async def async_media_play_pause(self):
         """Simulate play pause media player."""
         if self._attr_state == MediaPlayerState.PLAYING:
@@ -128,25 +224,28 @@ class SonyMediaPlayerEntity(CoordinatorEntity[SonyCoordinator], MediaPlayerEntit
 
     async def async_media_pause(self):
         """Send media pause command to media player."""
+        # The Pause key resumes a paused disc
+        if self._attr_state == MediaPlayerState.PAUSED:
+            return
         await self.coordinator.device_data.async_check_device_status(
-            MediaPlayerState.PLAYING,
+            MediaPlayerState.PAUSED,
             self.coordinator.api.pause
         )          
 
 
     async def async_media_next_track(self):
         """Send next track command."""
-        await self.coordinator.device_data.async_check_device_status(
-            MediaPlayerState.PLAYING,
-            self.coordinator.api.next
-        ) 
+        # Playing or paused, the state stays as it is
+        await self.hass.async_add_executor_job(self.coordinator.api.next)
 
     async def async_media_previous_track(self):
         """Send the previous track command."""
-        await self.coordinator.device_data.async_check_device_status(
-            MediaPlayerState.PLAYING,
-            self.coordinator.api.prev
-        ) 
+        # Playing or paused, the state stays as it is
+        await self.hass.async_add_executor_job(self.coordinator.api.prev)
+
+    async def async_media_seek(self, position: float) -> None:
+        """Seek to position seconds into the title."""
+        await self.coordinator.device_data.async_seek(position)
 
     async def async_media_stop(self):
         """Send stop command."""
@@ -0,0 +1,225 @@
+"""Request instrumentation for the Sony device."""
+import threading
+import time
+from bisect import bisect_left
+from collections import deque
+from urllib.parse import urlparse, parse_qs
+
+# Upper bounds (ms) of the latency histogram buckets. The last bucket is open ended.
+LATENCY_BUCKETS_MS = (
+    5, 10, 20, 35, 50, 75, 100, 150, 200, 300, 500, 750,
+    1000, 1500, 2000, 3000, 5000, 10000, float("inf"),
+)
+# Number of individual request timings kept for diagnostics
+RECENT_REQUESTS = 50
+
+
+def endpoint_name(url):
+    """Derive a short endpoint label from a request url.
+
+    CERS actions are addressed with ?action=<name>, everything else is
+    labelled with the last path segment (dmr.xml, Ircc.xml, appslist, ...).
+    """
+    parsed = urlparse(url)
+    if parsed.query:
+        action = parse_qs(parsed.query).get("action")
+        if action:
+            return action[0]
+    path = parsed.path.rstrip("/")
+    return path.rsplit("/", 1)[-1] or parsed.netloc
+
+
+class LatencyHistogram:
+    """Fixed bucket latency histogram."""
+
+    __slots__ = ("counts", "count", "total", "min", "max")
+
+    def __init__(self):
+        self.counts = [0] * len(LATENCY_BUCKETS_MS)
+        self.count = 0
+        self.total = 0.0
+        self.min = None
+        self.max = None
+
+    def record(self, elapsed_ms):
+        """Add a single observation."""
+        self.counts[bisect_left(LATENCY_BUCKETS_MS, elapsed_ms)] += 1
+        self.count += 1
+        self.total += elapsed_ms
+        if self.min is None or elapsed_ms < self.min:
+            self.min = elapsed_ms
+        if self.max is None or elapsed_ms > self.max:
+            self.max = elapsed_ms
+
+    def percentile(self, fraction):
+        """Return the bucket upper bound holding the given percentile."""
+        if not self.count:
+            return None
+        rank = fraction * self.count
+        seen = 0
+        for index, bucket_count in enumerate(self.counts):
+            seen += bucket_count
+            if seen >= rank:
+                bound = LATENCY_BUCKETS_MS[index]
+                # Never report more than what was actually observed
+                return min(bound, self.max)
+        return self.max
+
+    def as_dict(self):
+        """Return a json serializable summary."""
+        def _round(value):
+            return round(value, 2) if value is not None else None
+
+        return {
+            "count": self.count,
+            "mean_ms": _round(self.total / self.count) if self.count else None,
+            "min_ms": _round(self.min),
+            "max_ms": _round(self.max),
+            "p50_ms": _round(self.percentile(0.50)),
+            "p95_ms": _round(self.percentile(0.95)),
+            "p99_ms": _round(self.percentile(0.99)),
+        }
+
+
+class EndpointStats:
+    """Counters for a single endpoint or SOAP action."""
+
+    __slots__ = ("requests", "errors", "bytes_received", "latency")
+
+    def __init__(self):
+        self.requests = 0
+        self.errors = {}
+        self.bytes_received = 0
+        self.latency = LatencyHistogram()
+
+    def as_dict(self):
+        """Return a json serializable summary."""
+        return {
+            "requests": self.requests,
+            "errors": dict(self.errors),
+            "bytes_received": self.bytes_received,
+            "latency": self.latency.as_dict(),
+        }
+
+
+class CacheStats:
+    """Hit and miss counters of a single cache."""
+
+    __slots__ = ("hits", "misses")
+
+    def __init__(self):
+        self.hits = 0
+        self.misses = 0
+
+    def as_dict(self):
+        """Return a json serializable summary."""
+        lookups = self.hits + self.misses
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": round(self.hits / lookups, 3) if lookups else None,
+        }
+
+
+class DeviceMetrics:
+    """Collect request statistics per endpoint.
+
+    Recording is skipped entirely while disabled so the request path only
+    pays for a single attribute check. Cache counters are plain increments
+    and are always kept.
+    """
+
+    def __init__(self, enabled=False):
+        self.enabled = enabled
+        self.endpoints = {}
+        self.recent = deque(maxlen=RECENT_REQUESTS)
+        self.caches = {}
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def now():
+        """Monotonic clock used for request timings."""
+        return time.perf_counter()
+
+    def record(self, endpoint, started, bytes_received=0, error=None):
+        """Record a finished request which started at `started`."""
+        elapsed_ms = (time.perf_counter() - started) * 1000
+        with self._lock:
+            stats = self.endpoints.get(endpoint)
+            if stats is None:
+                stats = self.endpoints[endpoint] = EndpointStats()
+            stats.requests += 1
+            stats.bytes_received += bytes_received
+            stats.latency.record(elapsed_ms)
+            error_type = None
+            if error is not None:
+                error_type = type(error).__name__
+                stats.errors[error_type] = stats.errors.get(error_type, 0) + 1
+            self.recent.append((time.time(), endpoint, round(elapsed_ms, 2), error_type))
+
+    def record_cache(self, name, hit):
+        """Count a lookup in the named cache."""
+        stats = self.caches.get(name)
+        if stats is None:
+            stats = self.caches.setdefault(name, CacheStats())
+        if hit:
+            stats.hits += 1
+        else:
+            stats.misses += 1
+
+    def reset(self):
+        """Drop all collected statistics."""
+        with self._lock:
+            self.endpoints = {}
+            self.recent.clear()
+
+    def totals(self):
+        """Return request, error and latency figures over all endpoints."""
+        with self._lock:
+            histogram = LatencyHistogram()
+            requests = errors = received = 0
+            for stats in self.endpoints.values():
+                requests += stats.requests
+                errors += sum(stats.errors.values())
+                received += stats.bytes_received
+                for index, bucket_count in enumerate(stats.latency.counts):
+                    histogram.counts[index] += bucket_count
+                histogram.count += stats.latency.count
+                histogram.total += stats.latency.total
+                for value in (stats.latency.min, stats.latency.max):
+                    if value is None:
+                        continue
+                    if histogram.min is None or value < histogram.min:
+                        histogram.min = value
+                    if histogram.max is None or value > histogram.max:
+                        histogram.max = value
+        return {
+            "requests": requests,
+            "errors": errors,
+            "bytes_received": received,
+            "latency": histogram.as_dict(),
+        }
+
+    def as_dict(self):
+        """Return a json serializable snapshot of all endpoints."""
+        with self._lock:
+            endpoints = {
+                name: stats.as_dict() for name, stats in self.endpoints.items()
+            }
+            recent = [
+                {
+                    "time": timestamp,
+                    "endpoint": endpoint,
+                    "elapsed_ms": elapsed_ms,
+                    "error": error_type,
+                }
+                for timestamp, endpoint, elapsed_ms, error_type in self.recent
+            ]
+        return {
+            "enabled": self.enabled,
+            "endpoints": endpoints,
+            "recent": recent,
+            "caches": {
+                name: stats.as_dict() for name, stats in self.caches.items()
+            },
+        }
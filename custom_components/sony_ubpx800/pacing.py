@@ -0,0 +1,86 @@
+"""Pacing of consecutive IRCC keys.
+
+The player acknowledges X_SendIRCC before it has acted on the key and
+silently drops keys which arrive while it is still busy. The time it takes
+to acknowledge a key is the best available sign of how busy it is, so the
+gap kept between two keys follows it. Errors and timeouts widen the gap,
+every acknowledged key narrows it again until it is back at the
+acknowledgement based target.
+"""
+import threading
+import time
+from collections import deque
+
+# Gap in seconds used until the device has been measured
+DEFAULT_GAP = 0.3
+MIN_GAP = 0.05
+MAX_GAP = 2.0
+# The learned gap is this multiple of the average acknowledgement time
+ACK_FACTOR = 1.0
+# Weight of the latest acknowledgement time in the moving average
+ACK_WEIGHT = 0.2
+# Factor applied to the gap on every acknowledged key, and on every failure
+GAP_DECAY = 0.9
+GAP_BACKOFF = 2.0
+# Number of key sends used to report the effective key rate
+RATE_WINDOW = 20
+
+
+class KeyPacer:
+    """Learn the shortest gap between keys which the device keeps up with."""
+
+    def __init__(self, gap=None):
+        self.gap = min(max(gap, MIN_GAP), MAX_GAP) if gap else DEFAULT_GAP
+        self.ack_time = None
+        self.sent = 0
+        self.failed = 0
+        self._last_ack = 0.0
+        self._sends = deque(maxlen=RATE_WINDOW)
+        self._lock = threading.Lock()
+
+    def remaining(self):
+        """Return the seconds to wait before the next key may be sent."""
+        return max(0.0, self._last_ack + self.gap - time.monotonic())
+
+    def wait(self):
+        """Sleep until the next key may be sent."""
+        delay = self.remaining()
+        if delay > 0:
+            time.sleep(delay)
+
+    def record(self, started, elapsed, success):
+        """Learn from a key sent at started which took elapsed seconds."""
+        with self._lock:
+            self.sent += 1
+            self._sends.append(started)
+            self._last_ack = started + elapsed
+            if not success:
+                self.failed += 1
+                self.gap = min(self.gap * GAP_BACKOFF, MAX_GAP)
+                return
+            if self.ack_time is None:
+                self.ack_time = elapsed
+            else:
+                self.ack_time += ACK_WEIGHT * (elapsed - self.ack_time)
+            target = min(max(self.ack_time * ACK_FACTOR, MIN_GAP), MAX_GAP)
+            self.gap = max(target, self.gap * GAP_DECAY)
+
+    @property
+    def keys_per_second(self):
+        """Return the rate of the recent key sends."""
+        with self._lock:
+            if len(self._sends) < 2:
+                return None
+            span = self._sends[-1] - self._sends[0]
+            return (len(self._sends) - 1) / span if span > 0 else None
+
+    def as_dict(self):
+        """Return a json serializable summary."""
+        keys_per_second = self.keys_per_second
+        return {
+            "gap_ms": round(self.gap * 1000, 1),
+            "ack_ms": round(self.ack_time * 1000, 1) if self.ack_time is not None else None,
+            "sent": self.sent,
+            "failed": self.failed,
+            "keys_per_second": round(keys_per_second, 2) if keys_per_second else None,
+        }
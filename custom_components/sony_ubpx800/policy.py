@@ -0,0 +1,151 @@
+"""Deadlines, retries and hedging per class of request.
+
+Every request to the player belongs to one policy with its own connect
+and read deadline. Requests failing with a connection error or timeout
+are retried a bounded number of times with jittered exponential backoff,
+as long as the shared retry budget allows it, so a player which is off
+does not get every request sent several times. Idempotent reads can be
+hedged: when the first request has not been answered after the p95
+latency of its policy, a second one is sent and the first answer wins.
+"""
+import random
+import threading
+from collections import deque
+from dataclasses import dataclass
+
+# Every request adds this fraction of a retry to the budget
+RETRY_RATIO = 0.2
+# Most retries the budget can save up
+RETRY_CAPACITY = 10.0
+# Latencies kept per policy, and needed before requests are hedged
+LATENCY_WINDOW = 100
+HEDGE_MIN_SAMPLES = 20
+# Requests are only hedged once their p95 latency reaches this many
+# seconds, below it the extra thread hop costs more than it can save
+HEDGE_MIN_DELAY = 0.05
+
+
+@dataclass(frozen=True, slots=True)
+class RequestPolicy:
+    """How requests of one class are sent."""
+
+    name: str
+    connect_timeout: float
+    read_timeout: float
+    # Attempts after the first one, each taken from the retry budget
+    retries: int = 0
+    # Seconds before the first retry, doubled for every further one
+    backoff: float = 0.1
+    # Idempotent requests are also retried after a read timeout or a broken
+    # connection, others only when the connection could not be opened
+    idempotent: bool = False
+    hedge: bool = False
+
+    def timeout(self, deadline=None):
+        """Return the (connect, read) timeout, neither longer than deadline."""
+        if deadline is None:
+            return self.connect_timeout, self.read_timeout
+        return min(self.connect_timeout, deadline), min(self.read_timeout, deadline)
+
+    def backoff_delay(self, attempt):
+        """Return the jittered delay before retry number attempt, counted from 1."""
+        return self.backoff * 2 ** (attempt - 1) * random.uniform(0.5, 1.5)
+
+
+# getStatus and the power check, fail fast when the player is off
+LIVENESS = RequestPolicy("liveness", 1.0, 2.0, retries=1, backoff=0.05,
+                         idempotent=True, hedge=True)
+# SOAP Get* actions
+STATUS_READ = RequestPolicy("status_read", 1.0, 3.0, retries=1, backoff=0.05,
+                            idempotent=True, hedge=True)
+# IRCC keys, app launches and SOAP actions changing the player, only
+# retried when nothing was sent so a key is never delivered twice
+COMMAND = RequestPolicy("command", 1.0, 3.0, retries=1, backoff=0.05)
+# Device descriptors, action and command lists, large and rarely read
+DESCRIPTOR = RequestPolicy("descriptor", 2.0, 10.0, retries=2, backoff=0.25, idempotent=True)
+# Registration, never retried as a wrong pin must not be sent twice
+REGISTRATION = RequestPolicy("registration", 2.0, 5.0)
+
+
+class _PolicyStats:
+    __slots__ = ("requests", "retries", "retries_denied", "hedges", "hedge_wins", "latencies")
+
+    def __init__(self):
+        self.requests = 0
+        self.retries = 0
+        self.retries_denied = 0
+        self.hedges = 0
+        self.hedge_wins = 0
+        self.latencies = deque(maxlen=LATENCY_WINDOW)
+
+
+class RequestPolicies:
+    """Retry budget, latencies and counters shared by the requests of a device."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._tokens = RETRY_CAPACITY
+        self._stats = {}
+
+    def _get(self, policy):
+        stats = self._stats.get(policy.name)
+        if stats is None:
+            stats = self._stats[policy.name] = _PolicyStats()
+        return stats
+
+    def record(self, policy, elapsed):
+        """Record an answered request, which also refills the retry budget."""
+        with self._lock:
+            stats = self._get(policy)
+            stats.requests += 1
+            stats.latencies.append(elapsed)
+            self._tokens = min(RETRY_CAPACITY, self._tokens + RETRY_RATIO)
+
+    def allow_retry(self, policy):
+        """Take a retry from the budget, False when it is used up."""
+        with self._lock:
+            stats = self._get(policy)
+            if self._tokens < 1:
+                stats.retries_denied += 1
+                return False
+            self._tokens -= 1
+            stats.retries += 1
+            return True
+
+    def hedge_delay(self, policy):
+        """Return the seconds after which to hedge, None when not worth it.
+
+        That is the case while too few latencies are known and while the
+        p95 latency is below HEDGE_MIN_DELAY.
+        """
+        with self._lock:
+            latencies = self._get(policy).latencies
+            if len(latencies) < HEDGE_MIN_SAMPLES:
+                return None
+            ordered = sorted(latencies)
+        delay = ordered[int(0.95 * (len(ordered) - 1))]
+        return delay if delay >= HEDGE_MIN_DELAY else None
+
+    def record_hedge(self, policy, won):
+        """Count a hedged request, won when it answered before the first one."""
+        with self._lock:
+            stats = self._get(policy)
+            stats.hedges += 1
+            stats.hedge_wins += won
+
+    def as_dict(self):
+        """Return a json serializable summary."""
+        with self._lock:
+            return {
+                "retry_budget": round(self._tokens, 2),
+                "policies": {
+                    name: {
+                        "requests": stats.requests,
+                        "retries": stats.retries,
+                        "retries_denied": stats.retries_denied,
+                        "hedges": stats.hedges,
+                        "hedge_wins": stats.hedge_wins,
+                    }
+                    for name, stats in self._stats.items()
+                },
+            }
@@ -8,13 +8,14 @@ from __future__ import annotations
 
 import logging
 import asyncio
+import threading
 from typing import Iterable, Any
 
+import voluptuous as vol
 from homeassistant.components.remote import (
     ATTR_DELAY_SECS,
     ATTR_HOLD_SECS,
     ATTR_NUM_REPEATS,
-    DEFAULT_DELAY_SECS,
     DEFAULT_HOLD_SECS,
     DEFAULT_NUM_REPEATS,
     RemoteEntity,
@@ -24,15 +25,19 @@ from homeassistant.const import (
     STATE_OFF,
     STATE_ON,
     STATE_IDLE,
+    STATE_PAUSED,
     STATE_PLAYING
 )
-from homeassistant.core import HomeAssistant, callback
+from homeassistant.core import HomeAssistant, ServiceResponse, SupportsResponse, callback
+from homeassistant.exceptions import ServiceValidationError
+from homeassistant.helpers import config_validation as cv, entity_platform
 from homeassistant.helpers.device_registry import DeviceInfo
 from homeassistant.helpers.entity_platform import AddEntitiesCallback
+from homeassistant.helpers.restore_state import RestoreEntity
 from homeassistant.helpers.update_coordinator import CoordinatorEntity
 
 from . import SonyCoordinator
-from .const import DOMAIN, SONY_COORDINATOR, DEFAULT_DEVICE_NAME
+from .const import DOMAIN, SONY_COORDINATOR, DEFAULT_DEVICE_NAME, SERVICE_RUN_MACRO, ATTR_MACRO
 
 _LOGGER = logging.getLogger(__name__)
 
@@ -49,7 +54,15 @@ async def async_setup_entry(
         [SonyRemoteEntity(coordinator)]
     )
 
-class SonyRemoteEntity(CoordinatorEntity[SonyCoordinator], RemoteEntity):
+    platform = entity_platform.async_get_current_platform()
+    platform.async_register_entity_service(
+        SERVICE_RUN_MACRO,
+        {vol.Required(ATTR_MACRO): cv.string},
+        "async_run_macro",
+        supports_response=SupportsResponse.OPTIONAL,
+    )
+
+class SonyRemoteEntity(CoordinatorEntity[SonyCoordinator], RemoteEntity, RestoreEntity):
     """Representation of a Sony mediaplayer."""
     _attr_has_entity_name = True
     _attr_name = "Remote"
@@ -68,17 +81,17 @@ class SonyRemoteEntity(CoordinatorEntity[SonyCoordinator], RemoteEntity):
         # Clean the MAC address (remove dashes/colons) and use it as the unique ID
         clean_mac = coordinator.api.mac.replace("-", "").replace(":", "")
         self._attr_unique_id = f"{clean_mac}_remote"
-
+        # Set to stop the key currently held
+        self._hold_cancel: threading.Event | None = None
+        # Stops the running macro when the entity is removed
+        self._macro_cancel = threading.Event()
 
         self._state_map = {
             "Power": lambda: self.toggled_state(),
             "Stop": STATE_IDLE,
             "Play": STATE_PLAYING,
-            "Pause": STATE_PLAYING,
-            "Next": STATE_PLAYING,
-            "Prev": STATE_PLAYING,
-            "Advance": STATE_PLAYING,
-            "Replay": STATE_PLAYING,
+            # Keys moving within the title leave the state as it is
+            "Pause": lambda: self.coordinator.device_data.paused_state(),
             "Home": STATE_IDLE      
         }
         self._attr_state = STATE_OFF
@@ -105,6 +118,34 @@ class SonyRemoteEntity(CoordinatorEntity[SonyCoordinator], RemoteEntity):
         _LOGGER.debug("Sony remote control update %s", self.coordinator.data)
         self._attr_state = self.coordinator.data.get("state", STATE_OFF)
 
+    @property
+    def extra_state_attributes(self):
+        """Flag a state restored after a restart or expected after a command.
+
+        Both are kept until the player confirmed them.
+        """
+        if self.coordinator.data.get("stale"):
+            return {"stale": True, "last_refresh": self.coordinator.data["updated_at"]}
+        if self.coordinator.data.get("provisional"):
+            return {"provisional": True}
+        return None
+
+    async def async_added_to_hass(self) -> None:
+        """Restore the last state while the coordinator holds no live data."""
+        await super().async_added_to_hass()
+        if "state" in self.coordinator.data and not self.coordinator.data.get("stale"):
+            return
+        if (last_state := await self.async_get_last_state()) is None \
+                or last_state.state not in (
+                    STATE_OFF, STATE_ON, STATE_IDLE, STATE_PAUSED, STATE_PLAYING):
+            return
+        # The coordinator may have restored an older snapshot
+        updated_at = self.coordinator.data.get("updated_at")
+        if updated_at is not None and last_state.last_updated <= updated_at:
+            return
+        self._attr_state = last_state.state
+        _LOGGER.debug("Restored remote state %s", self._attr_state)
+
     async def async_turn_on(self) -> None:
         """Turn the media player on."""
         await self.coordinator.device_data.async_check_device_status(
@@ -129,14 +170,29 @@ class SonyRemoteEntity(CoordinatorEntity[SonyCoordinator], RemoteEntity):
     async def async_send_command(self, command: Iterable[str], **kwargs: Any) -> None:
         """Send commands to one device."""
         num_repeats = kwargs.get(ATTR_NUM_REPEATS, DEFAULT_NUM_REPEATS)
-        delay_secs = kwargs.get(ATTR_DELAY_SECS, DEFAULT_DELAY_SECS)
-        # hold_secs = kwargs.get(ATTR_HOLD_SECS, DEFAULT_HOLD_SECS)
-        _LOGGER.debug("async_send_command %s %d repeats %d delay", ''.join(list(command)), num_repeats, delay_secs)
+        # Without an explicit delay keys are paced by the gap learned for the device
+        delay_secs = kwargs.get(ATTR_DELAY_SECS)
+        hold_secs = kwargs.get(ATTR_HOLD_SECS, DEFAULT_HOLD_SECS)
+        pacer = self.coordinator.api.pacer
+        _LOGGER.debug("async_send_command %s %d repeats %s delay", ''.join(list(command)), num_repeats, delay_secs)
+
+        # Any new command releases a key which is still held
+        self._release_key()
+        if hold_secs:
+            for _ in range(num_repeats):
+                for single_command in command:
+                    if single_command in self.coordinator.api.commands:
+                        await self._async_hold_key(single_command, hold_secs)
+                        await asyncio.sleep(
+                            pacer.remaining() if delay_secs is None else delay_secs)
+            return
 
         for _ in range(num_repeats):
             for single_command in command:
                 if single_command not in self.coordinator.api.commands:
                     continue
+                if delay_secs is None:
+                    await asyncio.sleep(pacer.remaining())
                 if (state := self._state_map.get(single_command)) is not None:
                     await self.coordinator.device_data.async_check_device_status(
                         state() if callable(state) else state,
@@ -146,7 +202,52 @@ class SonyRemoteEntity(CoordinatorEntity[SonyCoordinator], RemoteEntity):
                     await self.coordinator.hass.async_add_executor_job(
                         self.coordinator.api.send_command, single_command
                     )
-                await asyncio.sleep(delay_secs)                
+                if delay_secs is not None:
+                    await asyncio.sleep(delay_secs)
+        _LOGGER.debug("Keys sent at %s keys/s", pacer.keys_per_second)
+
+    async def _async_hold_key(self, name: str, hold_secs: float) -> None:
+        """Stream repeats of a key until hold_secs pass or it is released."""
+        cancel = self._hold_cancel = threading.Event()
+        result = await self.coordinator.hass.async_add_executor_job(
+            self.coordinator.api.hold_key, name, hold_secs, self.coordinator.hold_rate, cancel
+        )
+        if self._hold_cancel is cancel:
+            self._hold_cancel = None
+        _LOGGER.debug(
+            "Held %s for %.2fs: %d presses (%.1f/s), %d skipped, %d errors",
+            name, result.duration, result.presses, result.rate, result.skipped, result.errors)
+
+    async def async_run_macro(self, macro: str) -> ServiceResponse:
+        """Run a configured macro and return the timing of its steps."""
+        try:
+            compiled = self.coordinator.get_macro(macro)
+        except KeyError as ex:
+            raise ServiceValidationError(f"Unknown macro: {macro}") from ex
+        except ValueError as ex:
+            raise ServiceValidationError(str(ex)) from ex
+
+        self._release_key()
+        result = await self.coordinator.hass.async_add_executor_job(
+            self.coordinator.api.run_macro, compiled, self._macro_cancel
+        )
+        _LOGGER.debug(
+            "Macro %s ran %d of %d steps in %.2fs",
+            macro, len(result.steps), len(compiled.steps), result.duration)
+        # One refresh picks up whatever state the macro left the player in
+        await self.coordinator.async_request_refresh()
+        return result.as_dict()
+
+    def _release_key(self) -> None:
+        if self._hold_cancel is not None:
+            self._hold_cancel.set()
+            self._hold_cancel = None
+
+    async def async_will_remove_from_hass(self) -> None:
+        """Release a held key and stop a macro when the entity goes away."""
+        self._release_key()
+        self._macro_cancel.set()
+        await super().async_will_remove_from_hass()
 
     @callback
     def _handle_coordinator_update(self) -> None:
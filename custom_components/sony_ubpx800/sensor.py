@@ -0,0 +1,259 @@
+"""
+Sensors for the Sony UBP-X800.
+
+The status sensors are derived from the getStatus document read by every
+refresh, so they cost no extra request, and only write their state when
+it changed.
+
+Request statistics are only collected when 'Record request timings' is
+enabled in the integration options. The diagnostic sensors are disabled
+by default.
+"""
+from __future__ import annotations
+
+import logging
+from collections.abc import Callable
+from dataclasses import dataclass
+from typing import Any
+
+from homeassistant.components.sensor import (
+    SensorDeviceClass,
+    SensorEntity,
+    SensorEntityDescription,
+    SensorStateClass,
+)
+from homeassistant.config_entries import ConfigEntry
+from homeassistant.const import EntityCategory, UnitOfInformation, UnitOfTime
+from homeassistant.core import HomeAssistant, callback
+from homeassistant.helpers.device_registry import DeviceInfo
+from homeassistant.helpers.entity_platform import AddEntitiesCallback
+from homeassistant.helpers.update_coordinator import CoordinatorEntity
+
+from . import SonyCoordinator
+from .const import DOMAIN, SONY_COORDINATOR
+from .status import ACTIVITIES, PlayerStatus
+
+_LOGGER = logging.getLogger(__name__)
+
+
+@dataclass(frozen=True, kw_only=True)
+class SonyMetricSensorDescription(SensorEntityDescription):
+    """Describe a sensor derived from the request metrics."""
+
+    value_fn: Callable[[dict[str, Any]], Any]
+    endpoint_fn: Callable[[dict[str, Any]], Any]
+
+
+METRIC_SENSORS: tuple[SonyMetricSensorDescription, ...] = (
+    SonyMetricSensorDescription(
+        key="requests",
+        name="Requests",
+        icon="mdi:swap-horizontal",
+        state_class=SensorStateClass.TOTAL_INCREASING,
+        value_fn=lambda totals: totals["requests"],
+        endpoint_fn=lambda stats: stats["requests"],
+    ),
+    SonyMetricSensorDescription(
+        key="request_errors",
+        name="Request errors",
+        icon="mdi:alert-circle-outline",
+        state_class=SensorStateClass.TOTAL_INCREASING,
+        value_fn=lambda totals: totals["errors"],
+        endpoint_fn=lambda stats: stats["errors"],
+    ),
+    SonyMetricSensorDescription(
+        key="bytes_received",
+        name="Bytes received",
+        icon="mdi:download-network-outline",
+        native_unit_of_measurement=UnitOfInformation.BYTES,
+        state_class=SensorStateClass.TOTAL_INCREASING,
+        value_fn=lambda totals: totals["bytes_received"],
+        endpoint_fn=lambda stats: stats["bytes_received"],
+    ),
+    SonyMetricSensorDescription(
+        key="latency_p50",
+        name="Request latency p50",
+        icon="mdi:timer-outline",
+        native_unit_of_measurement=UnitOfTime.MILLISECONDS,
+        state_class=SensorStateClass.MEASUREMENT,
+        value_fn=lambda totals: totals["latency"]["p50_ms"],
+        endpoint_fn=lambda stats: stats["latency"]["p50_ms"],
+    ),
+    SonyMetricSensorDescription(
+        key="latency_p95",
+        name="Request latency p95",
+        icon="mdi:timer-outline",
+        native_unit_of_measurement=UnitOfTime.MILLISECONDS,
+        state_class=SensorStateClass.MEASUREMENT,
+        value_fn=lambda totals: totals["latency"]["p95_ms"],
+        endpoint_fn=lambda stats: stats["latency"]["p95_ms"],
+    ),
+    SonyMetricSensorDescription(
+        key="latency_p99",
+        name="Request latency p99",
+        icon="mdi:timer-outline",
+        native_unit_of_measurement=UnitOfTime.MILLISECONDS,
+        state_class=SensorStateClass.MEASUREMENT,
+        value_fn=lambda totals: totals["latency"]["p99_ms"],
+        endpoint_fn=lambda stats: stats["latency"]["p99_ms"],
+    ),
+)
+
+
+@dataclass(frozen=True, kw_only=True)
+class SonyStatusSensorDescription(SensorEntityDescription):
+    """Describe a sensor derived from the getStatus document."""
+
+    value_fn: Callable[[PlayerStatus], Any]
+
+
+STATUS_SENSORS: tuple[SonyStatusSensorDescription, ...] = (
+    SonyStatusSensorDescription(
+        key="activity",
+        name="Activity",
+        icon="mdi:disc-player",
+        device_class=SensorDeviceClass.ENUM,
+        options=list(ACTIVITIES),
+        value_fn=lambda status: status.activity,
+    ),
+    SonyStatusSensorDescription(
+        key="source",
+        name="Source",
+        icon="mdi:import",
+        value_fn=lambda status: status.source,
+    ),
+    SonyStatusSensorDescription(
+        key="title",
+        name="Title",
+        icon="mdi:movie-open-outline",
+        value_fn=lambda status: status.title,
+    ),
+)
+
+
+async def async_setup_entry(
+        hass: HomeAssistant,
+        config_entry: ConfigEntry,
+        async_add_entities: AddEntitiesCallback,
+) -> None:
+    """Use to setup entity."""
+    _LOGGER.debug("Sony async_add_entities sensor")
+    coordinator = hass.data[DOMAIN][config_entry.entry_id][SONY_COORDINATOR]
+    async_add_entities(
+        [SonyStatusSensorEntity(coordinator, description) for description in STATUS_SENSORS]
+        + [SonyMetricSensorEntity(coordinator, description) for description in METRIC_SENSORS]
+    )
+
+
+class SonyStatusSensorEntity(CoordinatorEntity[SonyCoordinator], SensorEntity):
+    """Sensor exposing a field of the player status."""
+
+    entity_description: SonyStatusSensorDescription
+
+    _attr_has_entity_name = True
+
+    def __init__(self, coordinator, description: SonyStatusSensorDescription):
+        """Initialize the sensor."""
+        super().__init__(coordinator)
+        self.coordinator = coordinator
+        self.entity_description = description
+
+        clean_mac = coordinator.api.mac.replace("-", "").replace(":", "")
+        self._attr_unique_id = f"{clean_mac}_{description.key}"
+        self._written = None
+        self.update()
+
+    async def async_added_to_hass(self) -> None:
+        """Remember the state written when the entity was added."""
+        await super().async_added_to_hass()
+        self._written = (self.available, self._attr_native_value)
+
+    @property
+    def device_info(self) -> DeviceInfo:
+        """Return the device info."""
+        return DeviceInfo(
+            identifiers={
+                # Mac address is unique identifiers within a specific domain
+                (DOMAIN, self.coordinator.api.mac)
+            },
+            name=self.coordinator.api.nickname,
+            manufacturer="Sony",
+            model="UBP-X800"
+        )
+
+    @property
+    def available(self) -> bool:
+        """Only report values while the player answers getStatus."""
+        return super().available and self.coordinator.data.get("player_status") is not None
+
+    def update(self):
+        """Read the value from the status of the last refresh."""
+        player_status = self.coordinator.data.get("player_status")
+        self._attr_native_value = (
+            self.entity_description.value_fn(player_status) if player_status is not None else None)
+
+    @callback
+    def _handle_coordinator_update(self) -> None:
+        """Write the state only when the value or availability changed."""
+        self.update()
+        written = (self.available, self._attr_native_value)
+        if written != self._written:
+            self._written = written
+            self.async_write_ha_state()
+
+
+class SonyMetricSensorEntity(CoordinatorEntity[SonyCoordinator], SensorEntity):
+    """Sensor exposing one of the request statistics."""
+
+    entity_description: SonyMetricSensorDescription
+
+    _attr_has_entity_name = True
+    _attr_entity_category = EntityCategory.DIAGNOSTIC
+    _attr_entity_registry_enabled_default = False
+
+    def __init__(self, coordinator, description: SonyMetricSensorDescription):
+        """Initialize the sensor."""
+        super().__init__(coordinator)
+        self.coordinator = coordinator
+        self.entity_description = description
+
+        clean_mac = coordinator.api.mac.replace("-", "").replace(":", "")
+        self._attr_unique_id = f"{clean_mac}_{description.key}"
+        self.update()
+
+    @property
+    def device_info(self) -> DeviceInfo:
+        """Return the device info."""
+        return DeviceInfo(
+            identifiers={
+                # Mac address is unique identifiers within a specific domain
+                (DOMAIN, self.coordinator.api.mac)
+            },
+            name=self.coordinator.api.nickname,
+            manufacturer="Sony",
+            model="UBP-X800"
+        )
+
+    @property
+    def available(self) -> bool:
+        """Only report values while request timings are recorded."""
+        return super().available and self.coordinator.api.metrics.enabled
+
+    def update(self):
+        """Read the latest figures from the device metrics."""
+        metrics = self.coordinator.api.metrics
+        if not metrics.enabled:
+            self._attr_native_value = None
+            self._attr_extra_state_attributes = None
+            return
+        self._attr_native_value = self.entity_description.value_fn(metrics.totals())
+        self._attr_extra_state_attributes = {
+            endpoint: self.entity_description.endpoint_fn(stats)
+            for endpoint, stats in metrics.as_dict()["endpoints"].items()
+        }
+
+    @callback
+    def _handle_coordinator_update(self) -> None:
+        """Handle updated data from the coordinator."""
+        self.update()
+        self.async_write_ha_state()
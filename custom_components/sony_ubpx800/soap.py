@@ -0,0 +1,156 @@
+"""Decoding of UPnP SOAP action responses.
+
+A response is parsed once, straight from the received bytes, and all
+output arguments of the action are converted into a typed result.
+"""
+from __future__ import annotations
+
+import dataclasses
+from dataclasses import dataclass, field
+
+from .xml_helper import local_name, parse_xml
+
+URN_SOAP_ENVELOPE = "{http://schemas.xmlsoap.org/soap/envelope/}"
+URN_UPNP_CONTROL = "{urn:schemas-upnp-org:control-1-0}"
+
+
+class SoapFault(Exception):
+    """The device answered an action with a UPnP error."""
+
+    def __init__(self, code, description):
+        super().__init__(f"UPnP error {code}: {description}")
+        self.code = code
+        self.description = description
+
+
+def _to_int(value):
+    """Convert an integer argument, None if the device does not report it."""
+    try:
+        return int(value)
+    except (TypeError, ValueError):
+        return None
+
+
+def _to_bool(value):
+    """Convert a UPnP boolean argument."""
+    return value in ("1", "true", "True")
+
+
+def format_time(seconds):
+    """Format seconds as the H:MM:SS of AVTransport."""
+    minutes, seconds = divmod(max(0, int(seconds)), 60)
+    hours, minutes = divmod(minutes, 60)
+    return f"{hours}:{minutes:02d}:{seconds:02d}"
+
+
+def parse_time(text):
+    """Parse the H:MM:SS of AVTransport into seconds, None if it is no time."""
+    try:
+        hours, minutes, seconds = text.split(":")
+        return int(hours) * 3600 + int(minutes) * 60 + float(seconds)
+    except (AttributeError, ValueError):
+        return None
+
+
+def _argument(name, convert=None):
+    """Declare a result field filled from the output argument `name`."""
+    return field(default=None, metadata={"argument": name, "convert": convert})
+
+
+@dataclass(frozen=True, slots=True)
+class TransportInfo:
+    """Output arguments of AVTransport GetTransportInfo."""
+
+    transport_state: str | None = _argument("CurrentTransportState")
+    transport_status: str | None = _argument("CurrentTransportStatus")
+    speed: str | None = _argument("CurrentSpeed")
+
+
+@dataclass(frozen=True, slots=True)
+class PositionInfo:
+    """Output arguments of AVTransport GetPositionInfo."""
+
+    track: int | None = _argument("Track", _to_int)
+    track_duration: str | None = _argument("TrackDuration")
+    track_metadata: str | None = _argument("TrackMetaData")
+    track_uri: str | None = _argument("TrackURI")
+    rel_time: str | None = _argument("RelTime")
+    abs_time: str | None = _argument("AbsTime")
+    rel_count: int | None = _argument("RelCount", _to_int)
+    abs_count: int | None = _argument("AbsCount", _to_int)
+
+
+@dataclass(frozen=True, slots=True)
+class MediaInfo:
+    """Output arguments of AVTransport GetMediaInfo."""
+
+    tracks: int | None = _argument("NrTracks", _to_int)
+    media_duration: str | None = _argument("MediaDuration")
+    current_uri: str | None = _argument("CurrentURI")
+    current_uri_metadata: str | None = _argument("CurrentURIMetaData")
+    next_uri: str | None = _argument("NextURI")
+    next_uri_metadata: str | None = _argument("NextURIMetaData")
+    play_medium: str | None = _argument("PlayMedium")
+    record_medium: str | None = _argument("RecordMedium")
+    write_status: str | None = _argument("WriteStatus")
+
+
+@dataclass(frozen=True, slots=True)
+class VolumeInfo:
+    """Output arguments of RenderingControl GetVolume."""
+
+    current_volume: int | None = _argument("CurrentVolume", _to_int)
+
+
+@dataclass(frozen=True, slots=True)
+class MuteInfo:
+    """Output arguments of RenderingControl GetMute."""
+
+    current_mute: bool | None = _argument("CurrentMute", _to_bool)
+
+
+# result type -> ((field name, argument name, converter), ...)
+_RESULT_FIELDS = {}
+
+
+def _result_fields(result_type):
+    fields = _RESULT_FIELDS.get(result_type)
+    if fields is None:
+        fields = _RESULT_FIELDS[result_type] = tuple(
+            (result_field.name, result_field.metadata["argument"],
+             result_field.metadata["convert"])
+            for result_field in dataclasses.fields(result_type)
+        )
+    return fields
+
+
+def decode_soap_response(content, result_type=None):
+    """Decode a SOAP response body given as bytes or str.
+
+    Returns an instance of result_type holding the output arguments, or a
+    dict of all output arguments when no result_type is given. Raises
+    SoapFault when the body carries a UPnP error.
+    """
+    body = parse_xml(content).find(f"{URN_SOAP_ENVELOPE}Body")
+    if body is None or not len(body):
+        raise ValueError("SOAP response without body")
+    response = body[0]
+    if response.tag == f"{URN_SOAP_ENVELOPE}Fault":
+        error = response.find(f".//{URN_UPNP_CONTROL}UPnPError")
+        if error is None:
+            raise SoapFault(None, response.findtext("faultstring"))
+        raise SoapFault(
+            _to_int(error.findtext(f"{URN_UPNP_CONTROL}errorCode")),
+            error.findtext(f"{URN_UPNP_CONTROL}errorDescription"))
+
+    arguments = {local_name(argument.tag): argument.text for argument in response}
+    if result_type is None:
+        return arguments
+
+    values = {}
+    for name, argument, convert in _result_fields(result_type):
+        value = arguments.get(argument)
+        if convert is not None and value is not None:
+            value = convert(value)
+        values[name] = value
+    return result_type(**values)
@@ -0,0 +1,107 @@
+"""Decoding of the CERS getStatus document.
+
+The player answers getStatus with a list of status elements, each holding
+the fields of one activity:
+
+    <statusList>
+      <status name="disc"><statusItem field="type" value="BD"/></status>
+      <status name="viewing"><statusItem field="source" value="BD"/></status>
+    </statusList>
+
+A document is parsed once per read into a PlayerStatus, which everything
+derived from the status reads instead of searching the text again.
+"""
+from __future__ import annotations
+
+from dataclasses import dataclass, field
+from types import MappingProxyType
+
+from .xml_helper import local_name, parse_xml
+
+ACTIVITY_VIEWING = "viewing"
+ACTIVITY_APPLICATION = "application"
+ACTIVITY_HOME = "home"
+ACTIVITIES = (ACTIVITY_VIEWING, ACTIVITY_APPLICATION, ACTIVITY_HOME)
+
+_EMPTY = MappingProxyType({})
+
+
+@dataclass(frozen=True, slots=True)
+class PlayerStatus:
+    """The status elements of one getStatus answer."""
+
+    # status name -> {field: value}
+    statuses: MappingProxyType = field(default_factory=lambda: _EMPTY)
+
+    def get(self, name, item):
+        """Return a field of a status element, None if it is not reported."""
+        return self.statuses.get(name, _EMPTY).get(item)
+
+    @property
+    def activity(self):
+        """Return what the player is doing, one of ACTIVITIES."""
+        if ACTIVITY_VIEWING in self.statuses:
+            return ACTIVITY_VIEWING
+        if ACTIVITY_APPLICATION in self.statuses:
+            return ACTIVITY_APPLICATION
+        return ACTIVITY_HOME
+
+    @property
+    def playback_status(self):
+        """Return PLAYING or IDLE like get_status."""
+        return "PLAYING" if ACTIVITY_VIEWING in self.statuses else "IDLE"
+
+    @property
+    def at_home(self):
+        """Return whether neither a disc nor an app is shown."""
+        return self.activity == ACTIVITY_HOME
+
+    @property
+    def disc_loaded(self):
+        """Return whether a disc is in the tray."""
+        return "disc" in self.statuses
+
+    @property
+    def disc_type(self):
+        """Return the type of the disc in the tray, such as BD or DVD."""
+        return self.get("disc", "type")
+
+    @property
+    def source(self):
+        """Return the source being viewed, or the id of the running app."""
+        if (source := self.get(ACTIVITY_VIEWING, "source")) is not None:
+            return source
+        return self.get(ACTIVITY_APPLICATION, "id")
+
+    @property
+    def title(self):
+        """Return the title being viewed, else the title of the disc."""
+        return self.get(ACTIVITY_VIEWING, "title") or self.get("disc", "title")
+
+    def as_dict(self):
+        """Return a json serializable copy of the status elements."""
+        return {name: dict(items) for name, items in self.statuses.items()}
+
+
+def parse_status(content):
+    """Decode a getStatus document given as str or bytes.
+
+    Raises ValueError when it is not a status list.
+    """
+    try:
+        root = parse_xml(content)
+    except SyntaxError as ex:  # The ParseError of ElementTree and lxml
+        raise ValueError(f"Invalid status document: {ex}") from None
+    if local_name(root.tag) != "statusList":
+        raise ValueError(f"Expected a statusList, got {local_name(root.tag)}")
+    statuses = {}
+    for status in root:
+        name = status.get("name")
+        if local_name(status.tag) != "status" or not name:
+            continue
+        statuses[name] = MappingProxyType({
+            item.get("field"): item.get("value")
+            for item in status
+            if local_name(item.tag) == "statusItem" and item.get("field")
+        })
+    return PlayerStatus(MappingProxyType(statuses))
@@ -0,0 +1,61 @@
+"""Coalescing volume writes for the Sony UBP-X800.
+
+Dragging a volume slider or holding a volume button produces a burst of
+requests. Only the latest target is kept and at most one SetVolume is sent
+per window, the first request of a burst is sent right away.
+"""
+from __future__ import annotations
+
+import asyncio
+import logging
+import time
+from collections.abc import Callable
+
+from homeassistant.core import HomeAssistant
+
+_LOGGER = logging.getLogger(__name__)
+
+
+class VolumeWriter:
+    """Send the latest requested volume, at most once per window."""
+
+    def __init__(self, hass: HomeAssistant, set_volume: Callable[[int], bool],
+                 window: float) -> None:
+        """Initialize the writer, set_volume is run in the executor."""
+        self.hass = hass
+        self.window = window
+        self._set_volume = set_volume
+        self._target: int | None = None
+        self._task: asyncio.Task | None = None
+        self._last_write = 0.0
+        self.requests = 0
+        self.writes = 0
+
+    @property
+    def target(self) -> int | None:
+        """Return the volume which is requested but not yet sent."""
+        return self._target
+
+    @property
+    def pending(self) -> bool:
+        """Return whether a write is queued or in progress."""
+        return self._task is not None and not self._task.done()
+
+    def request(self, volume: int) -> None:
+        """Request a volume between 0 and 100."""
+        self.requests += 1
+        self._target = max(0, min(100, volume))
+        if not self.pending:
+            self._task = self.hass.async_create_background_task(
+                self._async_write(), "sony_ubpx800 volume")
+
+    async def _async_write(self) -> None:
+        while self._target is not None:
+            delay = self._last_write + self.window - time.monotonic()
+            if delay > 0:
+                await asyncio.sleep(delay)
+            target, self._target = self._target, None
+            self._last_write = time.monotonic()
+            self.writes += 1
+            if not await self.hass.async_add_executor_job(self._set_volume, target):
+                _LOGGER.debug("Setting the volume to %d failed", target)
@@ -0,0 +1,134 @@
+"""Websocket commands for custom remote dashboards.
+
+A remote card sends key down and key up events straight to the IRCC
+dispatcher of the player, without a service call, entity lookup or status
+loop in between. Key down sends the key once and answers with the measured
+round trip, a key kept down longer than REPEAT_DELAY repeats like a held
+remote button until key up.
+"""
+from __future__ import annotations
+
+import asyncio
+import logging
+import threading
+import time
+from typing import Any
+
+import voluptuous as vol
+
+from homeassistant.components import websocket_api
+from homeassistant.core import HomeAssistant, callback
+from homeassistant.helpers import entity_registry as er
+
+from .const import DOMAIN, SONY_COORDINATOR
+from .coordinator import SonyCoordinator
+
+_LOGGER = logging.getLogger(__name__)
+
+KEY_DOWN = "down"
+KEY_UP = "up"
+# Seconds a key has to stay down before it starts repeating
+REPEAT_DELAY = 0.5
+# Upper bound of a repeat, in case the key up never arrives
+MAX_HOLD_SECS = 30
+
+
+class KeyChannel:
+    """Key down and key up handling for one player."""
+
+    def __init__(self, coordinator: SonyCoordinator) -> None:
+        """Initialize the channel."""
+        self.coordinator = coordinator
+        self._cancel: threading.Event | None = None
+        # Whether the device acknowledged the key which is down
+        self._acknowledged = False
+
+    async def async_key_down(self, key: str) -> dict[str, Any]:
+        """Send a key once and start repeating it while it stays down."""
+        hass = self.coordinator.hass
+        self.release()
+        # Stored before the press, a key up arriving while the key is still
+        # being sent has to find it
+        cancel = self._cancel = threading.Event()
+        acknowledged = False
+        try:
+            acknowledged, round_trip = await hass.async_add_executor_job(
+                self.coordinator.api.press_key, key)
+        finally:
+            # A key the device did not take is not down, key up releases nothing
+            if not acknowledged and self._cancel is cancel:
+                self._cancel = None
+        if acknowledged and not cancel.is_set():
+            self._acknowledged = True
+            hass.async_create_background_task(
+                self._async_repeat(key, cancel), f"sony_ubpx800 hold {key}")
+        return {"acknowledged": acknowledged, "round_trip_ms": round(round_trip * 1000, 1)}
+
+    async def _async_repeat(self, key: str, cancel: threading.Event) -> None:
+        await asyncio.sleep(REPEAT_DELAY)
+        if cancel.is_set():
+            return
+        result = await self.coordinator.hass.async_add_executor_job(
+            self.coordinator.api.hold_key, key, MAX_HOLD_SECS, self.coordinator.hold_rate, cancel)
+        _LOGGER.debug(
+            "Repeated %s for %.2fs: %d presses, %d skipped, %d errors",
+            key, result.duration, result.presses, result.skipped, result.errors)
+
+    def release(self) -> bool:
+        """Stop repeating the key which is down, return whether one was."""
+        cancel, self._cancel = self._cancel, None
+        acknowledged, self._acknowledged = self._acknowledged, False
+        if cancel is None or cancel.is_set():
+            return False
+        cancel.set()
+        return acknowledged
+
+
+@callback
+def async_register_websocket_api(hass: HomeAssistant) -> None:
+    """Register the websocket commands."""
+    websocket_api.async_register_command(hass, websocket_remote_key)
+
+
+@callback
+def _async_get_coordinator(hass: HomeAssistant, entity_id: str) -> SonyCoordinator | None:
+    """Return the coordinator of the player an entity belongs to."""
+    if (entry := er.async_get(hass).async_get(entity_id)) is None or entry.platform != DOMAIN:
+        return None
+    entry_data = hass.data.get(DOMAIN, {}).get(entry.config_entry_id)
+    return entry_data[SONY_COORDINATOR] if entry_data else None
+
+
+@websocket_api.websocket_command({
+    vol.Required("type"): f"{DOMAIN}/remote_key",
+    vol.Required("entity_id"): str,
+    vol.Required("key"): str,
+    vol.Optional("event", default=KEY_DOWN): vol.In((KEY_DOWN, KEY_UP)),
+})
+@websocket_api.async_response
+async def websocket_remote_key(
+        hass: HomeAssistant,
+        connection: websocket_api.ActiveConnection,
+        msg: dict[str, Any],
+) -> None:
+    """Handle a key down or key up event of a remote card."""
+    received = time.perf_counter()
+    if (coordinator := _async_get_coordinator(hass, msg["entity_id"])) is None:
+        connection.send_error(msg["id"], websocket_api.ERR_NOT_FOUND, "Unknown player")
+        return
+    key = msg["key"]
+    if key not in coordinator.api.commands:
+        connection.send_error(msg["id"], websocket_api.ERR_NOT_FOUND, f"Unknown command: {key}")
+        return
+
+    if coordinator.key_channel is None:
+        coordinator.key_channel = KeyChannel(coordinator)
+    if msg["event"] == KEY_UP:
+        result: dict[str, Any] = {"released": coordinator.key_channel.release()}
+    else:
+        result = await coordinator.key_channel.async_key_down(key)
+    result["key"] = key
+    result["event"] = msg["event"]
+    # Time from receiving the event until the ack, the round trip included
+    result["handled_ms"] = round((time.perf_counter() - received) * 1000, 1)
+    connection.send_result(msg["id"], result)
@@ -1,4 +1,6 @@
 """XML helper functions for the library."""
+import functools
+import threading
 import xml.etree.ElementTree
 
 
@@ -22,21 +24,138 @@ def iterate_search_data(data, param):
     return result
 
 
+def _lxml_fromstring():
+    """Return an lxml based parse function, None if lxml is not installed."""
+    try:
+        from lxml import etree  # pylint: disable=import-outside-toplevel
+    except ImportError:
+        return None
+
+    # lxml parsers must not be shared between threads
+    local = threading.local()
+
+    def fromstring(data):
+        parser = getattr(local, "parser", None)
+        if parser is None:
+            # Comments and processing instructions would otherwise show up
+            # when iterating children, which ElementTree never does
+            parser = local.parser = etree.XMLParser(
+                remove_comments=True, remove_pis=True,
+                resolve_entities=False, no_network=True)
+        if isinstance(data, str):
+            # lxml refuses str input carrying an encoding declaration
+            data = data.encode("utf-8")
+        return etree.fromstring(data, parser)
+
+    return fromstring
+
+
+@functools.lru_cache(maxsize=None)
+def _fromstring():
+    return _lxml_fromstring() or xml.etree.ElementTree.fromstring
+
+
+def parse_xml(data):
+    """Parse an xml document from str or bytes.
+
+    lxml is used when it is installed, otherwise xml.etree.ElementTree.
+    Both return elements with the same find/findall/text/attrib interface.
+    """
+    return _fromstring()(data)
+
+
+class XmlQuery:
+    """A search parameter list compiled into a reusable plan.
+
+    See find_in_xml for the meaning of the parameters. Run the query by
+    calling it with a parsed element (or a str which is parsed first).
+    """
+
+    __slots__ = ("steps",)
+
+    def __init__(self, search_params):
+        self.steps = tuple(
+            (param[0], True) if isinstance(param, (tuple, list)) and param[1]
+            else (param, False)
+            for param in search_params
+        )
+
+    def __call__(self, data):
+        if isinstance(data, (str, bytes)):
+            data = parse_xml(data)
+        for path, find_all in self.steps:
+            if isinstance(data, list):
+                data = _search_nested(data, path, find_all)
+            elif find_all:
+                data = data.findall(path)
+            else:
+                data = data.find(path)
+        return data
+
+
+def _search_nested(data, path, find_all):
+    """Apply one step to every element of nested result lists."""
+    return [
+        _search_nested(element, path, find_all) if isinstance(element, list)
+        else element.findall(path) if find_all
+        else element.find(path)
+        for element in data
+    ]
+
+
+_QUERIES = {}
+
+
+def compile_query(search_params):
+    """Return the shared XmlQuery of a search parameter list."""
+    key = tuple(
+        tuple(param) if isinstance(param, list) else param
+        for param in search_params
+    )
+    query = _QUERIES.get(key)
+    if query is None:
+        query = _QUERIES.setdefault(key, XmlQuery(search_params))
+    return query
+
+
 def find_in_xml(data, search_params):
     """Try to find an element in an xml
 
     Take an xml from string or as xml.etree.ElementTree
     and an iterable of strings (and/or tuples in case of findall) to search.
     The tuple should contain the string to search for and a true value.
+    The compiled query is cached, parse the document once with parse_xml
+    when searching it more than once.
     """
-    if isinstance(data, str):
-        data = xml.etree.ElementTree.fromstring(data)
-    param = search_params[0]
-    if isinstance(data, list):
-        result = iterate_search_data(data, param)
-    else:
-        result = xml_search_helper(data, param)
+    return compile_query(search_params)(data)
+
+
+def local_name(tag):
+    """Strip the namespace from an element tag."""
+    return tag.rsplit("}", 1)[-1]
 
-    if len(search_params) == 1:
-        return result
-    return find_in_xml(result, search_params[1:])
+
+def iter_xml_elements(chunks, tag):
+    """Yield every element named tag while an xml document is streamed.
+
+    Take an iterable of bytes (e.g. response.iter_content()) and yield the
+    matching elements, regardless of depth and namespace, as soon as they
+    are closed. A yielded element is cleared and detached once the caller
+    asks for the next one, so the tree never holds more than one of them.
+    """
+    parser = xml.etree.ElementTree.XMLPullParser(events=("start", "end"))
+    parents = []
+    for chunk in chunks:
+        parser.feed(chunk)
+        for event, element in parser.read_events():
+            if event == "start":
+                parents.append(element)
+                continue
+            parents.pop()
+            if local_name(element.tag) != tag:
+                continue
+            yield element
+            element.clear()
+            if parents:
+                parents[-1].remove(element)
+    parser.close()
@@ -0,0 +1,790 @@
+"""End-to-end latency benchmarks against the local UBP-X800 emulator.
+
+Every case runs against tools/fake_ubpx800.py started in a separate
+process, so the CPU time and allocations reported are the integration's
+own. For each case the harness reports wall clock percentiles, CPU time
+and peak traced allocations per operation and compares them with the
+baselines stored in tools/benchmark_baselines.json.
+
+Usage:
+    python tools/benchmark.py                    # run and compare
+    python tools/benchmark.py -k send_command    # only matching cases
+    python tools/benchmark.py --update-baselines # store new baselines
+
+Cases which need Home Assistant (coordinator refresh, remote burst) are
+skipped when it is not installed. The command exits with status 1 when a
+case regresses over the threshold.
+
+The import check measures `import custom_components.sony_ubpx800` with
+-X importtime (Home Assistant modules are preloaded, as they are when Home
+Assistant starts) and fails when it exceeds IMPORT_BUDGET_MS or loads
+one of HEAVY_MODULES. The policy check fails when a descriptor read
+during init_device is not sent with the timeouts of the DESCRIPTOR policy.
+"""
+from __future__ import annotations
+
+import argparse
+import asyncio
+import importlib
+import importlib.util
+import json
+import logging
+import platform
+import socket
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+import tracemalloc
+from pathlib import Path
+
+TOOLS_DIR = Path(__file__).resolve().parent
+ROOT_DIR = TOOLS_DIR.parent
+PACKAGE = "custom_components.sony_ubpx800"
+BASELINES = TOOLS_DIR / "benchmark_baselines.json"
+
+# Relative regression allowed before a case fails
+DEFAULT_THRESHOLD = 0.25
+# Absolute slack so sub-millisecond figures do not fail on noise
+ABSOLUTE_SLACK = {"p50_ms": 0.5, "p95_ms": 1.0, "cpu_ms": 0.5, "peak_kib": 16.0}
+
+# Budget for importing the integration package and its config flow
+IMPORT_CASE = "import_time"
+IMPORT_BUDGET_MS = 30.0
+IMPORT_RUNS = 5
+# Only needed once an entry is set up or on specific code paths
+HEAVY_MODULES = ("requests", "jsonpickle", "xmltodict", "wakeonlan")
+# Loaded by Home Assistant itself before the integration is imported
+HASS_PRELOAD = (
+    "voluptuous",
+    "homeassistant.core",
+    "homeassistant.config_entries",
+    "homeassistant.data_entry_flow",
+    "homeassistant.helpers.importlib",
+    "homeassistant.helpers.storage",
+    "homeassistant.helpers.update_coordinator",
+)
+
+# Reads of init_device which must be sent as descriptors
+POLICY_CASE = "request_policies"
+
+CASES = {}
+
+
+def case(name, iterations=50, needs_hass=False):
+    """Register a benchmark case.
+
+    The decorated function receives the Bench context and returns a
+    callable (or coroutine function for Home Assistant cases) executing a
+    single measured operation. An optional second callable returned in a
+    tuple runs untimed before every iteration.
+    """
+    def decorator(func):
+        CASES[name] = {
+            "setup": func,
+            "iterations": iterations,
+            "needs_hass": needs_hass,
+        }
+        return func
+    return decorator
+
+
+def load_integration():
+    """Import the integration, without Home Assistant if it is missing.
+
+    Returns the package and whether Home Assistant is available. When it is
+    not, the package is registered without running its __init__ so the
+    device level modules can still be imported.
+    """
+    sys.path.insert(0, str(ROOT_DIR))
+    try:
+        # Loaded first like Home Assistant does, importing one of its helpers
+        # before the core runs into a circular import
+        importlib.import_module("homeassistant.core")
+        return importlib.import_module(PACKAGE), True
+    except ModuleNotFoundError as ex:
+        if not (ex.name or "").startswith("homeassistant"):
+            raise
+    for name in [module for module in sys.modules if module.startswith(PACKAGE)]:
+        del sys.modules[name]
+    package_dir = ROOT_DIR / "custom_components" / "sony_ubpx800"
+    spec = importlib.util.spec_from_file_location(
+        PACKAGE, package_dir / "__init__.py", submodule_search_locations=[str(package_dir)])
+    package = importlib.util.module_from_spec(spec)
+    sys.modules[PACKAGE] = package
+    return package, False
+
+
+def _free_port():
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+class Emulator:
+    """Run tools/fake_ubpx800.py in a child process."""
+
+    def __init__(self, latency=0.0, boot_time=0.25):
+        self.ports = {"dmr": _free_port(), "ircc": _free_port(), "app": _free_port()}
+        self.args = [
+            sys.executable, str(TOOLS_DIR / "fake_ubpx800.py"),
+            "--dmr-port", str(self.ports["dmr"]),
+            "--ircc-port", str(self.ports["ircc"]),
+            "--app-port", str(self.ports["app"]),
+            "--latency", str(latency),
+            "--boot-time", str(boot_time),
+        ]
+        self.process = None
+
+    def __enter__(self):
+        self.process = subprocess.Popen(self.args, stderr=subprocess.DEVNULL)
+        deadline = time.monotonic() + 10
+        while time.monotonic() < deadline:
+            try:
+                with socket.create_connection(("127.0.0.1", self.ports["app"]), timeout=0.2):
+                    return self
+            except OSError:
+                time.sleep(0.05)
+        self.process.kill()
+        raise RuntimeError("Emulator did not start")
+
+    def __exit__(self, *exc_info):
+        self.process.terminate()
+        self.process.wait()
+
+
+class Bench:
+    """Context shared by the cases."""
+
+    def __init__(self, package, emulator, hass=None):
+        self.package = package
+        self.emulator = emulator
+        self.hass = hass
+        self.device_module = importlib.import_module(f"{PACKAGE}.device")
+
+    def new_device(self, init=True):
+        """Return a SonyDevice pointing at the emulator."""
+        ports = self.emulator.ports
+        device = self.device_module.SonyDevice(
+            "127.0.0.1", "benchmark",
+            app_port=ports["app"], dmr_port=ports["dmr"], ircc_port=ports["ircc"])
+        device.pin = "0000"
+        if init:
+            device.init_device()
+        return device
+
+
+def _percentile(samples, fraction):
+    ordered = sorted(samples)
+    index = min(len(ordered) - 1, max(0, round(fraction * (len(ordered) - 1))))
+    return ordered[index]
+
+
+def _summarize(wall, cpu, peaks):
+    return {
+        "iterations": len(wall),
+        "p50_ms": round(_percentile(wall, 0.50) * 1000, 3),
+        "p95_ms": round(_percentile(wall, 0.95) * 1000, 3),
+        "p99_ms": round(_percentile(wall, 0.99) * 1000, 3),
+        "cpu_ms": round(statistics.fmean(cpu) * 1000, 3),
+        "peak_kib": round(max(peaks) / 1024, 1) if peaks else None,
+    }
+
+
+def _split(prepared):
+    if isinstance(prepared, tuple):
+        return prepared
+    return prepared, None
+
+
+def run_sync_case(bench, spec, iterations):
+    """Measure a blocking case."""
+    operation, before = _split(spec["setup"](bench))
+    wall, cpu, peaks = [], [], []
+    for _ in range(iterations):
+        if before:
+            before()
+        started_cpu = time.process_time()
+        started = time.perf_counter()
+        operation()
+        wall.append(time.perf_counter() - started)
+        cpu.append(time.process_time() - started_cpu)
+    # Allocations are traced in a separate pass, tracing distorts timings
+    tracemalloc.start()
+    for _ in range(min(5, iterations)):
+        if before:
+            before()
+        tracemalloc.reset_peak()
+        baseline = tracemalloc.get_traced_memory()[0]
+        operation()
+        peaks.append(tracemalloc.get_traced_memory()[1] - baseline)
+    tracemalloc.stop()
+    return _summarize(wall, cpu, peaks)
+
+
+async def run_async_case(bench, spec, iterations):
+    """Measure a case running on the Home Assistant event loop."""
+    operation, before = _split(await spec["setup"](bench))
+    wall, cpu, peaks = [], [], []
+    for _ in range(iterations):
+        if before:
+            await before()
+        started_cpu = time.process_time()
+        started = time.perf_counter()
+        await operation()
+        wall.append(time.perf_counter() - started)
+        cpu.append(time.process_time() - started_cpu)
+    tracemalloc.start()
+    for _ in range(min(5, iterations)):
+        if before:
+            await before()
+        tracemalloc.reset_peak()
+        baseline = tracemalloc.get_traced_memory()[0]
+        await operation()
+        peaks.append(tracemalloc.get_traced_memory()[1] - baseline)
+    tracemalloc.stop()
+    return _summarize(wall, cpu, peaks)
+
+
+# Device level cases
+
+@case("init_device_cold", iterations=30)
+def _init_device_cold(bench):
+    return lambda: bench.new_device(init=True)
+
+
+@case("load_from_json_warm", iterations=30)
+def _load_from_json_warm(bench):
+    stored = bench.new_device().save_to_json()
+    return lambda: bench.device_module.SonyDevice.load_from_json(stored)
+
+
+@case("send_command", iterations=200)
+def _send_command(bench):
+    device = bench.new_device()
+    return lambda: device.send_command("Up")
+
+
+@case("power_on_time_to_ready", iterations=5)
+def _power_on(bench):
+    device = bench.new_device()
+
+    def power_off():
+        if device.get_power_status():
+            device.power(False)
+        while device.get_power_status():
+            time.sleep(0.02)
+
+    def power_on():
+        device.power(True)
+        deadline = time.monotonic() + 30
+        while not device.get_power_status():
+            if time.monotonic() > deadline:
+                raise RuntimeError("Device did not become ready")
+            time.sleep(0.02)
+
+    return power_on, power_off
+
+
+@case("device_refresh", iterations=100)
+def _device_refresh(bench):
+    device = bench.new_device()
+    device.send_command("Play")
+    return device.refresh
+
+
+@case("device_refresh_sequential", iterations=100)
+def _device_refresh_sequential(bench):
+    device = bench.new_device()
+    device.send_command("Play")
+
+    def refresh():
+        device.get_playing_status()
+        device.get_position()
+        device.get_media_info()
+
+    return refresh
+
+
+@case("start_app_at_home", iterations=50)
+def _start_app_at_home(bench):
+    device = bench.new_device()
+    app = device.get_apps()[0]
+
+    def go_home():
+        device.send_command("Home")
+        # as the coordinator does on every poll
+        device.refresh()
+
+    return (lambda: device.start_app(app)), go_home
+
+
+@case("start_app_from_app", iterations=50)
+def _start_app_from_app(bench):
+    device = bench.new_device()
+    first, second = device.get_apps()[:2]
+    return (lambda: device.start_app(second)), (lambda: device.start_app(first))
+
+
+def _learned_pacer(device, burst):
+    """Return a callable resetting the pacer to the gap learned by one burst.
+
+    Every iteration starts from the same pacer instead of the first ones
+    still narrowing the gap from DEFAULT_GAP, so the percentiles do not
+    depend on the number of iterations.
+    """
+    pacing = importlib.import_module(f"{PACKAGE}.pacing")
+    burst()
+    gap = device.pacer.gap
+
+    def reset():
+        device.pacer = pacing.KeyPacer(gap)
+
+    return reset
+
+
+@case("send_keys_paced_10", iterations=20)
+def _send_keys_paced(bench):
+    device = bench.new_device()
+    keys = ["Up", "Down"] * 5
+
+    def burst():
+        for key in keys:
+            device.pacer.wait()
+            device.send_command(key)
+
+    return burst, _learned_pacer(device, burst)
+
+
+@case("run_macro_10", iterations=20)
+def _run_macro(bench):
+    macro = importlib.import_module(f"{PACKAGE}.macro")
+    device = bench.new_device()
+    compiled = macro.compile_macro("bench", "Up, Down, " * 5, device.commands)
+
+    def run():
+        device.run_macro(compiled)
+
+    return run, _learned_pacer(device, run)
+
+
+@case("run_macro_delay", iterations=10)
+def _run_macro_delay(bench):
+    macro = importlib.import_module(f"{PACKAGE}.macro")
+    pacing = importlib.import_module(f"{PACKAGE}.pacing")
+    device = bench.new_device()
+    compiled = macro.compile_macro(
+        "bench", "Home, Down, delay 0.2, Confirm", device.commands)
+
+    def run():
+        device.pacer.gap = 0.3
+        home, down, confirm = device.run_macro(compiled).steps
+        # Down is paced after Home, the delay replaces pacing before Confirm
+        paced = down.offset - home.offset - home.elapsed
+        delayed = confirm.offset - down.offset - down.elapsed
+        if paced < 0.3 * pacing.GAP_DECAY:
+            raise RuntimeError(f"Down sent {paced * 1000:.0f} ms after Home was acknowledged")
+        if not 0.2 <= delayed < 0.25:
+            raise RuntimeError(f"Confirm sent {delayed * 1000:.0f} ms after Down, not 200 ms")
+
+    return run
+
+
+@case("hold_key_1s", iterations=5)
+def _hold_key(bench):
+    device = bench.new_device()
+
+    def hold():
+        result = device.hold_key("Up", 1.0, rate=20)
+        if abs(result.rate - 20) > 1:
+            raise RuntimeError(f"Held at {result.rate:.1f} presses/s instead of 20")
+
+    return hold
+
+
+# Parsing cases, a large command list as a device with many commands would send
+
+LARGE_LIST_COMMANDS = 20000
+
+
+def _large_command_list(bench):
+    ircc = importlib.import_module(f"{PACKAGE}.ircc")
+    codes = ircc.IR_KEY_CODES[ircc.IrccCategory.BD1]
+    commands = "".join(
+        f'<command name="{name}{index}" type="ircc" '
+        f'value="{ircc.encode_ircc_code(3, 7258, code)}"/>'
+        for index in range(LARGE_LIST_COMMANDS // len(codes) + 1)
+        for name, code in codes
+    )
+    return f'<?xml version="1.0"?><remoteCommandList>{commands}</remoteCommandList>'.encode()
+
+
+def _chunks(body, size=4096):
+    return (body[index:index + size] for index in range(0, len(body), size))
+
+
+@case("parse_command_list_tree", iterations=10)
+def _parse_command_list_tree(bench):
+    xml_helper = importlib.import_module(f"{PACKAGE}.xml_helper")
+    body = _large_command_list(bench)
+
+    def parse():
+        text = b"".join(_chunks(body)).decode()
+        return {
+            command.get("name"): bench.device_module.XmlApiObject.from_xml(command.attrib)
+            for command in xml_helper.find_in_xml(text, [("command", True)])
+        }
+
+    return parse
+
+
+@case("parse_command_list_stream", iterations=10)
+def _parse_command_list_stream(bench):
+    xml_helper = importlib.import_module(f"{PACKAGE}.xml_helper")
+    body = _large_command_list(bench)
+
+    def parse():
+        return {
+            command.get("name"): bench.device_module.XmlApiObject.from_xml(command.attrib)
+            for command in xml_helper.iter_xml_elements(_chunks(body), "command")
+        }
+
+    return parse
+
+
+def _large_command_entries():
+    ircc = importlib.import_module(f"{PACKAGE}.ircc")
+    codes = ircc.IR_KEY_CODES[ircc.IrccCategory.BD1]
+    return [
+        (f"{name}{index}", ircc.encode_ircc_code(3, 7258, code))
+        for index in range(LARGE_LIST_COMMANDS // len(codes) + 1)
+        for name, code in codes
+    ]
+
+
+@case("command_table_from_xml", iterations=20)
+def _command_table_from_xml(bench):
+    entries = [{"name": name, "type": "ircc", "value": value}
+               for name, value in _large_command_entries()]
+    from_xml = bench.device_module.XmlApiObject.from_xml
+    return lambda: {entry["name"]: from_xml(entry) for entry in entries}
+
+
+@case("command_table_bulk", iterations=20)
+def _command_table_bulk(bench):
+    entries = _large_command_entries()
+    return lambda: bench.device_module.XmlApiObject.command_table(entries)
+
+
+# XML query cases on the documents the emulator serves
+
+DEVICE_INFO_FIELDS = (
+    "friendlyName", "manufacturer", "manufacturerURL", "modelDescription",
+    "modelName", "modelURL", "modelNumber",
+)
+
+
+@case("xml_query_dmr", iterations=200)
+def _xml_query_dmr(bench):
+    xml_helper = importlib.import_module(f"{PACKAGE}.xml_helper")
+    device = bench.new_device(init=False)
+    # pylint: disable=protected-access
+    body = device._send_http(device.dmr_url, bench.device_module.HttpMethod.GET).text
+    upnp_device = bench.device_module.URN_UPNP_DEVICE + "device"
+    queries = [
+        [upnp_device, f"{bench.device_module.URN_UPNP_DEVICE}{field}"]
+        for field in DEVICE_INFO_FIELDS
+    ] + [[(upnp_device, True), f"{bench.device_module.URN_UPNP_DEVICE}serviceList"]]
+
+    def query():
+        xml_data = xml_helper.parse_xml(body)
+        return [xml_helper.find_in_xml(xml_data, params) for params in queries]
+
+    return query
+
+
+# SOAP cases, GetPositionInfo is polled on every coordinator refresh
+
+GET_POSITION_INFO = (
+    """<m:GetPositionInfo xmlns:m="urn:schemas-upnp-org:service:AVTransport:1">
+            <InstanceID>0</InstanceID>
+            </m:GetPositionInfo>""",
+    "urn:schemas-upnp-org:service:AVTransport:1#GetPositionInfo",
+)
+
+
+@case("soap_decode_position_info", iterations=500)
+def _soap_decode_position_info(bench):
+    soap = importlib.import_module(f"{PACKAGE}.soap")
+    device = bench.new_device()
+    device.send_command("Play")
+    params, action = GET_POSITION_INFO
+    # pylint: disable=protected-access
+    body = device._send_soap(device.av_transport_url, params, action).content
+    return lambda: soap.decode_soap_response(body, soap.PositionInfo)
+
+
+@case("soap_get_position_info", iterations=200)
+def _soap_get_position_info(bench):
+    device = bench.new_device()
+    device.send_command("Play")
+    return device.get_position_info
+
+
+@case("media_metadata_cached", iterations=500)
+def _media_metadata_cached(bench):
+    device = bench.new_device()
+    device.send_command("Play")
+    position_info = device.get_position()
+    # Every refresh after the first one of a track is served from the cache
+    return lambda: device.get_media_metadata(position_info, None)
+
+
+# Home Assistant cases
+
+@case("coordinator_update", iterations=100, needs_hass=True)
+async def _coordinator_update(bench):
+    coordinator = _coordinator(bench)
+    await coordinator.hass.async_add_executor_job(coordinator.api.init_device)
+    coordinator.device_data._init = True  # pylint: disable=protected-access
+    return coordinator._async_update_data  # pylint: disable=protected-access
+
+
+@case("remote_send_command_burst_10", iterations=20, needs_hass=True)
+async def _remote_burst(bench):
+    remote = importlib.import_module(f"{PACKAGE}.remote")
+    coordinator = _coordinator(bench)
+    await coordinator.hass.async_add_executor_job(coordinator.api.init_device)
+    entity = remote.SonyRemoteEntity(coordinator)
+    keys = ["Up", "Down"] * 5
+
+    async def burst():
+        await entity.async_send_command(keys, delay_secs=0)
+
+    return burst
+
+
+@case("button_press_up", iterations=50, needs_hass=True)
+async def _button_press(bench):
+    button = importlib.import_module(f"{PACKAGE}.button")
+    coordinator = _coordinator(bench)
+    await coordinator.hass.async_add_executor_job(coordinator.api.init_device)
+    return button.SonyButtonEntity(coordinator, "Up").async_press
+
+
+@case("button_service_press_up", iterations=50, needs_hass=True)
+async def _button_service_press(bench):
+    """A tap through button.press: validation, entity lookup, async_press."""
+    # pylint: disable=import-outside-toplevel
+    from homeassistant.helpers import device_registry, entity_registry
+    from homeassistant.helpers.entity_component import EntityComponent
+
+    button = importlib.import_module(f"{PACKAGE}.button")
+    coordinator = _coordinator(bench)
+    await coordinator.hass.async_add_executor_job(coordinator.api.init_device)
+    await device_registry.async_load(bench.hass)
+    await entity_registry.async_load(bench.hass)
+    # Registered like the button integration registers its press service
+    component = EntityComponent(logging.getLogger(__name__), "button", bench.hass)
+    component.async_register_entity_service("press", None, "async_press")
+    entity = button.SonyButtonEntity(coordinator, "Up")
+    await component.async_add_entities([entity])
+
+    async def press():
+        await bench.hass.services.async_call(
+            "button", "press", {"entity_id": entity.entity_id}, blocking=True)
+
+    return press
+
+
+@case("websocket_key_down_up", iterations=50, needs_hass=True)
+async def _websocket_key(bench):
+    websocket = importlib.import_module(f"{PACKAGE}.websocket_api")
+    coordinator = _coordinator(bench)
+    await coordinator.hass.async_add_executor_job(coordinator.api.init_device)
+    channel = websocket.KeyChannel(coordinator)
+
+    async def press():
+        await channel.async_key_down("Up")
+        channel.release()
+
+    return press
+
+
+def _coordinator(bench):
+    coordinator_module = importlib.import_module(f"{PACKAGE}.coordinator")
+    device = bench.new_device(init=False)
+    device.mac = "00:11:22:33:44:55"
+    return coordinator_module.SonyCoordinator(bench.hass, device)
+
+
+async def _run_hass_cases(bench, selected, iterations):
+    # pylint: disable=import-outside-toplevel
+    from homeassistant.core import HomeAssistant
+
+    results = {}
+    with tempfile.TemporaryDirectory() as config_dir:
+        bench.hass = HomeAssistant(config_dir)
+        try:
+            for name, spec in selected:
+                results[name] = await run_async_case(
+                    bench, spec, iterations or spec["iterations"])
+                _print_result(name, results[name])
+        finally:
+            await bench.hass.async_stop(force=True)
+    return results
+
+
+IMPORT_SCRIPT = """
+import importlib, json, sys
+sys.path.insert(0, {root!r})
+for name in {preload!r}:
+    importlib.import_module(name)
+before = set(sys.modules)
+import custom_components.sony_ubpx800
+import custom_components.sony_ubpx800.config_flow
+print(json.dumps(sorted(
+    name for name in {heavy!r} if name in sys.modules and name not in before)))
+"""
+
+
+def check_import_time():
+    """Measure the import of the package, return (result, problems)."""
+    script = IMPORT_SCRIPT.format(root=str(ROOT_DIR), preload=HASS_PRELOAD, heavy=HEAVY_MODULES)
+    timings = []
+    loaded = []
+    for _ in range(IMPORT_RUNS):
+        completed = subprocess.run(
+            [sys.executable, "-X", "importtime", "-c", script],
+            capture_output=True, text=True, check=True)
+        loaded = json.loads(completed.stdout)
+        for line in completed.stderr.splitlines():
+            # import time: self [us] | cumulative | imported package
+            fields = [field.strip() for field in line.split("|")]
+            if len(fields) == 3 and fields[2] == PACKAGE:
+                timings.append(int(fields[1]) / 1000)
+    result = {
+        "iterations": len(timings),
+        "p50_ms": round(statistics.median(timings), 3),
+        "max_ms": round(max(timings), 3),
+        "heavy_modules": loaded,
+    }
+    problems = []
+    if result["p50_ms"] > IMPORT_BUDGET_MS:
+        problems.append(f"import_time: {result['p50_ms']} ms > budget {IMPORT_BUDGET_MS} ms")
+    if loaded:
+        problems.append(f"import_time: package import loads {', '.join(loaded)}")
+    return result, problems
+
+
+def check_request_policies(bench):
+    """Return the descriptor reads of init_device sent with other timeouts."""
+    policy = importlib.import_module(f"{PACKAGE}.policy")
+    device = bench.new_device(init=False)
+    sent = {}
+    request = device.session.request
+
+    def record(method, url, **kwargs):
+        sent.setdefault(url, kwargs.get("timeout"))
+        return request(method, url, **kwargs)
+
+    device.session.request = record
+    device.init_device()
+    expected = policy.DESCRIPTOR.timeout()
+    return [
+        f"{POLICY_CASE}: GET {url} sent with timeout {sent.get(url)} instead of {expected}"
+        for url in (device.dmr_url, device.ircc_url)
+        if sent.get(url) != expected
+    ]
+
+
+def _print_result(name, result):
+    print(f"{name:34} p50 {result['p50_ms']:9.3f} ms  p95 {result['p95_ms']:9.3f} ms  "
+          f"p99 {result['p99_ms']:9.3f} ms  cpu {result['cpu_ms']:8.3f} ms  "
+          f"peak {result['peak_kib']} KiB")
+
+
+def compare(results, baselines, threshold):
+    """Return the list of regressions against the stored baselines."""
+    regressions = []
+    for name, result in results.items():
+        baseline = baselines.get(name)
+        if not baseline:
+            continue
+        for key, slack in ABSOLUTE_SLACK.items():
+            if result.get(key) is None or baseline.get(key) is None:
+                continue
+            limit = baseline[key] * (1 + threshold) + slack
+            if result[key] > limit:
+                regressions.append(
+                    f"{name}: {key} {result[key]} > {round(limit, 3)} (baseline {baseline[key]})")
+    return regressions
+
+
+def _selected(name, pattern):
+    """Return whether -k pattern selects the case called name."""
+    return pattern is None or pattern in name
+
+
+def main():
+    """Run the benchmarks from the command line."""
+    parser = argparse.ArgumentParser(description=__doc__.split("\n", 1)[0])
+    parser.add_argument("-k", dest="pattern", default=None, help="only run cases containing this")
+    parser.add_argument("-n", "--iterations", type=int, default=None)
+    parser.add_argument("--latency", type=float, default=0.0, help="emulated device latency (s)")
+    parser.add_argument("--threshold", type=float, default=DEFAULT_THRESHOLD)
+    parser.add_argument("--update-baselines", action="store_true")
+    parser.add_argument("--json", dest="json_output", default=None, help="write results to file")
+    args = parser.parse_args()
+
+    package, has_hass = load_integration()
+    selected = [(name, spec) for name, spec in CASES.items() if _selected(name, args.pattern)]
+
+    results = {}
+    with Emulator(latency=args.latency) as emulator:
+        bench = Bench(package, emulator)
+        for name, spec in selected:
+            if spec["needs_hass"]:
+                continue
+            results[name] = run_sync_case(bench, spec, args.iterations or spec["iterations"])
+            _print_result(name, results[name])
+        hass_cases = [(name, spec) for name, spec in selected if spec["needs_hass"]]
+        if hass_cases and has_hass:
+            results.update(asyncio.run(_run_hass_cases(bench, hass_cases, args.iterations)))
+        elif hass_cases:
+            print(f"Skipped {', '.join(name for name, _ in hass_cases)}: "
+                  "Home Assistant is not installed")
+
+    if args.json_output:
+        Path(args.json_output).write_text(json.dumps(results, indent=2) + "\n")
+
+    stored = json.loads(BASELINES.read_text()) if BASELINES.exists() else {"cases": {}}
+    if args.update_baselines:
+        stored["cases"].update(results)
+        stored["machine"] = f"{platform.system()} {platform.machine()} Python {platform.python_version()}"
+        BASELINES.write_text(json.dumps(stored, indent=2, sort_keys=True) + "\n")
+        print(f"Baselines written to {BASELINES}")
+        return 0
+
+    regressions = compare(results, stored["cases"], args.threshold)
+    if _selected(IMPORT_CASE, args.pattern):
+        if has_hass:
+            import_result, problems = check_import_time()
+            print(f"{IMPORT_CASE:34} p50 {import_result['p50_ms']:9.3f} ms  "
+                  f"max {import_result['max_ms']:9.3f} ms  budget {IMPORT_BUDGET_MS} ms")
+            regressions.extend(problems)
+        else:
+            print(f"Skipped {IMPORT_CASE}: Home Assistant is not installed")
+    if _selected(POLICY_CASE, args.pattern):
+        with Emulator(latency=args.latency) as emulator:
+            problems = check_request_policies(Bench(package, emulator))
+        print(f"{POLICY_CASE:34} {'failed' if problems else 'ok'}")
+        regressions.extend(problems)
+    for regression in regressions:
+        print(f"REGRESSION {regression}")
+    return 1 if regressions else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
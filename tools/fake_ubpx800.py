@@ -0,0 +1,651 @@
+"""Local emulator of a Sony UBP-X800 for offline testing and benchmarking.
+
+Serves the resources SonyDevice reads from a real player:
+
+* DMR port (52323): dmr.xml and the AVTransport/RenderingControl SOAP actions
+* IRCC port (50001): Ircc.xml, the CERS action list (getSystemInformation,
+  getRemoteCommandList, getStatus, register) and X_SendIRCC
+* App port (50202): appslist and app launch
+
+Key presses received through X_SendIRCC are decoded with the integration's
+IR_KEY_CODES table and drive the emulated player state (power, disc,
+transport state, position, current app).
+
+Usage:
+    python tools/fake_ubpx800.py --latency 0.02 --jitter 0.01 --loss 0.01
+
+or from python:
+    with FakeUbpX800(dmr_port=0, ircc_port=0, app_port=0) as player:
+        device = SonyDevice("127.0.0.1", "bench", dmr_port=player.dmr_port, ...)
+"""
+from __future__ import annotations
+
+import argparse
+import base64
+import importlib.util
+import logging
+import random
+import struct
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+from urllib.parse import parse_qs, urlparse
+from xml.etree import ElementTree
+from xml.sax.saxutils import escape
+
+_LOGGER = logging.getLogger("fake_ubpx800")
+
+INTEGRATION_DIR = Path(__file__).resolve().parent.parent / "custom_components" / "sony_ubpx800"
+
+
+def _load_ircc():
+    """Load ircc.py on its own so Home Assistant is not required."""
+    spec = importlib.util.spec_from_file_location(
+        "sony_ubpx800_ircc", INTEGRATION_DIR / "ircc.py")
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    return module
+
+
+ircc = _load_ircc()
+
+IRCC_FORMAT = 3
+CATEGORY = ircc.IrccCategory.BD1
+KEY_NAMES = {code: name for name, code in ircc.IR_KEY_CODES[CATEGORY]}
+
+# Seconds moved by the Advance/Replay and Forward/Rewind keys
+ADVANCE_SECS = 15
+REPLAY_SECS = 10
+SCAN_SECS = 30
+
+DEFAULT_APPS = (
+    ("netflix", "Netflix"),
+    ("youtube", "YouTube"),
+    ("amazon", "Prime Video"),
+)
+
+SOAP_ENVELOPE = """<?xml version="1.0" encoding="utf-8"?>
+<s:Envelope xmlns:s="http://schemas.xmlsoap.org/soap/envelope/" \
+s:encodingStyle="http://schemas.xmlsoap.org/soap/encoding/">
+<s:Body>{body}</s:Body>
+</s:Envelope>"""
+
+SOAP_FAULT = """<s:Fault><faultcode>s:Client</faultcode><faultstring>UPnPError</faultstring>
+<detail><UPnPError xmlns="urn:schemas-upnp-org:control-1-0">
+<errorCode>{code}</errorCode><errorDescription>{description}</errorDescription>
+</UPnPError></detail></s:Fault>"""
+
+
+def _format_time(seconds):
+    seconds = max(0, int(seconds))
+    return f"{seconds // 3600}:{seconds // 60 % 60:02d}:{seconds % 60:02d}"
+
+
+def _parse_time(value):
+    hours, minutes, seconds = (int(part) for part in value.split(":"))
+    return hours * 3600 + minutes * 60 + seconds
+
+
+class PlayerState:
+    # pylint: disable=too-many-instance-attributes
+    """Emulated state of the player."""
+
+    def __init__(self, powered=True, disc=True, boot_time=0.0):
+        self.lock = threading.RLock()
+        self.powered = powered
+        self.boot_time = boot_time
+        self.ready_at = 0.0
+        self.disc = disc
+        self.disc_title = "Emulated Disc"
+        self.duration = 2 * 3600 + 13 * 60 + 7
+        self.chapters = 24
+        self.transport = "STOPPED"
+        self.app = None
+        self.volume = 20
+        self.muted = False
+        self._position = 0.0
+        self._position_at = time.monotonic()
+        self.keys = []
+
+    @property
+    def ready(self):
+        """Whether the player answers requests."""
+        return self.powered and time.monotonic() >= self.ready_at
+
+    @property
+    def position(self):
+        """Current playback position in seconds."""
+        position = self._position
+        if self.transport == "PLAYING":
+            position += time.monotonic() - self._position_at
+        return min(position, self.duration)
+
+    @position.setter
+    def position(self, value):
+        self._position = min(max(0.0, value), self.duration)
+        self._position_at = time.monotonic()
+
+    @property
+    def chapter(self):
+        """Current chapter number."""
+        return int(self.position * self.chapters // self.duration) + 1
+
+    def _set_transport(self, transport):
+        # freeze the position before changing state
+        self.position = self.position
+        self.transport = transport
+
+    def press(self, name):
+        # pylint: disable=too-many-branches
+        """Apply a key press."""
+        with self.lock:
+            self.keys.append((time.monotonic(), name))
+            if name == "Power":
+                self.powered = not self.powered
+                self.ready_at = time.monotonic() + self.boot_time if self.powered else 0.0
+                self._set_transport("STOPPED")
+                self.app = None
+                return
+            if not self.powered:
+                return
+            if name == "Play" and self.disc and self.app is None:
+                self._set_transport("PLAYING")
+            elif name == "Pause" and self.transport == "PLAYING":
+                self._set_transport("PAUSED_PLAYBACK")
+            elif name == "Pause" and self.transport == "PAUSED_PLAYBACK":
+                self._set_transport("PLAYING")
+            elif name in ("Stop", "Home"):
+                self._set_transport("STOPPED")
+                self.app = None
+                if name == "Stop":
+                    self.position = 0
+            elif name == "Eject":
+                self._set_transport("STOPPED")
+                self.position = 0
+                self.disc = not self.disc
+            elif self.transport != "STOPPED":
+                chapter_length = self.duration / self.chapters
+                offsets = {
+                    "Advance": ADVANCE_SECS,
+                    "Replay": -REPLAY_SECS,
+                    "Forward": SCAN_SECS,
+                    "Rewind": -SCAN_SECS,
+                    "Next": chapter_length,
+                    "Prev": -chapter_length,
+                }
+                if name in offsets:
+                    self.position = self.position + offsets[name]
+
+    def launch(self, app_id):
+        """Start an app."""
+        with self.lock:
+            self._set_transport("STOPPED")
+            self.app = app_id
+
+
+class FakeUbpX800:
+    # pylint: disable=too-many-instance-attributes
+    """Run the emulated player on the DMR, IRCC and app ports.
+
+    latency/jitter delay every response (seconds), loss is the probability
+    a request is dropped without an answer. While the player is switched
+    off only X_SendIRCC keeps answering so it can be woken up with Power,
+    like a real player with Remote Start enabled.
+    """
+
+    def __init__(self, host="127.0.0.1", dmr_port=52323, ircc_port=50001, app_port=50202,
+                 latency=0.0, jitter=0.0, loss=0.0, powered=True, boot_time=0.0,
+                 pin=None, mac="00:11:22:33:44:55", seed=None, apps=DEFAULT_APPS):
+        # pylint: disable=too-many-arguments
+        self.host = host
+        self.latency = latency
+        self.jitter = jitter
+        self.loss = loss
+        self.pin = pin
+        self.mac = mac
+        # Set by expire_session, IRCC is rejected until the client registers again
+        self.session_expired = False
+        self.apps = dict(apps)
+        self.state = PlayerState(powered=powered, boot_time=boot_time)
+        self.requests = 0
+        self._random = random.Random(seed)
+        self._servers = {}
+        self._threads = []
+        self._requested_ports = {"dmr": dmr_port, "ircc": ircc_port, "app": app_port}
+
+    @property
+    def dmr_port(self):
+        """Port serving dmr.xml."""
+        return self._servers["dmr"].server_address[1]
+
+    @property
+    def ircc_port(self):
+        """Port serving Ircc.xml and the CERS actions."""
+        return self._servers["ircc"].server_address[1]
+
+    @property
+    def app_port(self):
+        """Port serving the app list."""
+        return self._servers["app"].server_address[1]
+
+    def start(self):
+        """Bind all ports and serve in background threads."""
+        for name, port in self._requested_ports.items():
+            handler = type(f"{name.title()}Handler", (_Handler,), {"player": self, "service": name})
+            server = ThreadingHTTPServer((self.host, port), handler)
+            server.daemon_threads = True
+            self._servers[name] = server
+        for server in self._servers.values():
+            thread = threading.Thread(target=server.serve_forever, daemon=True)
+            thread.start()
+            self._threads.append(thread)
+        _LOGGER.info("Emulated UBP-X800 on %s dmr=%d ircc=%d app=%d",
+                     self.host, self.dmr_port, self.ircc_port, self.app_port)
+        return self
+
+    def stop(self):
+        """Stop serving and release the ports."""
+        for server in self._servers.values():
+            server.shutdown()
+            server.server_close()
+        for thread in self._threads:
+            thread.join()
+        self._threads = []
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc_info):
+        self.stop()
+
+    def delay(self):
+        """Sleep for the configured latency."""
+        delay = self.latency
+        if self.jitter:
+            delay += self._random.uniform(0, self.jitter)
+        if delay > 0:
+            time.sleep(delay)
+
+    def drop(self):
+        """Decide whether the current request is lost."""
+        return self.loss > 0 and self._random.random() < self.loss
+
+    # Resources
+
+    def dmr_xml(self):
+        """Return the DMR device description."""
+        return f"""<?xml version="1.0"?>
+<root xmlns="urn:schemas-upnp-org:device-1-0" xmlns:av="urn:schemas-sony-com:av">
+<specVersion><major>1</major><minor>0</minor></specVersion>
+<device>
+<deviceType>urn:schemas-upnp-org:device:MediaRenderer:1</deviceType>
+<friendlyName>UBP-X800 (emulated)</friendlyName>
+<manufacturer>Sony Corporation</manufacturer>
+<manufacturerURL>http://www.sony.net/</manufacturerURL>
+<modelDescription>Blu-ray Disc Player</modelDescription>
+<modelName>UBP-X800</modelName>
+<modelNumber>UBP-X800</modelNumber>
+<modelURL>http://www.sony.net/</modelURL>
+<UDN>uuid:00000000-0000-1010-8000-{self.mac.replace(':', '')}</UDN>
+<iconList><icon><mimetype>image/png</mimetype><width>120</width><height>120</height>\
+<depth>24</depth><url>/icon.png</url></icon></iconList>
+<serviceList>
+<service><serviceType>urn:schemas-upnp-org:service:RenderingControl:1</serviceType>
+<serviceId>urn:upnp-org:serviceId:RenderingControl</serviceId>
+<SCPDURL>/RenderingControlSCPD.xml</SCPDURL>
+<controlURL>/upnp/control/RenderingControl</controlURL>
+<eventSubURL>/upnp/event/RenderingControl</eventSubURL></service>
+<service><serviceType>urn:schemas-upnp-org:service:ConnectionManager:1</serviceType>
+<serviceId>urn:upnp-org:serviceId:ConnectionManager</serviceId>
+<SCPDURL>/ConnectionManagerSCPD.xml</SCPDURL>
+<controlURL>/upnp/control/ConnectionManager</controlURL>
+<eventSubURL>/upnp/event/ConnectionManager</eventSubURL></service>
+<service><serviceType>urn:schemas-upnp-org:service:AVTransport:1</serviceType>
+<serviceId>urn:upnp-org:serviceId:AVTransport</serviceId>
+<SCPDURL>/AVTransportSCPD.xml</SCPDURL>
+<controlURL>/upnp/control/AVTransport</controlURL>
+<eventSubURL>/upnp/event/AVTransport</eventSubURL></service>
+</serviceList>
+<av:X_ScalarWebAPI_DeviceInfo><av:X_ScalarWebAPI_Version>1.0</av:X_ScalarWebAPI_Version>
+<av:X_ScalarWebAPI_BaseURL>http://{self.host}/sony</av:X_ScalarWebAPI_BaseURL>
+<av:X_ScalarWebAPI_ServiceList><av:X_ScalarWebAPI_ServiceType>guide</av:X_ScalarWebAPI_ServiceType>
+</av:X_ScalarWebAPI_ServiceList></av:X_ScalarWebAPI_DeviceInfo>
+</device>
+</root>"""
+
+    def ircc_xml(self):
+        """Return the IRCC device description."""
+        category = base64.b64encode(struct.pack(">HI", IRCC_FORMAT, CATEGORY.value)).decode()
+        return f"""<?xml version="1.0"?>
+<root xmlns="urn:schemas-upnp-org:device-1-0" xmlns:av="urn:schemas-sony-com:av">
+<specVersion><major>1</major><minor>0</minor></specVersion>
+<device>
+<deviceType>urn:schemas-sony-com:device:IRCC:1</deviceType>
+<friendlyName>UBP-X800 (emulated)</friendlyName>
+<manufacturer>Sony Corporation</manufacturer>
+<manufacturerURL>http://www.sony.net/</manufacturerURL>
+<modelDescription>Blu-ray Disc Player</modelDescription>
+<modelName>UBP-X800</modelName>
+<modelNumber>UBP-X800</modelNumber>
+<modelURL>http://www.sony.net/</modelURL>
+<iconList><icon><mimetype>image/png</mimetype><width>120</width><height>120</height>\
+<depth>24</depth><url>/icon.png</url></icon></iconList>
+<serviceList>
+<service><serviceType>urn:schemas-sony-com:service:IRCC:1</serviceType>
+<serviceId>urn:schemas-sony-com:serviceId:IRCC</serviceId>
+<SCPDURL>/IRCCSCPD.xml</SCPDURL>
+<controlURL>/upnp/control/IRCC</controlURL>
+<eventSubURL></eventSubURL></service>
+</serviceList>
+<av:X_UNR_DeviceInfo xmlns:av="urn:schemas-sony-com:av"><av:X_UNR_Version>1.3</av:X_UNR_Version>
+<av:X_CERS_ActionList_URL>http://{self.host}:{self.ircc_port}/cers/actionList\
+</av:X_CERS_ActionList_URL></av:X_UNR_DeviceInfo>
+<av:X_IRCC_DeviceInfo xmlns:av="urn:schemas-sony-com:av"><av:X_IRCC_Version>1.0</av:X_IRCC_Version>
+<av:X_IRCC_CategoryList><av:X_IRCC_Category>\
+<av:X_CategoryInfo>{category}</av:X_CategoryInfo></av:X_IRCC_Category>\
+</av:X_IRCC_CategoryList></av:X_IRCC_DeviceInfo>
+</device>
+</root>"""
+
+    @staticmethod
+    def action_list():
+        """Return the CERS action list."""
+        return """<?xml version="1.0"?>
+<actionList>
+<action name="register" mode="3"/>
+<action name="getSystemInformation"/>
+<action name="getRemoteCommandList"/>
+<action name="getStatus"/>
+<action name="getText"/>
+<action name="sendText"/>
+</actionList>"""
+
+    def system_information(self):
+        """Return the CERS system information."""
+        return f"""<?xml version="1.0"?>
+<systemInformation name="UBP-X800" generation="2017" area="GBR" language="eng" country="GBR"
+ modelName="UBP-X800" protocolVersion="1.0">
+<supportFunction>
+<function name="WOL"><functionItem field="MAC" value="{self.mac}"/></function>
+<function name="Notification"/>
+</supportFunction>
+</systemInformation>"""
+
+    @staticmethod
+    def command_list():
+        """Return the CERS remote command list."""
+        commands = "\n".join(
+            f'<command name="{name}" type="ircc" '
+            f'value="{ircc.encode_ircc_code(IRCC_FORMAT, CATEGORY.value, code)}"/>'
+            for name, code in ircc.IR_KEY_CODES[CATEGORY]
+        )
+        return f"""<?xml version="1.0"?>
+<remoteCommandList>
+{commands}
+</remoteCommandList>"""
+
+    def status(self):
+        """Return the CERS status list."""
+        state = self.state
+        items = []
+        with state.lock:
+            if state.disc:
+                items.append('<status name="disc"><statusItem field="type" value="BD"/>'
+                             f'<statusItem field="title" value="{escape(state.disc_title)}"/></status>')
+            if state.transport != "STOPPED":
+                items.append('<status name="viewing"><statusItem field="source" value="BD"/>'
+                             f'<statusItem field="title" value="{escape(state.disc_title)}"/></status>')
+            elif state.app is not None:
+                items.append('<status name="application">'
+                             f'<statusItem field="id" value="{escape(state.app)}"/></status>')
+        return '<?xml version="1.0"?>\n<statusList>' + "".join(items) + "</statusList>"
+
+    def apps_list(self):
+        """Return the DIAL app list."""
+        apps = "".join(
+            f"<app><id>{escape(app_id)}</id><name>{escape(name)}</name>"
+            f"<supportAction><action>run</action></supportAction></app>"
+            for app_id, name in self.apps.items()
+        )
+        return f'<?xml version="1.0"?>\n<service><applist>{apps}</applist></service>'
+
+    def soap(self, action, arguments):
+        # pylint: disable=too-many-return-statements
+        """Handle an AVTransport or RenderingControl action."""
+        state = self.state
+        with state.lock:
+            if action == "GetTransportInfo":
+                # Like the real player the transport state is never reported
+                return {"CurrentTransportState": "NO_MEDIA_PRESENT",
+                        "CurrentTransportStatus": "OK", "CurrentSpeed": "1"}
+            if action == "GetPositionInfo":
+                playing = state.transport != "STOPPED"
+                return {
+                    "Track": str(state.chapter if playing else 0),
+                    "TrackDuration": _format_time(state.duration if playing else 0),
+                    "TrackMetaData": self._didl() if playing else "NOT_IMPLEMENTED",
+                    "TrackURI": "bd://disc/title1" if playing else "",
+                    "RelTime": _format_time(state.position if playing else 0),
+                    "AbsTime": "NOT_IMPLEMENTED",
+                    "RelCount": "2147483647",
+                    "AbsCount": "2147483647",
+                }
+            if action == "GetMediaInfo":
+                playing = state.transport != "STOPPED"
+                return {
+                    "NrTracks": str(state.chapters if state.disc else 0),
+                    "MediaDuration": _format_time(state.duration if state.disc else 0),
+                    "CurrentURI": "bd://disc/title1" if playing else "",
+                    "CurrentURIMetaData": self._didl() if playing else "",
+                    "NextURI": "",
+                    "NextURIMetaData": "",
+                    "PlayMedium": "BD" if state.disc else "NONE",
+                    "RecordMedium": "NOT_IMPLEMENTED",
+                    "WriteStatus": "NOT_IMPLEMENTED",
+                }
+            if action == "Seek":
+                if arguments.get("Unit") != "REL_TIME" or state.transport == "STOPPED":
+                    return None
+                state.position = _parse_time(arguments["Target"])
+                return {}
+            if action == "GetVolume":
+                return {"CurrentVolume": str(state.volume)}
+            if action == "SetVolume":
+                state.volume = max(0, min(100, int(arguments["DesiredVolume"])))
+                return {}
+            if action == "GetMute":
+                return {"CurrentMute": "1" if state.muted else "0"}
+        return None
+
+    def _didl(self):
+        title = escape(self.state.disc_title)
+        didl = ('<DIDL-Lite xmlns="urn:schemas-upnp-org:metadata-1-0/DIDL-Lite/" '
+                'xmlns:dc="http://purl.org/dc/elements/1.1/" '
+                'xmlns:upnp="urn:schemas-upnp-org:metadata-1-0/upnp/">'
+                f'<item id="1" parentID="0" restricted="1"><dc:title>{title}</dc:title>'
+                f'<upnp:class>object.item.videoItem.movie</upnp:class>'
+                f'<upnp:originalTrackNumber>{self.state.chapter}</upnp:originalTrackNumber>'
+                '</item></DIDL-Lite>')
+        return escape(didl)
+
+    def expire_session(self):
+        """Reject IRCC with 403 until the next register, like expired credentials."""
+        self.session_expired = True
+
+    def check_pin(self, authorization):
+        """Return whether the Authorization header matches the pin."""
+        if self.pin is None:
+            return True
+        expected = "Basic " + base64.b64encode(f":{self.pin}".encode()).decode()
+        return authorization == expected
+
+
+class _Handler(BaseHTTPRequestHandler):
+    """Dispatch requests to the emulated player."""
+
+    player: FakeUbpX800
+    service: str
+    protocol_version = "HTTP/1.1"
+    # Headers and body are written separately, without this every answer
+    # on a kept-alive connection waits for the client's delayed ACK
+    disable_nagle_algorithm = True
+
+    def log_message(self, format, *args):  # pylint: disable=redefined-builtin
+        _LOGGER.debug("%s %s", self.service, format % args)
+
+    def _begin(self, always_on=False):
+        """Common handling of latency, loss and power state."""
+        player = self.player
+        player.requests += 1
+        player.delay()
+        if player.drop() or not (always_on or player.state.ready):
+            # Close the connection without an answer, like an unreachable player
+            self.close_connection = True
+            return False
+        return True
+
+    def _send(self, status, body="", content_type="text/xml; charset=utf-8"):
+        payload = body.encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", content_type)
+        self.send_header("Content-Length", str(len(payload)))
+        self.end_headers()
+        self.wfile.write(payload)
+
+    def _read_body(self):
+        length = int(self.headers.get("Content-Length") or 0)
+        return self.rfile.read(length) if length else b""
+
+    def do_GET(self):  # pylint: disable=invalid-name
+        """Serve descriptors and CERS actions."""
+        if not self._begin():
+            return
+        player = self.player
+        url = urlparse(self.path)
+        routes = {
+            ("dmr", "/dmr.xml"): player.dmr_xml,
+            ("ircc", "/Ircc.xml"): player.ircc_xml,
+            ("app", "/appslist"): player.apps_list,
+        }
+        if (route := routes.get((self.service, url.path))) is not None:
+            self._send(200, route())
+            return
+        if self.service == "ircc" and url.path == "/cers/actionList":
+            action = parse_qs(url.query).get("action", [None])[0]
+            self._cers_action(action)
+            return
+        self._send(404)
+
+    def _cers_action(self, action):
+        player = self.player
+        if action is None:
+            self._send(200, player.action_list())
+        elif action == "register":
+            if player.check_pin(self.headers.get("Authorization")):
+                player.session_expired = False
+                self._send(200)
+            else:
+                self._send(401)
+        elif action == "getSystemInformation":
+            self._send(200, player.system_information())
+        elif action == "getRemoteCommandList":
+            self._send(200, player.command_list())
+        elif action == "getStatus":
+            self._send(200, player.status())
+        else:
+            self._send(404)
+
+    def do_POST(self):  # pylint: disable=invalid-name
+        """Serve SOAP actions and app launches."""
+        is_ircc = self.service == "ircc" and self.path == "/upnp/control/IRCC"
+        if not self._begin(always_on=is_ircc):
+            return
+        body = self._read_body()
+        if is_ircc and self.player.session_expired:
+            self._send(403)
+        elif is_ircc:
+            self._send_ircc(body)
+        elif self.service == "dmr" and self.path.startswith("/upnp/control/"):
+            self._soap(body)
+        elif self.service == "app" and self.path.startswith("/apps/"):
+            app_id = self.path[len("/apps/"):].split("/")[0]
+            if app_id not in self.player.apps:
+                self._send(404)
+                return
+            self.player.state.launch(app_id)
+            self._send(201, content_type="text/plain")
+        else:
+            self._send(404)
+
+    def _send_ircc(self, body):
+        player = self.player
+        try:
+            code = ElementTree.fromstring(body).find(".//IRCCCode").text.strip()
+            _fmt, category_id, key = ircc.decode_ircc_code(code)
+        except (ElementTree.ParseError, AttributeError, ValueError):
+            self._send(500, SOAP_ENVELOPE.format(body=SOAP_FAULT.format(
+                code=402, description="Invalid Args")))
+            return
+        name = KEY_NAMES.get(key) if category_id == CATEGORY.value else None
+        # Only Power is accepted while the player is off
+        if name is None or not (player.state.ready or name == "Power"):
+            self._send(500, SOAP_ENVELOPE.format(body=SOAP_FAULT.format(
+                code=800, description="Not Accepted")))
+            return
+        player.state.press(name)
+        self._send(200, SOAP_ENVELOPE.format(
+            body='<u:X_SendIRCCResponse xmlns:u="urn:schemas-sony-com:service:IRCC:1"/>'))
+
+    def _soap(self, body):
+        soap_action = self.headers.get("SOAPACTION", "").strip('"')
+        service, _, action = soap_action.rpartition("#")
+        try:
+            request = ElementTree.fromstring(body).find(".//{%s}%s" % (service, action))
+            arguments = {child.tag: child.text for child in request} if request is not None else {}
+        except ElementTree.ParseError:
+            arguments = None
+        result = self.player.soap(action, arguments) if arguments is not None else None
+        if result is None:
+            self._send(500, SOAP_ENVELOPE.format(body=SOAP_FAULT.format(
+                code=710, description="Seek mode not supported" if action == "Seek"
+                else "Invalid Action")))
+            return
+        values = "".join(f"<{key}>{value}</{key}>" for key, value in result.items())
+        self._send(200, SOAP_ENVELOPE.format(
+            body=f'<u:{action}Response xmlns:u="{service}">{values}</u:{action}Response>'))
+
+
+def main():
+    """Run the emulator from the command line."""
+    parser = argparse.ArgumentParser(description=__doc__.split("\n", 1)[0])
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--dmr-port", type=int, default=52323)
+    parser.add_argument("--ircc-port", type=int, default=50001)
+    parser.add_argument("--app-port", type=int, default=50202)
+    parser.add_argument("--latency", type=float, default=0.0, help="response delay in seconds")
+    parser.add_argument("--jitter", type=float, default=0.0, help="random extra delay in seconds")
+    parser.add_argument("--loss", type=float, default=0.0, help="probability a request is dropped")
+    parser.add_argument("--off", action="store_true", help="start switched off")
+    parser.add_argument("--boot-time", type=float, default=0.0, help="seconds from Power to ready")
+    parser.add_argument("--pin", default=None, help="require this pin for register")
+    parser.add_argument("--seed", type=int, default=None)
+    parser.add_argument("-v", "--verbose", action="store_true")
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.DEBUG if args.verbose else logging.INFO)
+    player = FakeUbpX800(
+        host=args.host, dmr_port=args.dmr_port, ircc_port=args.ircc_port,
+        app_port=args.app_port, latency=args.latency, jitter=args.jitter,
+        loss=args.loss, powered=not args.off, boot_time=args.boot_time,
+        pin=args.pin, seed=args.seed)
+    with player:
+        try:
+            while True:
+                time.sleep(3600)
+        except KeyboardInterrupt:
+            pass
+
+
+if __name__ == "__main__":
+    main()